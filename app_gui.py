@@ -1,24 +1,45 @@
+import time
+STARTED = time.perf_counter()  # before the imports below, for the startup report
+
+import logging
+import os
 import tkinter as tk
-from PIL import Image, ImageTk  
-from items_view import ItemView
-from customers_view import CustomerView
-from suppliers_view import SupplierView
-from orders_view import OrderView
+from tkinter import messagebox
+from view_manager import ViewManager
+from db_executor import DBExecutor
+from query_log import QueryLog
+import ui_metrics
+
+# The views, PIL and the MySQL driver are imported on first use, so the first
+# window does not wait for them; see load_logo, open_database and make_*.
+
+LOGO = "assets/logo.jpeg"
+LOGO_SIZE = (250, 200)
+# the logo resized once to LOGO_SIZE; Tk reads PNG by itself, without PIL
+LOGO_CACHE = "assets/logo_250x200.png"
+
+logger = logging.getLogger("flowershop.startup")
 
 
 class HERAGUI:
-    def __init__(self, root):
+    def __init__(self, root, startup=None):
         self.root = root
+        self.startup = startup or ui_metrics.StartupTimer()
         self.root.title("HERA Database")
         self.root.state('zoomed')  # Fullscreen
         self.root.configure(bg="black")
 
-        self.db_config = {
-            "host": "localhost",
-            "user": "root",
-            "password": "Root",
-            "database": "flowershop_management"
-        }
+        # one process-wide pool shared by every view, opened with the first data section;
+        # the engine and its settings come from HERA_DB_* (see backends.py)
+        self.pool_size = 5
+        self.db_config = None
+        self.query_log = None
+        self.db_pool = None
+        self.repos = None
+        self.db_ready = False
+
+        # background threads for database work, results come back via after()
+        self.executor = DBExecutor(root, max_workers=self.pool_size)
 
         # === Colors ===
         self.lavender = "#B593BB"
@@ -34,11 +55,25 @@ class HERAGUI:
 
         # === Load and display logo image ===
         self.load_logo()
+        self.startup.mark("logo")
 
         # === Main Content Area ===
         self.content = tk.Frame(root, bg=self.bg_black)
         self.content.pack(side="right", expand=True, fill="both")
 
+        # === Sections ===
+        # each view is built on the first visit and kept afterwards, hidden while
+        # another one is shown; depends lists the data whose changes it must reload
+        self.views = ViewManager(self.content)  # data versions come with the database
+        self.views.register("dashboard", self.make_dashboard, depends=())
+        self.views.register("items", self.make_items, depends=("items", "suppliers"))
+        self.views.register("customers", self.make_customers, depends=("customers",))
+        self.views.register("suppliers", self.make_suppliers, depends=("suppliers", "items"))
+        self.views.register("orders", self.make_orders, depends=("orders", "customers"))
+        self.views.register("diagnostics", self.make_diagnostics)
+        self.views.register("connecting", self.make_connecting, depends=())
+        self.views.register("placeholder", self.make_placeholder, depends=())
+
         # === Sidebar Buttons ===
         self.buttons = {}  # to keep references to buttons
 
@@ -48,6 +83,7 @@ class HERAGUI:
             ("Customers", self.show_customers),
             ("Suppliers", self.show_suppliers),
             ("Orders", self.show_orders),
+            ("Diagnostics", self.show_diagnostics),
             ("Exit", root.quit)
         ]
 
@@ -65,23 +101,50 @@ class HERAGUI:
             btn.pack(fill="x", pady=10, padx=10)
             self.buttons[text] = btn
 
+        # === Busy indicator ===
+        self.busy_label = tk.Label(self.sidebar, text="", font=("Arial", 12, "italic"),
+                                   fg="black", bg=self.lavender)
+        self.busy_label.pack(side="bottom", pady=10)
+        self.executor.add_busy_listener(self.on_busy_change)
+
+        # flags callbacks that block the event loop; see Diagnostics
+        self.watchdog = ui_metrics.StallWatchdog(root)
+        self.watchdog.start()
+
         self.active_button = None
+        self.active_section = None
         self.on_button_click(self.show_dashboard, "Dashboard")  # Default selection
+        self.startup.mark("window")
 
-    def load_logo(self):
-        # Open the image using PIL
-        image = Image.open("assets/logo.jpeg")
+        # the first window is up once Tk has drawn what is queued so far
+        self.root.after_idle(self.on_first_window)
 
-        # Resize the image to fit nicely (e.g., 150x150)
-        image = image.resize((250, 200), Image.Resampling.LANCZOS)
+    def on_first_window(self):
+        # shown in Diagnostics, and on stderr when run as a script (see __main__)
+        self.startup.finish()
+        logger.info(self.startup.report())
 
-        # Convert to PhotoImage
-        self.logo_img = ImageTk.PhotoImage(image)
+    def load_logo(self):
+        # Decoding and LANCZOS-resizing the JPEG (and importing PIL for it) is
+        # done once; later starts read the resized copy
+        if os.path.exists(LOGO_CACHE) and os.path.getmtime(LOGO_CACHE) >= os.path.getmtime(LOGO):
+            self.logo_img = tk.PhotoImage(file=LOGO_CACHE)
+        else:
+            self.logo_img = self.build_logo_cache()
 
         # Create a label for the logo and pack it on the sidebar top
         logo_label = tk.Label(self.sidebar, image=self.logo_img, bg=self.lavender)
         logo_label.pack(pady=20)
 
+    def build_logo_cache(self):
+        from PIL import Image, ImageTk
+        image = Image.open(LOGO).resize(LOGO_SIZE, Image.Resampling.LANCZOS)
+        try:
+            image.save(LOGO_CACHE)
+        except OSError:
+            pass  # read-only install: resized again on the next start
+        return ImageTk.PhotoImage(image)
+
     def on_button_click(self, command, button_text):
         # Reset all buttons to inactive bg
         for btn in self.buttons.values():
@@ -90,46 +153,137 @@ class HERAGUI:
         # Highlight the clicked button
         self.buttons[button_text].config(bg=self.active_bg)
 
-        # Run the associated command to show content
-        command()
+        # Drop queries still running for the section we are leaving; its view
+        # then reloads when it is shown again
+        if self.active_section is not None:
+            if self.executor.cancel_group(self.active_section):
+                self.views.mark_stale(self.active_section)
+        self.active_section = button_text.lower()
 
-    def clear_content(self):
-        for widget in self.content.winfo_children():
-            widget.destroy()
+        # Run the associated command to show content; timed until the view has drawn its data
+        with ui_metrics.interaction(f"sidebar.{button_text}"):
+            command()
 
-    def show_dashboard(self):
-        self.clear_content()
-        tk.Label(self.content, text="Welcome to HERA Database",
+    def open_database(self):
+        # first visit to a data section: bring the schema up to date before any view queries it
+        from backends import env_db_config, connect_pool
+        from repositories import Repositories
+        from migrations import apply_migrations
+        try:
+            self.db_config = env_db_config()
+        except ValueError as err:
+            messagebox.showerror("Database Error", f"Error: {err}")
+            return False
+        # every statement is timed; slow ones (and their EXPLAIN) go to slow_queries.log
+        self.query_log = QueryLog(path="slow_queries.log", db_config=self.db_config)
+        self.db_pool = connect_pool(self.db_config, pool_size=self.pool_size, query_log=self.query_log)
+        self.repos = Repositories(self.db_pool)
+        self.views.versions = self.repos.versions
+        diagnostics = self.views.view("diagnostics")
+        if diagnostics is not None:
+            diagnostics.query_log = self.query_log
+            diagnostics.db_pool = self.db_pool
+        self.executor.submit(apply_migrations, self.db_pool,
+                             on_success=self.on_migrated, on_error=self.on_migration_error)
+        return True
+
+    def show_data_section(self, name):
+        if self.db_ready:
+            self.views.show(name)
+            return
+        if self.db_pool is None and not self.open_database():
+            return
+        self.views.show("connecting")
+
+    def on_migrated(self, applied):
+        self.db_ready = True
+        # the section the user is waiting for
+        if self.active_section in ("items", "customers", "suppliers", "orders"):
+            self.views.show(self.active_section)
+
+    def on_migration_error(self, err):
+        messagebox.showerror("Database Error", f"Error: {err}")
+        # still let the views open; they report their own errors
+        self.on_migrated([])
+
+    def on_busy_change(self, busy):
+        self.busy_label.config(text="Loading..." if busy else "")
+        self.root.config(cursor="watch" if busy else "")
+
+    def make_dashboard(self, parent):
+        frame = tk.Frame(parent, bg=self.bg_black)
+        tk.Label(frame, text="Welcome to HERA Database",
                  font=("Arial", 24), fg=self.lavender, bg=self.bg_black).place(relx=0.5, rely=0.5, anchor="center")
+        return frame
+
+    def make_items(self, parent):
+        from items_view import ItemView
+        return ItemView(parent, self.repos, self.executor)
+
+    def make_customers(self, parent):
+        from customers_view import CustomerView
+        return CustomerView(parent, self.repos, self.executor)
+
+    def make_suppliers(self, parent):
+        from suppliers_view import SupplierView
+        return SupplierView(parent, self.repos, self.executor)
+
+    def make_orders(self, parent):
+        from orders_view import OrderView
+        return OrderView(parent, self.repos, self.executor)
+
+    def make_diagnostics(self, parent):
+        from diagnostics_view import DiagnosticsView
+        return DiagnosticsView(parent, self.query_log, self.db_pool)
+
+    def make_connecting(self, parent):
+        frame = tk.Frame(parent, bg=self.bg_black)
+        tk.Label(frame, text="Connecting to the database...",
+                 font=("Arial", 20), fg=self.lavender, bg=self.bg_black).place(relx=0.5, rely=0.5, anchor="center")
+        return frame
+
+    def make_placeholder(self, parent):
+        frame = tk.Frame(parent, bg=self.bg_black)
+        tk.Label(frame, text="Section coming soon...",
+                 font=("Arial", 20), fg=self.lavender, bg=self.bg_black).place(relx=0.5, rely=0.5, anchor="center")
+        return frame
+
+    def show_dashboard(self):
+        self.views.show("dashboard")
 
     def show_items(self):
-        self.clear_content()
-        self.items_view = ItemView(self.content, self.db_config)
-        self.items_view.pack(fill="both", expand=True)
-        
+        self.show_data_section("items")
+
     def show_customers(self):
-        self.clear_content()
-        self.customers_view = CustomerView(self.content, self.db_config)
-        self.customers_view.pack(fill="both", expand=True)
-        
+        self.show_data_section("customers")
+
     def show_suppliers(self):
-        self.clear_content()
-        self.suppliers_view = SupplierView(self.content, self.db_config)
-        self.suppliers_view.pack(fill="both", expand=True)
-        
+        self.show_data_section("suppliers")
+
     def show_orders(self):
-        self.clear_content()
-        self.orders_view = OrderView(self.content, self.db_config)
-        self.orders_view.pack(fill="both", expand=True)
-        
+        self.show_data_section("orders")
+
+    def show_diagnostics(self):
+        self.views.show("diagnostics")
 
     def placeholder(self):
-        self.clear_content()
-        tk.Label(self.content, text="Section coming soon...",
-                 font=("Arial", 20), fg=self.lavender, bg=self.bg_black).place(relx=0.5, rely=0.5, anchor="center")
+        self.views.show("placeholder")
 
 
 if __name__ == "__main__":
+    # only the startup report goes to the console; slow queries keep to their own log
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(asctime)s %(name)s: %(message)s"))
+    logger.addHandler(console)
+    logger.setLevel(logging.INFO)
+    startup = ui_metrics.StartupTimer(STARTED)
+    startup.mark("imports")
     root = tk.Tk()
-    app = HERAGUI(root)
+    startup.mark("tk")
+    app = HERAGUI(root, startup)
     root.mainloop()
+    app.watchdog.stop()
+    app.executor.shutdown()
+    if app.db_pool is not None:
+        app.db_pool.close_all()
+        app.query_log.close()
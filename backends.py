@@ -0,0 +1,451 @@
+import functools
+import math
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from mysql.connector import errors
+from db_pool import ConnectionPool
+
+
+# The database engines the app runs on. MySQL is the default; SQLite keeps a
+# single-till shop (or a test or benchmark run) in one local file without a
+# server. The repositories and views keep writing MySQL SQL with %s
+# placeholders and catching mysql.connector errors: a SQLite connection
+# translates each statement (once, then cached), supplies the MySQL functions
+# SQLite lacks and raises mysql.connector errors, so nothing above the pool
+# needs a second branch.
+#
+# The engine is picked in the db config, {"engine": "sqlite", "path": ...};
+# env_db_config() builds it from HERA_DB_* environment variables.
+
+ENGINES = ("mysql", "sqlite")
+SQLITE_PATH = "flowershop.db"
+SQLITE_SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "flowershop_schema_sqlite.sql")
+# a new database gets the same sample rows as a MySQL install; orders need
+# the employee place_order books them under
+SQLITE_SAMPLE_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "flowershop_sample_data.sql")
+# the sample orders' stored totals, filled in like migration 2 does on MySQL
+SQLITE_SAMPLE_TOTALS = (
+    """
+    UPDATE Order_and_Payment SET Total_price = CASE
+            WHEN Order_status = 'Cancelled' THEN 0
+            ELSE IFNULL((
+                SELECT SUM(oi.Quantity * oi.Unit_price * (1 - IFNULL(i.Item_discount, 0)))
+                FROM Orders_Items oi
+                JOIN Item i ON oi.Item_id = i.Item_id
+                WHERE oi.Order_id = Order_and_Payment.Order_id
+            ), 0) * (1 - IFNULL(Order_discount, 0) / 100.0)
+        END
+    """,
+    "UPDATE Order_and_Payment SET Remaining_Payment = MAX(Total_price - IFNULL(Deposit, 0), 0)",
+)
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",  # readers never wait for the writer
+    "PRAGMA synchronous = NORMAL",  # with WAL only a power cut can lose the last commits
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 10000",  # wait for the writer like for a row lock, in ms
+    "PRAGMA cache_size = -32000",  # 32 MB page cache per connection
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",
+)
+# ORDER BY inside GROUP_CONCAT
+SQLITE_ORDERED_GROUP_CONCAT = sqlite3.sqlite_version_info >= (3, 44, 0)
+
+
+def env_db_config():
+    # the same defaults the desktop tools use, overridable per install
+    engine = os.environ.get("HERA_DB_ENGINE", "mysql")
+    if engine not in ENGINES:
+        raise ValueError(f"HERA_DB_ENGINE must be one of {', '.join(ENGINES)}, not {engine!r}")
+    if engine == "sqlite":
+        return {"engine": "sqlite", "path": os.environ.get("HERA_DB_PATH", SQLITE_PATH)}
+    return {
+        "engine": "mysql",
+        "host": os.environ.get("HERA_DB_HOST", "localhost"),
+        "user": os.environ.get("HERA_DB_USER", "root"),
+        "password": os.environ.get("HERA_DB_PASSWORD", "Root"),
+        "database": os.environ.get("HERA_DB_NAME", "flowershop_management")
+    }
+
+
+def add_db_arguments(parser):
+    # the command-line tools connect like the app, from HERA_DB_*, with these overrides
+    parser.add_argument("--sqlite", metavar="PATH", help="use this SQLite file (created if missing) instead of "
+                                                         "the HERA_DB_* settings")
+    parser.add_argument("--database", help="MySQL database instead of HERA_DB_NAME")
+
+
+def args_db_config(args):
+    # env_db_config() with the add_db_arguments() overrides; ValueError as there
+    if args.sqlite:
+        return {"engine": "sqlite", "path": args.sqlite}
+    db_config = env_db_config()
+    if args.database and db_config["engine"] == "mysql":
+        db_config["database"] = args.database
+    return db_config
+
+
+def connect_pool(db_config, pool_size=5, **kwargs):
+    # the connection pool for the configured engine; same interface either way
+    if db_config.get("engine", "mysql") == "sqlite":
+        return SQLitePool(db_config, pool_size=pool_size, **kwargs)
+    return ConnectionPool(db_config, pool_size=pool_size, **kwargs)
+
+
+# === Types ===
+# DECIMAL and DATE columns come back as Decimal and date, as from MySQL
+
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DECIMAL", lambda value: Decimal(value.decode()))
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()[:10]))
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+
+
+# === MySQL functions ===
+
+def _concat(*values):
+    # NULL if any argument is NULL, like MySQL
+    if any(value is None for value in values):
+        return None
+    return "".join(str(value) for value in values)
+
+
+FUNCTIONS = [
+    # (name, number of arguments, function, deterministic)
+    ("CONCAT", -1, _concat, True),
+]
+# only in SQLite builds with the math functions
+OPTIONAL_FUNCTIONS = [
+    ("FLOOR", 1, lambda value: math.floor(value) if value is not None else None, True),
+]
+
+
+# === SQL translation ===
+
+WRITE_RE = re.compile(r"^\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|ALTER|DROP)\b", re.I)
+FOR_UPDATE_RE = re.compile(r"\s+FOR\s+UPDATE\s*$", re.I)
+GROUP_CONCAT_RE = re.compile(
+    r"^(?P<expr>.*?)(?:\s+ORDER\s+BY\s+(?P<order>.*?))?\s+SEPARATOR\s+(?P<sep>'(?:[^']|'')*')\s*$", re.I | re.S
+)
+UPDATE_JOIN_RE = re.compile(r"^\s*UPDATE\s+(?P<table>\w+)\s+(?P<alias>\w+)\s+JOIN\s+\(", re.I)
+UPDATE_JOIN_REST_RE = re.compile(
+    r"^\s+(?:AS\s+)?(?P<name>\w+)\s+ON\s+(?P<on>.+?)\s+SET\s+(?P<set>.+?)(?:\s+WHERE\s+(?P<where>.+))?\s*$",
+    re.I | re.S
+)
+SET_SESSION_RE = re.compile(r"^\s*SET\s+SESSION\s+(?P<settings>.+?)\s*$", re.I | re.S)
+ANALYZE_RE = re.compile(r"^\s*ANALYZE\s+TABLE\b.*$", re.I | re.S)
+
+
+def _closing_paren(sql, start):
+    # index of the parenthesis closing the one at start, skipping string literals
+    depth = 0
+    quoted = False
+    for index in range(start, len(sql)):
+        char = sql[index]
+        if quoted:
+            quoted = char != "'"
+        elif char == "'":
+            quoted = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if not depth:
+                return index
+    raise errors.ProgrammingError(msg=f"Unbalanced parentheses in: {sql}")
+
+
+def _rewrite_calls(sql, name, rewrite):
+    # rewrite(arguments text) for every NAME(...) call, innermost ones included
+    pattern = re.compile(rf"\b{name}\s*\(", re.I)
+    position = 0
+    while True:
+        match = pattern.search(sql, position)
+        if match is None:
+            return sql
+        open_paren = match.end() - 1
+        close_paren = _closing_paren(sql, open_paren)
+        sql = sql[:match.start()] + rewrite(sql[open_paren + 1:close_paren]) + sql[close_paren + 1:]
+        position = match.start() + 1
+
+
+def _group_concat(arguments):
+    # GROUP_CONCAT(expr [ORDER BY ...] SEPARATOR 's') -> GROUP_CONCAT(expr, 's' [ORDER BY ...])
+    match = GROUP_CONCAT_RE.match(arguments)
+    if match is None:
+        return f"GROUP_CONCAT({arguments})"
+    order = f" ORDER BY {match['order']}" if match["order"] and SQLITE_ORDERED_GROUP_CONCAT else ""
+    return f"GROUP_CONCAT({match['expr']}, {match['sep']}{order})"
+
+
+def _update_join(sql, match):
+    # UPDATE t a JOIN (...) s ON cond SET a.col = ... -> UPDATE t AS a SET col = ... FROM (...) AS s WHERE cond
+    close_paren = _closing_paren(sql, match.end() - 1)
+    rest = UPDATE_JOIN_REST_RE.match(sql[close_paren + 1:])
+    if rest is None:
+        return sql
+    alias = match["alias"]
+    assignments = re.sub(rf"\b{alias}\.(\w+)(\s*=)", r"\1\2", rest["set"])
+    where = rest["on"] + (f" AND ({rest['where']})" if rest["where"] else "")
+    return (f"UPDATE {match['table']} AS {alias} SET {assignments} "
+            f"FROM {sql[match.end() - 1:close_paren + 1]} AS {rest['name']} WHERE {where}")
+
+
+def _date_part(form):
+    # MONTH(x) -> CAST(strftime('%m', x) AS INTEGER); native, unlike a Python function per row
+    return lambda arguments: f"CAST(strftime('{form}', {arguments}) AS INTEGER)"
+
+
+def _set_session(match):
+    # only foreign_key_checks has a SQLite counterpart; unique checks cannot be turned off
+    setting = re.search(r"\bforeign_key_checks\s*=\s*(\d)", match["settings"], re.I)
+    if setting is None:
+        return "SELECT 1"
+    return f"PRAGMA foreign_keys = {'ON' if setting.group(1) == '1' else 'OFF'}"
+
+
+@functools.lru_cache(maxsize=1024)
+def translate(query):
+    # (SQLite statement, whether it takes the write lock) for a MySQL statement
+    sql = query.replace("%s", "?")
+    locks = bool(FOR_UPDATE_RE.search(sql))
+    if locks:
+        # SQLite has no row locks; the write lock taken for it covers the rows
+        sql = FOR_UPDATE_RE.sub("", sql)
+    sql = _rewrite_calls(sql, "GROUP_CONCAT", _group_concat)
+    sql = _rewrite_calls(sql, "MONTH", _date_part("%m"))
+    sql = _rewrite_calls(sql, "YEAR", _date_part("%Y"))
+    sql = re.sub(r"\bGREATEST\s*\(", "MAX(", sql, flags=re.I)
+    sql = re.sub(r"\bLEAST\s*\(", "MIN(", sql, flags=re.I)
+    # 'now' is fixed for the whole statement, like in MySQL
+    sql = re.sub(r"\b(CURRENT_DATE|CURDATE)\s*\(\s*\)", "date('now', 'localtime')", sql, flags=re.I)
+    sql = re.sub(r"\bNOW\s*\(\s*\)", "datetime('now', 'localtime')", sql, flags=re.I)
+    match = UPDATE_JOIN_RE.match(sql)
+    if match is not None:
+        sql = _update_join(sql, match)
+    match = SET_SESSION_RE.match(sql)
+    if match is not None:
+        sql = _set_session(match)
+    if ANALYZE_RE.match(sql):
+        sql = "ANALYZE"
+    return sql, locks or bool(WRITE_RE.match(sql))
+
+
+# === Errors ===
+
+@contextmanager
+def mysql_errors():
+    # sqlite3 errors as the mysql.connector errors the callers already handle
+    try:
+        yield
+    except sqlite3.IntegrityError as err:
+        errno = 1062 if "UNIQUE" in str(err) else 1451  # ER_DUP_ENTRY, ER_ROW_IS_REFERENCED
+        raise errors.IntegrityError(msg=str(err), errno=errno) from err
+    except sqlite3.OperationalError as err:
+        message = str(err)
+        if "locked" in message or "busy" in message:
+            # busy_timeout ran out waiting for the writer: a lock wait
+            # timeout, which retry_deadlocks runs again
+            raise errors.OperationalError(msg=message, errno=1205) from err
+        if "syntax error" in message or "no such" in message:
+            raise errors.ProgrammingError(msg=message) from err
+        raise errors.OperationalError(msg=message) from err
+    except sqlite3.Error as err:
+        raise errors.DatabaseError(msg=str(err)) from err
+
+
+def script_statements(path):
+    # a .sql file as single statements, each ended by ";"; executescript()
+    # would commit the surrounding transaction first
+    statement = ""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            statement += line
+            if sqlite3.complete_statement(statement):
+                yield statement
+                statement = ""
+
+
+# === Connections ===
+
+class SQLiteCursor:
+    # the parts of a mysql.connector cursor the repositories use
+    def __init__(self, conn):
+        self._conn = conn
+        self._cursor = conn.raw.cursor()
+        self._fetched = 0  # rows read of the current result set
+
+    def execute(self, query, params=()):
+        sql, locks = translate(query)
+        self._fetched = 0
+        with mysql_errors():
+            if locks:
+                self._conn.begin()
+            self._cursor.execute(sql, tuple(params or ()))
+
+    def executemany(self, query, seq_params):
+        sql, locks = translate(query)
+        self._fetched = 0
+        with mysql_errors():
+            if locks:
+                self._conn.begin()
+            self._cursor.executemany(sql, [tuple(params) for params in seq_params])
+
+    def fetchone(self):
+        with mysql_errors():
+            row = self._cursor.fetchone()
+        if row is not None:
+            self._fetched += 1
+        return row
+
+    def fetchmany(self, size=1):
+        with mysql_errors():
+            rows = self._cursor.fetchmany(size)
+        self._fetched += len(rows)
+        return rows
+
+    def fetchall(self):
+        with mysql_errors():
+            rows = self._cursor.fetchall()
+        self._fetched += len(rows)
+        return rows
+
+    @property
+    def rowcount(self):
+        # sqlite3 has -1 for a SELECT; like a buffered mysql.connector cursor,
+        # count the rows read so far instead
+        if self._cursor.description is not None:
+            return self._fetched
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def with_rows(self):
+        # True when the statement returned a result set, as in mysql.connector
+        return self._cursor.description is not None
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    # Autocommit until a statement writes (or locks rows with FOR UPDATE):
+    # that opens BEGIN IMMEDIATE, so the transaction holds the database's one
+    # write lock from its first locking statement to commit()/rollback(), the
+    # way InnoDB holds the row locks. Plain reads outside a transaction see
+    # the last commit and never wait.
+    unread_result = False
+
+    def __init__(self, path):
+        self.raw = sqlite3.connect(path, isolation_level=None, check_same_thread=False,
+                                   detect_types=sqlite3.PARSE_DECLTYPES, cached_statements=256)
+        for pragma in SQLITE_PRAGMAS:
+            self.raw.execute(pragma)
+        for name, arguments, function, deterministic in FUNCTIONS:
+            self.raw.create_function(name, arguments, function, deterministic=deterministic)
+        for name, arguments, function, deterministic in OPTIONAL_FUNCTIONS:
+            try:
+                self.raw.execute(f"SELECT {name}({', '.join(['1'] * arguments)})")
+            except sqlite3.OperationalError:
+                self.raw.create_function(name, arguments, function, deterministic=deterministic)
+
+    @property
+    def in_transaction(self):
+        return self.raw.in_transaction
+
+    def begin(self):
+        if not self.raw.in_transaction:
+            self.raw.execute("BEGIN IMMEDIATE")
+
+    def cursor(self, *args, **kwargs):
+        # buffered/prepared make no difference here: rows are read as they are
+        # stepped through, and sqlite3 caches the compiled statements
+        return SQLiteCursor(self)
+
+    def commit(self):
+        with mysql_errors():
+            self.raw.commit()
+
+    def rollback(self):
+        with mysql_errors():
+            self.raw.rollback()
+
+    def ping(self, reconnect=False):
+        with mysql_errors():
+            self.raw.execute("SELECT 1")
+
+    def consume_results(self):
+        pass
+
+    def close(self):
+        self.raw.close()
+
+
+class SQLitePool(ConnectionPool):
+    # ConnectionPool over SQLite connections to one database file, created
+    # from flowershop_schema_sqlite.sql and flowershop_sample_data.sql the
+    # first time. Several connections
+    # still pay off under WAL: readers run alongside the one writer.
+    engine = "sqlite"
+
+    def __init__(self, db_config, pool_size=5, **kwargs):
+        super().__init__(db_config, pool_size=pool_size, **kwargs)
+        self.path = db_config.get("path", SQLITE_PATH)
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self):
+        with mysql_errors():
+            conn = SQLiteConnection(self.path)
+            try:
+                with self._schema_lock:
+                    if not self._schema_ready:
+                        self._create_schema(conn)
+                        self._schema_ready = True
+            except Exception:
+                conn.close()
+                raise
+        with self._cond:
+            self.metrics["created"] += 1
+        return conn
+
+    def _create_schema(self, conn):
+        # Schema and sample rows in one write transaction, checked for inside
+        # it: another process creating the same file waits, then finds the
+        # tables and does not insert the samples a second time
+        conn.raw.execute("BEGIN IMMEDIATE")
+        try:
+            if not conn.raw.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Item'").fetchone():
+                for path in (SQLITE_SCHEMA, SQLITE_SAMPLE_DATA):
+                    for statement in script_statements(path):
+                        conn.raw.execute(statement)
+                for statement in SQLITE_SAMPLE_TOTALS:
+                    conn.raw.execute(statement)
+            conn.raw.execute("COMMIT")
+        except Exception:
+            conn.raw.execute("ROLLBACK")
+            raise
+
+    def _is_healthy(self, conn, last_used):
+        # a local file does not drop the connection
+        return True
+
+    def prepared_cursor(self, conn, query):
+        return conn.cursor()
@@ -0,0 +1,272 @@
+import argparse
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+from argparse import Namespace
+from datetime import date
+import mysql.connector
+from backends import add_db_arguments, args_db_config, connect_pool
+from migrations import apply_migrations
+from repositories import Repositories, OrderFilter
+import datagen
+
+
+# Benchmarks for the SQL behind each view action, run through the same
+# repository methods the views call. Every query runs --runs times after
+# --warmup untimed runs; the report gives latency percentiles, rows returned
+# and rows scanned (the session's Handler_read_* counters, i.e. rows the
+# storage engine read to answer it).
+#
+# With --sizes the database is grown with datagen.py to each total order
+# count in turn and measured at every step, so run it against a scratch
+# database (--database). Results are compared against a stored baseline and
+# the exit code is 1 when a query got slower or scans more rows than the
+# tolerance allows; --save-baseline records the current numbers instead.
+#
+# --sqlite (or HERA_DB_ENGINE=sqlite, like the app) runs everything against a
+# local SQLite file instead (see backends.py), no server needed. SQLite has no
+# handler counters, so rows scanned are not measured there: the report says so,
+# the scanned column shows n/a and only latency regressions are checked. SQLite
+# results go to their own baseline.
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks_baseline.json")
+SQLITE_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks_baseline_sqlite.json")
+TOLERANCE = 0.25
+NOISE_MS = 5  # latency changes smaller than this are never regressions
+NOISE_ROWS = 100
+
+BENCHMARKS = [
+    # (view action, function of (repos, sample, run))
+    ("load_items", lambda repos, s, run: repos.items.list_items()),
+    ("search_items", lambda repos, s, run: repos.items.list_items(s["item_search"])),
+    ("load_customers", lambda repos, s, run: repos.customers.list_customers()),
+    ("show_monthly_customers", lambda repos, s, run: repos.customers.monthly_customers()),
+    ("show_new_customers", lambda repos, s, run: repos.customers.new_customers_this_month()),
+    ("load_suppliers", lambda repos, s, run: repos.suppliers.list_suppliers()),
+    ("load_orders", lambda repos, s, run: repos.orders.list_orders_page()[0]),
+    ("load_orders_filtered", lambda repos, s, run: repos.orders.list_orders_page(s["order_filter"])[0]),
+    ("show_order_details",
+     lambda repos, s, run: repos.orders.get_order_details(s["order_ids"][run % len(s["order_ids"])])[1]),
+]
+
+HANDLER_READS = ("Handler_read_first", "Handler_read_key", "Handler_read_last", "Handler_read_next",
+                 "Handler_read_prev", "Handler_read_rnd", "Handler_read_rnd_next")
+
+
+def scans_measured(db_pool):
+    return db_pool.engine == "mysql"
+
+
+def handler_reads(db_pool):
+    # the pool has one connection, so this is the session the queries ran in
+    if not scans_measured(db_pool):
+        return 0
+    conn = db_pool.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SHOW SESSION STATUS LIKE 'Handler_read%'")
+        return sum(int(value) for name, value in cursor.fetchall() if name in HANDLER_READS)
+    finally:
+        conn.close()
+
+
+def table_sizes(db_pool):
+    conn = db_pool.get_connection()
+    try:
+        cursor = conn.cursor()
+        sizes = {}
+        for table in ("Item", "Customer", "Supplier", "Order_and_Payment", "Orders_Items"):
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            sizes[table] = cursor.fetchone()[0]
+        return sizes
+    finally:
+        conn.close()
+
+
+def sample_parameters(db_pool, count=20):
+    # search text, filter and order ids spread over the whole id range, so
+    # show_order_details does not read the same cached pages every run
+    conn = db_pool.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT IFNULL(MIN(Order_id), 0), IFNULL(MAX(Order_id), 0) FROM Order_and_Payment")
+        low, high = cursor.fetchone()
+        order_ids = []
+        for n in range(count):
+            cursor.execute("SELECT MIN(Order_id) FROM Order_and_Payment WHERE Order_id >= %s",
+                           (low + (high - low) * n // count,))
+            order_id = cursor.fetchone()[0]
+            if order_id is not None:
+                order_ids.append(order_id)
+        cursor.execute("SELECT Name FROM Item WHERE Name IS NOT NULL ORDER BY Item_id LIMIT 1")
+        row = cursor.fetchone()
+    finally:
+        conn.close()
+    return {
+        "order_ids": order_ids or [0],
+        "item_search": row[0].split()[0][:3] if row else "Ros",
+        "order_filter": OrderFilter(status="Pending", date_from=date.today().replace(day=1)),
+    }
+
+
+def percentile(sorted_values, fraction):
+    # nearest rank
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+
+def run_benchmark(db_pool, repos, fn, sample, runs, warmup, overhead):
+    for run in range(warmup):
+        fn(repos, sample, run)
+    timings = []
+    scanned = []
+    returned = 0
+    for run in range(runs):
+        before = handler_reads(db_pool)
+        started = time.perf_counter()
+        rows = fn(repos, sample, run)
+        timings.append((time.perf_counter() - started) * 1000)
+        scanned.append(max(handler_reads(db_pool) - before - overhead, 0))
+        returned = len(rows)
+    timings.sort()
+    return {
+        "p50_ms": round(percentile(timings, 0.50), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "p99_ms": round(percentile(timings, 0.99), 2),
+        "max_ms": round(timings[-1], 2),
+        "rows": returned,
+        "rows_scanned": int(sorted(scanned)[len(scanned) // 2]) if scans_measured(db_pool) else None,
+    }
+
+
+def run_all(db_pool, runs, warmup, only=None):
+    repos = Repositories(db_pool)
+    sample = sample_parameters(db_pool)
+    # SHOW STATUS reads a few handler rows itself
+    first = handler_reads(db_pool)
+    overhead = handler_reads(db_pool) - first
+    results = {}
+    for name, fn in BENCHMARKS:
+        if only and name not in only:
+            continue
+        results[name] = run_benchmark(db_pool, repos, fn, sample, runs, warmup, overhead)
+    return results
+
+
+def grow_to(db_pool, orders, seed):
+    # adds orders (and customers at one per 20 orders) up to the target count
+    current = table_sizes(db_pool)
+    missing = orders - current["Order_and_Payment"]
+    if missing <= 0:
+        return
+    print(f"Generating {missing} orders")
+    datagen.generate(db_pool, Namespace(
+        customers=max(missing // 20, 1 if not current["Customer"] else 0),
+        orders=missing,
+        avg_lines=2.5,
+        items=max(500 - current["Item"], 0),
+        suppliers=50 if not current["Supplier"] else 0,
+        years=3,
+        seed=seed,
+        batch_size=datagen.BATCH_SIZE,
+    ), progress=lambda message: print(f"  {message}"))
+
+
+def compare(results, baseline, tolerance):
+    # [(size, benchmark, what, was, now)] for every regression
+    regressions = []
+    for size, benchmarks in results.items():
+        for name, now in benchmarks.items():
+            was = baseline.get(size, {}).get(name)
+            if was is None:
+                continue
+            if now["p95_ms"] > was["p95_ms"] * (1 + tolerance) and now["p95_ms"] - was["p95_ms"] > NOISE_MS:
+                regressions.append((size, name, "p95_ms", was["p95_ms"], now["p95_ms"]))
+            # None where the engine has no handler counters (SQLite)
+            if now["rows_scanned"] is None or was.get("rows_scanned") is None:
+                continue
+            if now["rows_scanned"] > was["rows_scanned"] * (1 + tolerance) + NOISE_ROWS:
+                regressions.append((size, name, "rows_scanned", was["rows_scanned"], now["rows_scanned"]))
+    return regressions
+
+
+def print_results(size, sizes, results, baseline):
+    print(f"\n{size}: " + ", ".join(f"{table} {count}" for table, count in sizes.items()))
+    print(f"{'query':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rows':>9}{'scanned':>11}{'base p95':>10}")
+    for name, result in results.items():
+        was = baseline.get(name)
+        base = f"{was['p95_ms']:.2f}" if was else "-"
+        scanned = result["rows_scanned"] if result["rows_scanned"] is not None else "n/a"
+        print(f"{name:<24}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+              f"{result['rows']:>9}{scanned:>11}{base:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the SQL behind each view")
+    add_db_arguments(parser)
+    parser.add_argument("--sizes", help="comma separated total order counts to grow the database to, e.g. "
+                                        "10000,100000,1000000 (writes generated data!)")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--only", help="comma separated benchmark names")
+    parser.add_argument("--baseline", help=f"default {BASELINE_PATH}, or {SQLITE_BASELINE_PATH} with --sqlite")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        db_config = args_db_config(args)
+    except ValueError as err:
+        sys.exit(f"Error: {err}")
+    args.baseline = args.baseline or (SQLITE_BASELINE_PATH if db_config["engine"] == "sqlite" else BASELINE_PATH)
+    # one connection, so the handler counters belong to the queries' session
+    db_pool = connect_pool(db_config, pool_size=1)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    ok = True
+    try:
+        apply_migrations(db_pool, log=print)
+        if not scans_measured(db_pool):
+            print(f"Note: rows scanned are not measured on {db_pool.engine}; only latency regressions are checked")
+        only = set(args.only.split(",")) if args.only else None
+        steps = [int(size) for size in args.sizes.split(",")] if args.sizes else [None]
+        results = {}
+        for step, size in enumerate(steps):
+            if size is not None:
+                grow_to(db_pool, size, args.seed + step)
+            label = str(size) if size is not None else "current"
+            results[label] = run_all(db_pool, args.runs, args.warmup, only)
+            print_results(label, table_sizes(db_pool), results[label], baseline.get(label, {}))
+
+        if args.save_baseline:
+            for label, benchmarks in results.items():
+                baseline.setdefault(label, {}).update(benchmarks)
+            with open(args.baseline, "w") as f:
+                json.dump(baseline, f, indent=2, sort_keys=True)
+            print(f"\nBaseline saved to {args.baseline}")
+        else:
+            regressions = compare(results, baseline, args.tolerance)
+            for label, name, what, was, now in regressions:
+                print(f"REGRESSION {label} {name}: {what} {was} -> {now}")
+            if not baseline:
+                print("\nNo baseline yet; run with --save-baseline to record one")
+            elif not regressions:
+                print("\nNo regressions against the baseline")
+            if baseline and not scans_measured(db_pool):
+                print(f"Scan regressions disabled: no handler counters on {db_pool.engine}")
+            ok = not regressions
+    # SQLite failures normally arrive as mysql.connector errors (backends.mysql_errors);
+    # sqlite3.Error covers anything raised outside it, OSError a bad database path
+    except (mysql.connector.Error, sqlite3.Error, OSError) as err:
+        print(f"Error: {err}")
+        ok = False
+    finally:
+        db_pool.close_all()
+
+    sys.exit(0 if ok else 1)
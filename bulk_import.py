@@ -0,0 +1,298 @@
+import argparse
+import csv
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import mysql.connector
+from backends import add_db_arguments, args_db_config, connect_pool
+from repositories import SupplierRepository
+
+
+# Bulk CSV import for items, customers and suppliers, e.g. a supplier's whole
+# catalog or a customer list from another system. The file is read as a
+# stream and handled BATCH_SIZE rows at a time: each batch is validated in
+# memory, duplicates are caught against a set of the names already in the
+# database (loaded once up front), and the good rows go in with one
+# executemany, i.e. one multi-row INSERT per batch, committed per batch.
+# Bad rows are skipped and reported with their line number.
+#
+# LOAD DATA LOCAL INFILE would be faster still, but needs local_infile
+# enabled on both server and client and gives no per-row validation.
+#
+# Column headers are the database column names, so a file written by
+# export.py can be imported again:
+#   items:     Name, Type, Arrival_date, Item_discount, Price_amount, Price_date,
+#              Stock_quantity, Suppliers (optional, supplier names separated by ";")
+#   customers: Name, Phone, Loyalty_points
+#   suppliers: Name, Contact, Items (optional, item names separated by ";")
+# Dates are YYYY-MM-DD and Item_discount is a fraction (0.10 = 10%), as stored.
+
+BATCH_SIZE = 500
+
+
+class ImportReport:
+    def __init__(self, kind):
+        self.kind = kind
+        self.read = 0
+        self.imported = 0
+        self.skipped = 0
+        self.links = 0
+        self.errors = []  # (line number, message); a bad link does not skip its row
+        self.started = time.perf_counter()
+
+    def reject(self, line, message):
+        self.skipped += 1
+        self.errors.append((line, message))
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def rate(self):
+        elapsed = self.elapsed()
+        return self.read / elapsed if elapsed else 0.0
+
+    def __str__(self):
+        text = (f"{self.kind}: {self.imported} imported, {self.skipped} skipped of {self.read} rows "
+                f"in {self.elapsed():.1f}s ({self.rate():.0f} rows/s)")
+        if self.links:
+            text += f", {self.links} supplier links"
+        return text
+
+
+def name_key(name):
+    # MySQL's default collation compares names case-insensitively
+    return name.strip().casefold()
+
+
+def split_names(value):
+    return [name.strip() for name in (value or "").split(";") if name.strip()]
+
+
+def text(row, column, required=False):
+    value = (row.get(column) or "").strip()
+    if required and not value:
+        raise ValueError(f"{column} is required")
+    return value or None
+
+
+def date_value(row, column):
+    value = text(row, column)
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"{column} must be YYYY-MM-DD, got '{value}'")
+
+
+def number(row, column, default=None, kind=Decimal):
+    value = text(row, column)
+    if value is None:
+        if default is None:
+            raise ValueError(f"{column} is required")
+        return default
+    try:
+        return kind(value)
+    except (ValueError, InvalidOperation):
+        raise ValueError(f"{column} must be a number, got '{value}'")
+
+
+def parse_item(row):
+    values = (
+        text(row, "Name", required=True),
+        text(row, "Type"),
+        date_value(row, "Arrival_date"),
+        number(row, "Item_discount", Decimal(0)),
+        number(row, "Price_amount"),
+        date_value(row, "Price_date"),
+        number(row, "Stock_quantity", 0, int),
+    )
+    if not 0 <= values[3] <= 1:
+        raise ValueError("Item_discount must be between 0 and 1")
+    if values[6] < 0:
+        raise ValueError("Stock_quantity cannot be negative")
+    return values, name_key(values[0]), split_names(row.get("Suppliers"))
+
+
+def parse_customer(row):
+    values = (
+        text(row, "Name", required=True),
+        text(row, "Phone", required=True),
+        number(row, "Loyalty_points", 0, int),
+    )
+    # customers are told apart by name and phone, like the order wizard does
+    return values, (name_key(values[0]), values[1]), []
+
+
+def parse_supplier(row):
+    values = (
+        text(row, "Name", required=True),
+        text(row, "Contact"),
+    )
+    return values, name_key(values[0]), split_names(row.get("Items"))
+
+
+KINDS = {
+    # kind: (parse, INSERT, SELECT of the existing keys)
+    "items": (
+        parse_item,
+        """INSERT INTO Item (Name, Type, Arrival_date, Item_discount, Price_amount, Price_date, Stock_quantity)
+           VALUES (%s, %s, %s, %s, %s, %s, %s)""",
+        "SELECT Name FROM Item",
+    ),
+    "customers": (
+        parse_customer,
+        "INSERT INTO Customer (Name, Phone, Loyalty_points) VALUES (%s, %s, %s)",
+        "SELECT Name, Phone FROM Customer",
+    ),
+    "suppliers": (
+        parse_supplier,
+        "INSERT INTO Supplier (Name, Contact) VALUES (%s, %s)",
+        "SELECT Name FROM Supplier",
+    ),
+}
+
+
+def existing_keys(db_pool, kind, query):
+    conn = db_pool.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query)
+        if kind == "customers":
+            return {(name_key(name or ""), phone) for name, phone in cursor.fetchall()}
+        return {name_key(name or "") for (name,) in cursor.fetchall()}
+    finally:
+        conn.close()
+
+
+def ids_by_name(db_pool, table, id_column, names):
+    # {name key: id}, looked up BATCH_SIZE names at a time
+    names = sorted(set(names))
+    found = {}
+    conn = db_pool.get_connection()
+    try:
+        cursor = conn.cursor()
+        for start in range(0, len(names), BATCH_SIZE):
+            batch = names[start:start + BATCH_SIZE]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(f"SELECT {id_column}, Name FROM {table} WHERE Name IN ({placeholders})", tuple(batch))
+            found.update({name_key(name): row_id for row_id, name in cursor.fetchall()})
+    finally:
+        conn.close()
+    return found
+
+
+def insert_batch(db_pool, query, rows):
+    conn = db_pool.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(query, rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def import_links(db_pool, kind, pending, report):
+    # pending: (line, own name, [linked names]) for rows that were imported.
+    # Links only ever get added; existing ones stay.
+    if not pending:
+        return
+    if kind == "items":
+        own = ids_by_name(db_pool, "Item", "Item_id", [name for _, name, _ in pending])
+        other = ids_by_name(db_pool, "Supplier", "Supplier_id", [n for _, _, names in pending for n in names])
+    else:
+        own = ids_by_name(db_pool, "Supplier", "Supplier_id", [name for _, name, _ in pending])
+        other = ids_by_name(db_pool, "Item", "Item_id", [n for _, _, names in pending for n in names])
+
+    links = {}
+    for line, name, names in pending:
+        for linked in names:
+            linked_id = other.get(name_key(linked))
+            if linked_id is None:
+                report.errors.append((line, f"no {'supplier' if kind == 'items' else 'item'} named '{linked}'"))
+                continue
+            if kind == "items":
+                links.setdefault(linked_id, set()).add(own[name_key(name)])
+            else:
+                links.setdefault(own[name_key(name)], set()).add(linked_id)
+    if links:
+        report.links = SupplierRepository(db_pool).sync_links(links, additive=True)
+
+
+def import_csv(db_pool, kind, path, batch_size=BATCH_SIZE, dry_run=False, progress=None):
+    # progress(report) is called after every batch; returns the ImportReport
+    parse, insert_query, keys_query = KINDS[kind]
+    report = ImportReport(kind)
+    seen = existing_keys(db_pool, kind, keys_query)
+    pending_links = []
+    batch = []
+
+    def flush():
+        if batch and not dry_run:
+            insert_batch(db_pool, insert_query, batch)
+        report.imported += len(batch)
+        batch.clear()
+        if progress is not None:
+            progress(report)
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            report.read += 1
+            line = reader.line_num
+            try:
+                values, key, linked = parse(row)
+            except ValueError as err:
+                report.reject(line, str(err))
+                continue
+            if key in seen:
+                report.reject(line, f"'{values[0]}' already exists")
+                continue
+            seen.add(key)
+            batch.append(values)
+            if linked:
+                pending_links.append((line, values[0], linked))
+            if len(batch) >= batch_size:
+                flush()
+    flush()
+
+    if not dry_run:
+        import_links(db_pool, kind, pending_links, report)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import items, customers or suppliers from CSV")
+    parser.add_argument("kind", choices=sorted(KINDS))
+    parser.add_argument("path", help="CSV file with a header row")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="validate only, write nothing")
+    add_db_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        db_config = args_db_config(args)
+    except ValueError as err:
+        sys.exit(f"Error: {err}")
+    db_pool = connect_pool(db_config, pool_size=2)
+
+    try:
+        report = import_csv(
+            db_pool, args.kind, args.path, args.batch_size, args.dry_run,
+            progress=lambda report: print(f"{report.read} rows read, {report.rate():.0f} rows/s")
+        )
+        for line, message in report.errors[:50]:
+            print(f"Line {line}: {message}")
+        if len(report.errors) > 50:
+            print(f"... and {len(report.errors) - 50} more")
+        print(report)
+        if args.dry_run:
+            print("Dry run: nothing was written")
+    except (mysql.connector.Error, OSError) as err:
+        print(f"Error: {err}")
+    finally:
+        db_pool.close_all()
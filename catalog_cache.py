@@ -0,0 +1,125 @@
+import threading
+import time
+from datetime import date
+from repositories import ItemOption
+
+# seconds a loaded list is trusted; writes from other terminals or processes
+# never reach invalidate(), so after this the whole list is read again
+CATALOG_MAX_AGE = 60
+
+
+def item_list_order(row):
+    # same order as ItemRepository.LIST_QUERY: newest arrival first, NULL dates last
+    return (row.arrival_date or date.min, row.item_id)
+
+
+class ItemCatalog:
+    # One in-process copy of the item list shared by every screen: the item
+    # list, the order item pickers and the supplier item checkboxes all read it
+    # instead of querying Item themselves.
+    #
+    # Repositories call invalidate() after committing a write that touches
+    # items (item edits, order stock changes, supplier links). Changed ids are
+    # only marked dirty and re-read on the next access; version goes up on
+    # every invalidation so a load that raced with a write is thrown away.
+    # Writes made elsewhere are only picked up by the full reload once the
+    # list is older than max_age, or by invalidate() with no ids.
+    # Methods may be called from any thread; the ones that can hit the
+    # database belong on the executor.
+    def __init__(self, item_repo, max_age=CATALOG_MAX_AGE):
+        self.item_repo = item_repo
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._rows = None  # ItemListRow list in item list order, None until loaded
+        self._loaded_at = 0.0  # monotonic time the full list was read
+        self._by_id = {}
+        self._dirty = set()  # ids changed since _rows was loaded
+        self.version = 0
+        self.metrics = {"hits": 0, "loads": 0, "refreshes": 0, "invalidations": 0}
+
+    def invalidate(self, item_ids=None):
+        # item_ids=None drops everything
+        with self._lock:
+            self.version += 1
+            self.metrics["invalidations"] += 1
+            if item_ids is None:
+                self._rows = None
+                self._by_id = {}
+                self._dirty.clear()
+            elif self._rows is not None:
+                self._dirty.update(item_ids)
+
+    def is_loaded(self):
+        # loaded and still young enough to be served
+        with self._lock:
+            return self._rows is not None and time.monotonic() - self._loaded_at <= self.max_age
+
+    def _load(self, rows, loaded_at):
+        self._install(rows)
+        self._loaded_at = loaded_at
+        self.metrics["loads"] += 1
+
+    def _install(self, rows):
+        self._rows = rows
+        self._by_id = {row.item_id: row for row in rows}
+        self._dirty.clear()
+
+    def _refresh(self):
+        # lock held; re-read only the dirty rows and patch them in
+        dirty = set(self._dirty)
+        fresh = {row.item_id: row for row in self.item_repo.list_items_by_id(dirty)}
+        by_id = {item_id: row for item_id, row in self._by_id.items() if item_id not in dirty}
+        by_id.update(fresh)
+        self._install(sorted(by_id.values(), key=item_list_order, reverse=True))
+        self.metrics["refreshes"] += 1
+
+    def _ensure(self):
+        # lock held
+        if not self.is_loaded():
+            loaded_at = time.monotonic()
+            self._load(self.item_repo.list_items(), loaded_at)
+        elif self._dirty:
+            self._refresh()
+        else:
+            self.metrics["hits"] += 1
+
+    def items(self):
+        with self._lock:
+            self._ensure()
+            return list(self._rows)
+
+    def get(self, item_id):
+        with self._lock:
+            self._ensure()
+            return self._by_id.get(item_id)
+
+    def options(self, in_stock_only=False):
+        # pickers list items by name, like ItemRepository.list_options
+        rows = self.items()
+        if in_stock_only:
+            rows = [row for row in rows if row.stock_quantity > 0]
+        rows.sort(key=lambda row: (row.name or "").lower())
+        return [ItemOption(row.item_id, row.name, row.price, row.discount, row.stock_quantity) for row in rows]
+
+    def stream_items(self, chunk_size=None):
+        # chunks for DBExecutor.stream: straight from memory when loaded,
+        # otherwise off the database while the cache fills up
+        chunk_size = chunk_size or self.item_repo.STREAM_CHUNK_SIZE
+        if self.is_loaded():
+            rows = self.items()
+            for start in range(0, len(rows), chunk_size):
+                yield rows[start:start + chunk_size]
+            return
+
+        with self._lock:
+            version = self.version
+        loaded_at = time.monotonic()
+        rows = []
+        for chunk in self.item_repo.stream_items(chunk_size=chunk_size):
+            rows.extend(chunk)
+            yield chunk
+
+        with self._lock:
+            # a write landed while we streamed: these rows may predate it
+            if self.version == version and not self.is_loaded():
+                self._load(rows, loaded_at)
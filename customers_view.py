@@ -1,13 +1,22 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import mysql.connector
+from backends import env_db_config, connect_pool
+from db_executor import DBExecutor
+from repositories import Repositories
+from search_index import PrefixIndex, Debouncer
+from tree_rows import TreeRows
+from ui_metrics import measured
+from export import start_export
 from datetime import datetime
 
 class CustomerView(tk.Frame):
-    def __init__(self, parent, db_config):
+    def __init__(self, parent, repos, executor):
         super().__init__(parent)
         self.parent = parent
-        self.db_config = db_config
+        self.repos = repos
+        self.customer_repo = repos.customers
+        self.executor = executor
+        self.section = "customers"
         self.lavender = "#E6E6FA"
         self.configure(bg=self.lavender)
 
@@ -19,6 +28,10 @@ class CustomerView(tk.Frame):
         self.search_var = tk.StringVar()
         self.search_entry = tk.Entry(search_frame, textvariable=self.search_var)
         self.search_entry.pack(side="left", padx=(0, 5))
+        # typing filters the list by name or phone; the button opens the order history
+        self.customer_index = None
+        self.search_debouncer = Debouncer(self, 250, self.filter_customers)
+        self.search_var.trace_add("write", self.search_debouncer)
         search_btn = tk.Button(search_frame, text="Search", command=self.search_customers)
         search_btn.pack(side="left", padx=(0, 10))
         
@@ -28,6 +41,8 @@ class CustomerView(tk.Frame):
         new_customers_btn= tk.Button(search_frame, text= "New this Month", command= self.show_new_customers)
         new_customers_btn.pack(side= "left", padx= (5, 0))
 
+        tk.Button(search_frame, text="Export", command=self.export_customers).pack(side="right")
+
 
         # Treeview Frame and Scrollbar 
         tree_frame= tk.Frame(self)
@@ -57,45 +72,107 @@ class CustomerView(tk.Frame):
         self.tree.configure(cursor="hand2")
 
         self.tree.bind("<Button-1>", self.handle_click)
+        # rows are keyed by Customer_id, so saves and deletes patch just their row
+        self.rows = TreeRows(self.tree, self.customer_row)
 
         self.load_customers()
 
-    def connect_db(self):
-        return mysql.connector.connect(
-            host=self.db_config.get("host", "localhost"),
-            user=self.db_config.get("user", "your_mysql_username"),
-            password=self.db_config.get("password", "your_mysql_password"),
-            database=self.db_config.get("database", "flowershop_management")
-        )
+    def export_customers(self):
+        start_export(self, self.executor, self.repos, "customers")
+
+    def refresh(self):
+        # shown again after its data changed; the type-ahead filter is reapplied
+        # once the new list is indexed
+        self.load_customers()
+
+    def show_db_error(self, err):
+        messagebox.showerror("Database Error", f"Error: {err}")
 
     def load_customers(self):
-        try:
-            conn = self.connect_db()
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT Customer_id, Name, Phone, Loyalty_points FROM Customer ORDER BY Customer_id DESC"
+        # rows come in chunks off a streaming cursor; the old rows stay on screen
+        # until the first chunk lands
+        state = {"started": False, "rows": []}
+        self.customer_index = None
+        # a pending search would land on top of the full list
+        self.executor.cancel_key("customers.search")
+
+        def showing():
+            # the full list is still read for the type-ahead index while a
+            # search is typed, but its rows do not replace the matches
+            return not self.search_var.get().strip()
+
+        def on_chunk(customers):
+            state["rows"].extend(customers)
+            if not showing():
+                return
+            if state["started"]:
+                self.insert_customers(customers)
+            else:
+                state["started"] = True
+                self.display_customers(customers)
+
+        def on_done(_):
+            if not state["started"] and showing():
+                self.display_customers([])
+            # full list is in memory now: index it off the Tk thread for type-ahead
+            self.executor.submit(
+                PrefixIndex, state["rows"], ("name", "phone"), on_success=self.set_customer_index,
+                group=self.section, key="customers.index", owner=self
             )
-            customers = cursor.fetchall()
-            conn.close()
-            self.display_customers(customers)
 
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        self.executor.stream(
+            self.customer_repo.stream_customers,
+            on_chunk=on_chunk, on_done=on_done, on_error=self.show_db_error,
+            group=self.section, key="customers.list", owner=self
+        )
 
     def display_customers(self, customers):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-
-        for customer in customers:
-            customer_id, name, phone_, loyalty_pnts= customer
-
-            self.tree.insert(
-                "", "end",
-                values=(
-                    "🖉 edit",  
-                    customer_id, name, phone_, loyalty_pnts, "🗑️"
-                ),
-                tags=(f"id_{customer_id}",)
+        self.rows.render(customers)
+
+    def insert_customers(self, customers):
+        self.rows.append(customers)
+
+    def customer_row(self, customer):
+        customer_id, name, phone_, loyalty_pnts= customer
+
+        values = (
+            "🖉 edit",  
+            customer_id, name, phone_, loyalty_pnts, "🗑️"
+        )
+        return customer_id, values, ()
+
+    def set_customer_index(self, index):
+        self.customer_index = index
+        # catch up with anything typed while the list was loading
+        if self.search_var.get().strip():
+            self.filter_customers()
+
+    def show_saved_customer(self, customer):
+        # patch the saved row into the list and the type-ahead index
+        self.rows.put(customer)
+        if self.customer_index is not None:
+            self.customer_index.put(customer)
+
+    def forget_customer(self, customer_id):
+        self.rows.remove(customer_id)
+        if self.customer_index is not None:
+            self.customer_index.remove(customer_id)
+
+    def filter_customers(self):
+        # type-ahead: from the local index once the full list is loaded,
+        # otherwise from the database (a newer query supersedes the pending one;
+        # the full load keeps going under its own key and builds the index)
+        search_text = self.search_var.get().strip()
+        if self.customer_index is not None:
+            self.executor.cancel_key("customers.search")
+            self.display_customers(self.customer_index.search(search_text))
+        elif not search_text:
+            self.load_customers()
+        else:
+            self.executor.submit(
+                self.customer_repo.find_customers, search_text,
+                on_success=self.display_customers, on_error=self.show_db_error,
+                group=self.section, key="customers.search", owner=self
             )
 
     def search_customers(self):
@@ -103,38 +180,19 @@ class CustomerView(tk.Frame):
         if not search_text:
             messagebox.showinfo("Search", "Please enter a customer name to search.")
             return
-        try:
-            conn = self.connect_db()
-            cursor = conn.cursor()
-            query = ("""
-                SELECT
-                    c.Customer_id,
-                    c.Name,
-                    o.Order_id,
-                    o.Payment_date,
-                    o.Total_price,
-                    GROUP_CONCAT(CONCAT(i.Name, ' (', oi.Quantity, ')') SEPARATOR ', ') AS Items,
-                    o.Order_status
-                FROM Customer c
-                JOIN Order_and_Payment o ON c.Customer_id = o.Customer_id
-                JOIN Orders_Items oi ON o.Order_id = oi.Order_id
-                JOIN Item i ON oi.Item_id = i.Item_id
-                WHERE c.Name LIKE %s
-                GROUP BY c.Customer_id, c.Name, o.Order_id, o.Payment_date, o.Total_price, o.Order_status
-                ORDER BY o.Payment_date DESC
-            """)
-            cursor.execute(query, (f"%{search_text}%",))
-            results = cursor.fetchall()
-            conn.close()
+        self.search_debouncer.cancel()
 
+        def on_results(results):
             if results:
                 self.show_order_history_window(results)
             else:
                 messagebox.showinfo("Search", f"No orders found for '{search_text}'")
-            
 
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        self.executor.submit(
+            self.customer_repo.order_history, search_text,
+            on_success=on_results, on_error=self.show_db_error,
+            group=self.section, key="customers.history", owner=self
+        )
             
     def show_order_history_window(self, data):
         
@@ -167,56 +225,31 @@ class CustomerView(tk.Frame):
         self.search_var.set("")  
 
     def show_monthly_customers(self):
-        try:
-            conn= self.connect_db()
-            cursor= conn.cursor()
-            cursor.execute("""
-                SELECT DISTINCT c.Customer_id, c.Name, c.Phone, c.Loyalty_points
-                FROM Customer c
-                JOIN Order_and_Payment o ON c.Customer_id = o.Customer_id
-                WHERE MONTH(o.Payment_date) = MONTH(CURRENT_DATE())
-                AND YEAR(o.Payment_date) = YEAR(CURRENT_DATE())
-                ORDER BY c.Name
-            """)
-            
-            customers= cursor.fetchall()
-            conn.close()
-            
+        def on_results(customers):
             if customers:
                 self.show_customer_list_window("Customers with Orders This Month", customers)
             else:
                 messagebox.showinfo("This Month's Customers", "No customers with orders this month")
-            
-        except mysql.connector.Error as err:
-            messagebox.showerror("Error", f"{err}")
+
+        self.executor.submit(
+            self.customer_repo.monthly_customers,
+            on_success=on_results, on_error=lambda err: messagebox.showerror("Error", f"{err}"),
+            group=self.section, key="customers.monthly", owner=self
+        )
             
     
     def show_new_customers(self):
-        try:
-            conn= self.connect_db()
-            cursor= conn.cursor()
-            cursor.execute("""
-                SELECT c.Customer_id, c.Name, c.Phone, c.Loyalty_points
-                FROM Customer c
-                WHERE c.Customer_id IN (
-                    SELECT o.Customer_id
-                    FROM Order_and_Payment o
-                    GROUP BY o.Customer_id
-                    HAVING MONTH(MIN(o.Payment_date)) = MONTH(CURRENT_DATE())
-                        AND YEAR(MIN(o.Payment_date)) = YEAR(CURRENT_DATE())
-                )
-                ORDER BY c.Name             
-            """)
-            customers= cursor.fetchall()
-            conn.close()
-            
+        def on_results(customers):
             if customers:
                 self.show_customer_list_window("New Customers This Month", customers)
             else:
                 messagebox.showinfo("New Customers This Month", "No new customers this month")
-            
-        except mysql.connector.Error as err:
-            messagebox.showerror("Error", f"{err}")
+
+        self.executor.submit(
+            self.customer_repo.new_customers_this_month,
+            on_success=on_results, on_error=lambda err: messagebox.showerror("Error", f"{err}"),
+            group=self.section, key="customers.new", owner=self
+        )
             
     def show_customer_list_window(self, title, customers):
         result_win= tk.Toplevel(self)
@@ -239,6 +272,7 @@ class CustomerView(tk.Frame):
         tree.pack(fill= "both", expand= True)
             
 
+    @measured
     def handle_click(self, event):
         region = self.tree.identify("region", event.x, event.y)
         if region == "cell":
@@ -248,121 +282,103 @@ class CustomerView(tk.Frame):
             if not row_id:
                 return
 
-            customer_values = self.tree.item(row_id, "values")
-            tags= self.tree.item(row_id, "tags")
-            item_id_tag= tags[0]
-            if not item_id_tag.startswith("id_"):
-                return
-            customer_id= item_id_tag[3:]
+            # the row's iid is its Customer_id
+            customer_id = int(row_id)
 
             if col == "#1":  # Edit icon column
                 self.edit_customer(customer_id)
             elif col == "#6":  # Delete icon column
                 self.delete_customer(customer_id)
-                
-            print("Clicked column:", col, "customer_id:", customer_id)
 
     def delete_customer(self, customer_id):
         answer = messagebox.askyesno("Delete Customer", f"Are you sure you want to delete this customer?")
         if answer:
-            try:
-                conn = self.connect_db()
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM Customer WHERE Customer_id = %s", (customer_id,))
-                conn.commit()
-                
-                if cursor.rowcount == 0:
+            def on_deleted(rowcount):
+                if rowcount == 0:
                     messagebox.showwarning("Delete Failed", "Customer not found or could not be deleted.")
-                    
-                conn.close()
-                messagebox.showinfo("Deleted", "Customer was deleted successfully.")
-                self.load_customers()
-                
-            except mysql.connector.Error as err:
-                messagebox.showerror("Database Error", f"Error: {err}")
+                else:
+                    messagebox.showinfo("Deleted", "Customer was deleted successfully.")
+                self.forget_customer(customer_id)
 
-    def edit_customer(self, customer_id):
-        try:
-            conn = self.connect_db()
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT Name, Phone, Loyalty_points FROM Customer WHERE Customer_id = %s", (customer_id,)
+            self.executor.submit(
+                self.customer_repo.delete_customer, customer_id,
+                on_success=on_deleted, on_error=self.show_db_error, owner=self
             )
-            item = cursor.fetchone()
-            conn.close()
-
-            if not item:
-                messagebox.showerror("Error", "No customer found")
-                return
 
-            # Create the edit popup
-            edit_win = tk.Toplevel(self)
-            edit_win.title(f"Edit Customer")
-            edit_win.geometry("400x400")
-            edit_win.configure(bg=self.lavender)
-
-            labels = [
-                "Name", "Phone", "Loyalty Points"
-            ]
-            
-            entries = []
+    def edit_customer(self, customer_id):
+        self.executor.submit(
+            self.customer_repo.get_customer, customer_id,
+            on_success=lambda customer: self.open_edit_window(customer_id, customer), on_error=self.show_db_error,
+            group=self.section, key="customers.edit", owner=self
+        )
 
-            for idx, (label, value) in enumerate(zip(labels, item)):
-                tk.Label(edit_win, text=label + ":", bg=self.lavender).pack(pady=(10 if idx == 0 else 5, 0))
-                entry = tk.Entry(edit_win)
-                entry.pack()
-                entry.insert(0, str(value if value is not None else ""))
-                entries.append(entry)
+    def open_edit_window(self, customer_id, customer):
+        if not customer:
+            messagebox.showerror("Error", "No customer found")
+            return
 
-            def save_changes():
-                new_values = [e.get().strip() for e in entries]
+        # Create the edit popup
+        edit_win = tk.Toplevel(self)
+        edit_win.title(f"Edit Customer")
+        edit_win.geometry("400x400")
+        edit_win.configure(bg=self.lavender)
 
-                if not all(new_values):
-                    messagebox.showwarning("Missing Info", "All fields are required.")
-                    return
+        labels = [
+            "Name", "Phone", "Loyalty Points"
+        ]
+        values = [customer.name, customer.phone, customer.loyalty_points]
+        
+        entries = []
 
-                try:
-                    new_name = new_values[0]
-                    phone_ = new_values[1]
-                    loyalty_pnts = int(new_values[2])
+        for idx, (label, value) in enumerate(zip(labels, values)):
+            tk.Label(edit_win, text=label + ":", bg=self.lavender).pack(pady=(10 if idx == 0 else 5, 0))
+            entry = tk.Entry(edit_win)
+            entry.pack()
+            entry.insert(0, str(value if value is not None else ""))
+            entries.append(entry)
 
-                    conn = self.connect_db()
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                        UPDATE Customer
-                        SET Name=%s, Phone=%s, Loyalty_points=%s
-                        WHERE Customer_id=%s
-                    """, (new_name, phone_, loyalty_pnts, customer_id))
-                    conn.commit()
-                    conn.close()
+        def save_changes():
+            new_values = [e.get().strip() for e in entries]
 
-                    messagebox.showinfo("Success", "Customer updated.")
-                    edit_win.destroy()
-                    self.load_customers()
+            if not all(new_values):
+                messagebox.showwarning("Missing Info", "All fields are required.")
+                return
 
-                except Exception as e:
-                    messagebox.showerror("Error", f"Invalid input or database error:\n{e}")
+            try:
+                new_name = new_values[0]
+                phone_ = new_values[1]
+                loyalty_pnts = int(new_values[2])
+            except ValueError as e:
+                messagebox.showerror("Error", f"Invalid input or database error:\n{e}")
+                return
 
-            save_btn = tk.Button(edit_win, text="Save Changes", command=save_changes)
-            save_btn.pack(pady=20)
+            def on_saved(customer):
+                messagebox.showinfo("Success", "Customer updated.")
+                edit_win.destroy()
+                if customer is None:
+                    self.forget_customer(customer_id)
+                else:
+                    self.show_saved_customer(customer)
+
+            self.executor.submit(
+                self.customer_repo.update_customer, customer_id, new_name, phone_, loyalty_pnts,
+                on_success=on_saved,
+                on_error=lambda err: messagebox.showerror("Error", f"Invalid input or database error:\n{err}"),
+                owner=self
+            )
 
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        save_btn = tk.Button(edit_win, text="Save Changes", command=save_changes)
+        save_btn.pack(pady=20)
 
 
 # To test the CustomerView Frame standalone
 if __name__ == "__main__":
-    db_config = {
-        "host": "localhost",
-        "user": "root",
-        "password": "Root",
-        "database": "flowershop_management"
-    }
+    db_config = env_db_config()  # HERA_DB_*, like app_gui.py
 
     root = tk.Tk()
     root.title("Flower Shop Management - Customers")
     root.geometry("950x500")
-    customer_view = CustomerView(root, db_config)
+    customer_view = CustomerView(root, Repositories(connect_pool(db_config)), DBExecutor(root))
     customer_view.pack(fill="both", expand=True)
     root.mainloop()
 
@@ -0,0 +1,365 @@
+import argparse
+import math
+import random
+import sys
+import time
+from datetime import date, timedelta
+import mysql.connector
+from backends import add_db_arguments, args_db_config, connect_pool
+from migrations import apply_migrations
+from repositories import order_total, remaining_payment
+
+
+# Seeded generator of a large, realistic flowershop_management dataset, for
+# trying the app and its queries at the size a busy shop reaches after a few
+# years. The same --seed gives the same data.
+#
+# Rows are added on top of whatever is already there, and new orders use the
+# existing customers and items too. Ids continue after the current MAX(id)
+# and are assigned here, so orders, their lines and deliveries can be written
+# without reading anything back. Loading goes BATCH_SIZE rows per multi-row
+# INSERT, one commit per batch, with foreign key and unique checks off for
+# the session.
+#
+# Distributions:
+#   - a few regular customers place most orders (Pareto weights)
+#   - a few best sellers are in most baskets (Zipf weights)
+#   - order dates grow over time, with peaks around Valentine's day, Mother's
+#     day and Christmas, and busier Fridays and Saturdays
+#   - basket sizes are 1 plus an exponential with the requested mean
+#   - old orders are mostly Completed; the last two weeks are mostly open
+# Totals, deposits and loyalty points follow the rules the order screens use.
+
+BATCH_SIZE = 5000
+
+COLORS = ["Red", "White", "Pink", "Yellow", "Purple", "Orange", "Blue", "Peach", "Cream", "Coral",
+          "Lavender", "Burgundy"]
+FLOWERS = ["Rose", "Lily", "Tulip", "Sunflower", "Orchid", "Daisy", "Carnation", "Peony", "Hydrangea",
+           "Gerbera", "Iris", "Chrysanthemum", "Freesia", "Ranunculus", "Anemone", "Lisianthus",
+           "Gardenia", "Camellia", "Dahlia", "Magnolia"]
+PRODUCTS = ["Glass Vase", "Ceramic Pot", "Greeting Card", "Ribbon", "Gift Box", "Chocolate Box",
+            "Teddy Bear", "Balloon", "Basket", "Candle"]
+FIRST_NAMES = ["Lana", "Sara", "James", "Maya", "Leo", "Omar", "Nadine", "Daniel", "Rita", "Karim",
+               "Hala", "Jad", "Nour", "Tony", "Rami", "Lea", "Joe", "Mira", "Ziad", "Yara", "Elie",
+               "Carla", "Fadi", "Dana", "Sami", "Rana", "Marc", "Layal", "Georges", "Tala"]
+LAST_NAMES = ["Rose", "White", "Black", "Blue", "Brown", "Green", "Haddad", "Khoury", "Saad", "Nassar",
+              "Karam", "Azar", "Salem", "Daher", "Hayek", "Aoun", "Fares", "Rizk", "Najjar", "Tannous"]
+STREETS = ["Flower St", "Rose Ave", "Cedar Rd", "Main St", "Harbor Rd", "Garden Ln", "Hill St", "Park Ave"]
+PHONE_PREFIXES = ["03", "70", "71", "76", "78", "81"]
+PAYMENT_METHODS = (["Cash", "Credit Card", "Whish", "OMT", "Bank Transfer", "Other"],
+                   [40, 30, 12, 6, 8, 4])
+OLD_STATUSES = (["Completed", "Cancelled", "Processing", "Pending"], [88, 8, 2, 2])
+RECENT_STATUSES = (["Pending", "Processing", "Completed", "Cancelled"], [45, 30, 20, 5])
+OPEN_DAYS = 14  # orders younger than this are still mostly open
+EMPLOYEES = [
+    ("Omar Green", "987654321", "Delivery", 4000, 500),
+    ("Sara Bloom", "555123456", "Florist", 3200, 300),
+    ("Daniel Petal", "555987654", "Cashier", 2800, 200),
+    ("Nadine Leaf", "555654321", "Manager", 5000, 800),
+]
+
+
+class Loader:
+    # buffers rows per table and writes each full batch with one executemany
+    # (a single multi-row INSERT) and a commit
+    def __init__(self, conn, batch_size):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.batch_size = batch_size
+        self.tables = {}  # table -> (INSERT, pending rows)
+        self.counts = {}
+
+    def table(self, table, columns):
+        placeholders = ", ".join(["%s"] * len(columns))
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        self.tables[table] = (query, [])
+        self.counts[table] = 0
+
+    def add(self, table, row):
+        rows = self.tables[table][1]
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, table=None):
+        for name in [table] if table else list(self.tables):
+            query, rows = self.tables[name]
+            if rows:
+                self.cursor.executemany(query, rows)
+                self.counts[name] += len(rows)
+                rows.clear()
+        self.conn.commit()
+
+
+def next_id(cursor, table, column):
+    cursor.execute(f"SELECT IFNULL(MAX({column}), 0) + 1 FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def zipf_weights(count, rng, exponent=0.8):
+    weights = [1 / (rank ** exponent) for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return weights
+
+
+def order_size(rng, extra_lines):
+    # 1 + a geometric number of extra lines whose mean is extra_lines;
+    # int() of an exponential would lose about half a line per order
+    if not extra_lines:
+        return 1
+    return 1 + int(math.log(1 - rng.random()) / math.log(extra_lines / (1 + extra_lines)))
+
+
+def cumulative(weights):
+    total = 0
+    result = []
+    for weight in weights:
+        total += weight
+        result.append(total)
+    return result
+
+
+def day_weight(day, first, last):
+    # slow growth over the whole range, plus the florist's calendar
+    weight = 1 + (day - first).days / max((last - first).days, 1)
+    if day.month == 2 and 10 <= day.day <= 14:
+        weight *= 4
+    elif day.month == 5 and day.day <= 14:
+        weight *= 2.5
+    elif day.month == 12 and 15 <= day.day <= 24:
+        weight *= 2
+    if day.weekday() in (4, 5):
+        weight *= 1.3
+    return weight
+
+
+def money(value):
+    return round(value, 2)
+
+
+def generate_items(loader, rng, count, first_id, existing_names, today):
+    # returns [(item_id, price, discount)] for the order lines
+    loader.table("Item", ["Item_id", "Name", "Type", "Arrival_date", "Item_discount", "Price_amount",
+                          "Price_date", "Stock_quantity"])
+    used = set(existing_names)
+    items = []
+    for n in range(count):
+        if rng.random() < 0.8:
+            base, kind, price = f"{rng.choice(COLORS)} {rng.choice(FLOWERS)}", "Flower", rng.uniform(1.5, 15)
+        else:
+            base, kind, price = rng.choice(PRODUCTS), "Product", rng.uniform(2, 60)
+        name, suffix = base, 2
+        while name.casefold() in used:
+            name, suffix = f"{base} {suffix}", suffix + 1
+        used.add(name.casefold())
+
+        item_id = first_id + n
+        price = money(price)
+        discount = rng.choice([0.05, 0.10, 0.15, 0.20]) if rng.random() < 0.2 else 0
+        arrival = today - timedelta(days=rng.randrange(0, 60))
+        loader.add("Item", (item_id, name, kind, arrival, discount, price, arrival, rng.randrange(0, 500)))
+        items.append((item_id, price, discount))
+    loader.flush("Item")
+    return items
+
+
+def generate_suppliers(loader, rng, count, first_id, items):
+    loader.table("Supplier", ["Supplier_id", "Name", "Contact"])
+    loader.table("Item_Supplier", ["Item_id", "Supplier_id"])
+    supplier_ids = list(range(first_id, first_id + count))
+    for supplier_id in supplier_ids:
+        name = f"{rng.choice(LAST_NAMES)} {rng.choice(['Flowers', 'Supply Co.', 'Gardens', 'Imports', 'Goods'])} {supplier_id}"
+        loader.add("Supplier", (supplier_id, name, f"{rng.choice(PHONE_PREFIXES)}{rng.randrange(10**6):06d}"))
+    loader.flush("Supplier")
+    if supplier_ids:
+        for item_id, _, _ in items:
+            for supplier_id in rng.sample(supplier_ids, min(rng.randint(1, 3), len(supplier_ids))):
+                loader.add("Item_Supplier", (item_id, supplier_id))
+    loader.flush("Item_Supplier")
+
+
+def generate_customers(loader, rng, count, first_id):
+    loader.table("Customer", ["Customer_id", "Name", "Phone", "Loyalty_points"])
+    for customer_id in range(first_id, first_id + count):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        # the id in the number keeps (Name, Phone) unique
+        phone = f"{rng.choice(PHONE_PREFIXES)}{customer_id:07d}"
+        loader.add("Customer", (customer_id, name, phone, 0))
+    loader.flush("Customer")
+
+
+def generate_orders(loader, rng, args, first_order_id, customer_ids, items, employee_ids, today, progress):
+    loader.table("Order_and_Payment", [
+        "Order_id", "Customer_id", "Employee_id", "Order_status", "Order_discount", "Payment_date",
+        "Payment_method", "Total_price", "Remaining_Payment", "Budget", "Deposit", "Confirmation",
+        "Receiver_address", "Receiver_phone"])
+    loader.table("Orders_Items", ["Order_id", "Item_id", "Quantity", "Unit_price"])
+    loader.table("Delivery", ["Order_id", "Employee_id", "Delivery_date", "Delivery_time"])
+
+    first_day = today - timedelta(days=int(args.years * 365))
+    days = [first_day + timedelta(days=n) for n in range((today - first_day).days + 1)]
+    day_weights = cumulative(day_weight(day, first_day, today) for day in days)
+    customer_weights = cumulative(rng.paretovariate(1.2) for _ in customer_ids)
+    item_weights = cumulative(zipf_weights(len(items), rng))
+    extra_lines = max(args.avg_lines - 1, 0)
+    started = time.perf_counter()
+
+    for start in range(0, args.orders, loader.batch_size):
+        count = min(loader.batch_size, args.orders - start)
+        # draw a batch at a time: choices() with cum_weights is much cheaper in bulk
+        order_days = rng.choices(days, cum_weights=day_weights, k=count)
+        customers = rng.choices(customer_ids, cum_weights=customer_weights, k=count)
+        for n in range(count):
+            order_id = first_order_id + start + n
+            day = order_days[n]
+            size = min(order_size(rng, extra_lines), len(items), 12)
+            basket = {}
+            # popular items come up again and again: draw until the basket is full
+            while len(basket) < size:
+                for item in rng.choices(items, cum_weights=item_weights, k=size * 2):
+                    if len(basket) == size:
+                        break
+                    basket.setdefault(item, rng.choice([1, 1, 1, 2, 2, 3, 5, 10]))
+
+            statuses = OLD_STATUSES if (today - day).days > OPEN_DAYS else RECENT_STATUSES
+            status = rng.choices(statuses[0], weights=statuses[1])[0]
+            order_discount = rng.choice([5, 10, 15, 20]) if rng.random() < 0.2 else 0
+            lines = [{"quantity": quantity, "unit_price": price, "discount": discount}
+                     for (_, price, discount), quantity in basket.items()]
+            total = 0 if status == "Cancelled" else money(order_total(lines, order_discount))
+            if status == "Completed":
+                deposit = total
+            elif status == "Cancelled":
+                deposit = 0
+            else:
+                deposit = money(total * rng.choice([0, 0, 0.5, 1]))
+            budget = (int(total // 10) + 1) * 10 if rng.random() < 0.5 else 0
+            delivered = rng.random() < 0.4
+            address = f"{rng.randrange(1, 300)} {rng.choice(STREETS)}" if delivered else ""
+            receiver_phone = f"{rng.choice(PHONE_PREFIXES)}{rng.randrange(10**6):06d}" if delivered else ""
+            confirmed = 1 if status == "Completed" or rng.random() < 0.6 else 0
+
+            loader.add("Order_and_Payment", (
+                order_id, customers[n], rng.choice(employee_ids), status, order_discount, day,
+                rng.choices(*PAYMENT_METHODS)[0], total, money(remaining_payment(total, deposit)),
+                budget, deposit, confirmed, address, receiver_phone))
+            for (item_id, price, _), quantity in basket.items():
+                loader.add("Orders_Items", (order_id, item_id, quantity, price))
+            if delivered and status == "Completed":
+                loader.add("Delivery", (order_id, rng.choice(employee_ids),
+                                        day + timedelta(days=rng.randint(0, 2)),
+                                        f"{rng.randint(9, 18):02d}:{rng.choice(['00', '30'])}:00"))
+        loader.flush()
+        done = start + count
+        progress(f"{done} orders, {loader.counts['Orders_Items']} lines "
+                 f"({loader.counts['Orders_Items'] / done:.2f} per order, "
+                 f"{done / (time.perf_counter() - started):.0f} orders/s)")
+
+
+def award_loyalty(cursor, first_order_id):
+    # one point per 10 of every fully paid order, as place_order awards them
+    cursor.execute("""
+        UPDATE Customer c
+        JOIN (
+            SELECT Customer_id, SUM(FLOOR(Total_price / 10)) AS Points
+            FROM Order_and_Payment
+            WHERE Order_id >= %s AND Order_status <> 'Cancelled' AND Deposit >= Total_price
+            GROUP BY Customer_id
+        ) earned ON earned.Customer_id = c.Customer_id
+        SET c.Loyalty_points = c.Loyalty_points + earned.Points
+    """, (first_order_id,))
+
+
+def generate(db_pool, args, progress=print):
+    rng = random.Random(args.seed)
+    today = date.today()
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    try:
+        # ids are assigned here, so the checks only cost time
+        cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+        loader = Loader(conn, args.batch_size)
+
+        cursor.execute("SELECT Employee_id FROM Employee")
+        employee_ids = [row[0] for row in cursor.fetchall()]
+        if not employee_ids:
+            cursor.executemany(
+                "INSERT INTO Employee (Name, Contact_info, Position, Salary, Yearly_bonus) VALUES (%s, %s, %s, %s, %s)",
+                EMPLOYEES
+            )
+            conn.commit()
+            cursor.execute("SELECT Employee_id FROM Employee")
+            employee_ids = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute("SELECT Name FROM Item")
+        existing_names = {name.casefold() for (name,) in cursor.fetchall() if name}
+        first_item = next_id(cursor, "Item", "Item_id")
+        first_supplier = next_id(cursor, "Supplier", "Supplier_id")
+        first_customer = next_id(cursor, "Customer", "Customer_id")
+        first_order = next_id(cursor, "Order_and_Payment", "Order_id")
+
+        items = generate_items(loader, rng, args.items, first_item, existing_names, today)
+        progress(f"{len(items)} items")
+        generate_suppliers(loader, rng, args.suppliers, first_supplier, items)
+        progress(f"{args.suppliers} suppliers, {loader.counts['Item_Supplier']} supplier links")
+        generate_customers(loader, rng, args.customers, first_customer)
+        progress(f"{args.customers} customers")
+        # new orders go to every customer and item, old and new, so the data
+        # can be grown in steps
+        cursor.execute("SELECT Item_id, Price_amount, IFNULL(Item_discount, 0) FROM Item "
+                       "WHERE Price_amount IS NOT NULL ORDER BY Item_id")
+        items = [(item_id, price, float(discount)) for item_id, price, discount in cursor.fetchall()]
+        cursor.execute("SELECT Customer_id FROM Customer ORDER BY Customer_id")
+        customer_ids = [row[0] for row in cursor.fetchall()]
+        if args.orders and items and customer_ids:
+            generate_orders(loader, rng, args, first_order, customer_ids, items, employee_ids, today, progress)
+            award_loyalty(cursor, first_order)
+            conn.commit()
+
+        # fresh index statistics so the optimizer sees the new table sizes
+        cursor.execute("ANALYZE TABLE Item, Supplier, Item_Supplier, Customer, Order_and_Payment, "
+                       "Orders_Items, Delivery")
+        cursor.fetchall()
+        return loader.counts
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        # the connection goes back to the pool
+        try:
+            cursor.execute("SET SESSION foreign_key_checks = 1, unique_checks = 1")
+        except mysql.connector.Error:
+            pass
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill flowershop_management with generated data")
+    parser.add_argument("--customers", type=int, default=100000)
+    parser.add_argument("--orders", type=int, default=2000000)
+    parser.add_argument("--avg-lines", type=float, default=2.5, help="mean order lines per order")
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--suppliers", type=int, default=50)
+    parser.add_argument("--years", type=float, default=3, help="orders are spread over this many years up to today")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    add_db_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        db_config = args_db_config(args)
+    except ValueError as err:
+        sys.exit(f"Error: {err}")
+    db_pool = connect_pool(db_config, pool_size=1)
+
+    try:
+        # the generated orders fill the stored total columns
+        apply_migrations(db_pool, log=print)
+        started = time.perf_counter()
+        counts = generate(db_pool, args)
+        print(", ".join(f"{table}: {count}" for table, count in counts.items()))
+        print(f"Done in {time.perf_counter() - started:.0f}s")
+    except mysql.connector.Error as err:
+        print(f"Error: {err}")
+    finally:
+        db_pool.close_all()
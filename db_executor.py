@@ -0,0 +1,230 @@
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import query_log
+import ui_metrics
+
+
+class DBTask:
+    def __init__(self, fn, args, on_success, on_error, group, key, owner):
+        self.fn = fn
+        self.args = args
+        self.on_success = on_success
+        self.on_error = on_error
+        self.group = group
+        self.key = key
+        self.owner = owner
+        self.cancelled = False
+        self.future = None
+        self.caller = None  # view method that started it, for the query log
+        self.interaction = None  # UI interaction it belongs to, if any
+        # streaming tasks only
+        self.on_chunk = None
+        self.room = None
+
+
+class DBExecutor:
+    # Runs database work on background threads and hands the results back to
+    # Tk through after() callbacks, so the window keeps repainting while MySQL
+    # is slow. Every method except the worker body must be called from the Tk
+    # main thread; the only thing shared with the workers is the results queue.
+    def __init__(self, root, max_workers=4, poll_interval=20):
+        self.root = root
+        self.poll_interval = poll_interval
+        self._workers = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-worker")
+        self._results = queue.Queue()
+        self._pending = set()
+        self._latest = {}  # key -> newest task; older tasks with the same key are stale
+        self._poll_id = None
+        self._busy = False
+        self._busy_listeners = []
+
+    def submit(self, fn, *args, on_success=None, on_error=None, group=None, key=None, owner=None):
+        # group: sidebar section the task belongs to, cancelled when the user leaves it
+        # key: a newer task with the same key supersedes this one
+        # owner: widget the callbacks talk to; results are dropped once it is destroyed
+        task = DBTask(fn, args, on_success, on_error, group, key, owner)
+        task.caller = query_log.frame_name(sys._getframe(1))
+        return self._start(task, self._run)
+
+    def stream(self, fn, *args, on_chunk=None, on_done=None, on_error=None, group=None, key=None, owner=None,
+               max_pending=4):
+        # fn returns an iterable of chunks (lists of rows); on_chunk gets each one
+        # on the main thread as it arrives and on_done(None) follows the last one.
+        # The worker stays at most max_pending chunks ahead of the UI.
+        task = DBTask(fn, args, on_done, on_error, group, key, owner)
+        task.on_chunk = on_chunk
+        task.room = threading.Semaphore(max_pending)
+        task.caller = query_log.frame_name(sys._getframe(1))
+        return self._start(task, self._run_stream)
+
+    def _start(self, task, runner):
+        # started from a click handler or a result callback: part of that interaction
+        task.interaction = ui_metrics.current.get()
+        if task.interaction is not None:
+            task.interaction.hold()
+        key = task.key
+        if key is not None:
+            previous = self._latest.get(key)
+            if previous is not None:
+                self._cancel(previous)
+            self._latest[key] = task
+
+        self._pending.add(task)
+        task.future = self._workers.submit(runner, task)
+        self._update_busy()
+        self._schedule_poll()
+        return task
+
+    def _run(self, task):
+        # worker thread
+        if task.cancelled:
+            self._results.put((task, "done", None))
+            return
+        token = query_log.caller.set(task.caller)
+        interaction_token = ui_metrics.current.set(task.interaction)
+        try:
+            result = task.fn(*task.args)
+        except Exception as err:
+            self._results.put((task, "error", err))
+        else:
+            self._results.put((task, "done", result))
+        finally:
+            ui_metrics.current.reset(interaction_token)
+            query_log.caller.reset(token)
+
+    def _run_stream(self, task):
+        # worker thread
+        if task.cancelled:
+            self._results.put((task, "done", None))
+            return
+        chunks = None
+        token = query_log.caller.set(task.caller)
+        interaction_token = ui_metrics.current.set(task.interaction)
+        try:
+            chunks = task.fn(*task.args)
+            for chunk in chunks:
+                while not task.room.acquire(timeout=0.1):
+                    if task.cancelled:
+                        break
+                if task.cancelled:
+                    break
+                self._results.put((task, "chunk", chunk))
+        except Exception as err:
+            self._results.put((task, "error", err))
+        else:
+            self._results.put((task, "done", None))
+        finally:
+            # stop a generator we walked away from so it gives its connection back
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            ui_metrics.current.reset(interaction_token)
+            query_log.caller.reset(token)
+
+    def cancel(self, task):
+        self._cancel(task)
+        self._update_busy()
+
+    def cancel_key(self, key):
+        task = self._latest.get(key)
+        if task is not None:
+            self.cancel(task)
+
+    def cancel_group(self, group):
+        # returns how many tasks were still running
+        cancelled = 0
+        for task in list(self._pending):
+            if task.group == group and not task.cancelled:
+                self._cancel(task)
+                cancelled += 1
+        self._update_busy()
+        return cancelled
+
+    def _cancel(self, task):
+        task.cancelled = True
+        # not started yet: it never will be, so nothing will come back for it
+        if task.future is not None and task.future.cancel():
+            self._finish(task)
+
+    def _finish(self, task):
+        self._pending.discard(task)
+        if task.interaction is not None:
+            # counted as done once Tk has gone idle, i.e. after the redraw
+            self.root.after_idle(task.interaction.release)
+            task.interaction = None
+        if task.key is not None and self._latest.get(task.key) is task:
+            del self._latest[task.key]
+
+    def _schedule_poll(self, idle=False):
+        if self._poll_id is None:
+            if idle:
+                self._poll_id = self.root.after_idle(self._poll)
+            else:
+                self._poll_id = self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        self._poll_id = None
+        yielded = False
+        while True:
+            try:
+                task, kind, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            interaction = task.interaction
+            if kind == "chunk":
+                task.room.release()
+            else:
+                self._finish(task)
+            if task.cancelled:
+                continue
+            if task.owner is not None and not task.owner.winfo_exists():
+                continue
+
+            # rendering the results counts towards the click that asked for them
+            interaction_token = ui_metrics.current.set(interaction)
+            try:
+                if kind == "chunk":
+                    if task.on_chunk is not None:
+                        task.on_chunk(value)
+                elif kind == "done":
+                    if task.on_success is not None:
+                        task.on_success(value)
+                elif task.on_error is not None:
+                    task.on_error(value)
+                else:
+                    raise value
+            except Exception as exc:
+                # one failing callback must not stall delivery of the others
+                self.root.report_callback_exception(type(exc), exc, exc.__traceback__)
+            finally:
+                ui_metrics.current.reset(interaction_token)
+
+            if kind == "chunk":
+                # one chunk per tick, so Tk gets to redraw and handle input in between
+                yielded = True
+                break
+
+        self._update_busy()
+        if self._pending:
+            self._schedule_poll(idle=yielded)
+
+    def add_busy_listener(self, callback):
+        self._busy_listeners.append(callback)
+
+    def _update_busy(self):
+        busy = any(not task.cancelled for task in self._pending)
+        if busy != self._busy:
+            self._busy = busy
+            for callback in self._busy_listeners:
+                callback(busy)
+
+    def shutdown(self):
+        for task in list(self._pending):
+            task.cancelled = True
+        self._workers.shutdown(wait=False, cancel_futures=True)
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
@@ -0,0 +1,249 @@
+import threading
+import time
+from collections import OrderedDict
+import mysql.connector
+from mysql.connector import errors
+from query_log import InstrumentedCursor
+
+
+class PooledConnection:
+    # Thin wrapper around a pooled connection: close() hands it back to the pool
+    # instead of tearing down the socket, everything else goes to the real connection.
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._cursors = []  # instrumented cursors, flushed to the query log on close
+
+    def _instrument(self, cursor):
+        query_log = self._pool.query_log
+        if query_log is None:
+            return cursor
+        cursor = InstrumentedCursor(cursor, query_log)
+        self._cursors.append(cursor)
+        return cursor
+
+    def cursor(self, *args, **kwargs):
+        conn = self.__dict__.get("_conn")
+        if conn is None:
+            raise errors.OperationalError("Connection was already returned to the pool")
+        return self._instrument(conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        conn = self.__dict__.get("_conn")
+        if conn is None:
+            raise errors.OperationalError("Connection was already returned to the pool")
+        return getattr(conn, name)
+
+    def prepared_cursor(self, query):
+        # prepared statements live on the server connection, so they are cached
+        # per real connection and reused by whoever checks it out next
+        return self._instrument(self._pool.prepared_cursor(self._conn, query))
+
+    def close(self):
+        conn = self.__dict__.get("_conn")
+        if conn is not None:
+            for cursor in self._cursors:
+                cursor.flush()
+            self._cursors = []
+            self._conn = None
+            self._pool.release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # a view that bailed out early without conn.close() must not leak the slot
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    engine = "mysql"
+
+    def __init__(self, db_config, pool_size=5, timeout=10, health_check_interval=30, statement_cache_size=32,
+                 query_log=None):
+        self.db_config = db_config
+        self.query_log = query_log  # QueryLog that times every statement, or None
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.statement_cache_size = statement_cache_size
+        # connections idle for longer than this get pinged before being handed out
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, last_used) pairs, most recently used last
+        self._open = 0
+        self._closed = False
+        self._statements = {}  # connection -> OrderedDict(query -> prepared cursor), LRU order
+
+        self.metrics = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "health_checks": 0,
+            "health_failures": 0,
+            "discarded": 0,
+            "statements_prepared": 0,
+            "statements_reused": 0,
+        }
+
+    def _connect(self):
+        conn = mysql.connector.connect(
+            host=self.db_config.get("host", "localhost"),
+            user=self.db_config.get("user", "root"),
+            password=self.db_config.get("password", ""),
+            database=self.db_config.get("database", "flowershop_management")
+        )
+        with self._cond:
+            self.metrics["created"] += 1
+        return conn
+
+    def _is_healthy(self, conn, last_used):
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        with self._cond:
+            self.metrics["health_checks"] += 1
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except mysql.connector.Error:
+            with self._cond:
+                self.metrics["health_failures"] += 1
+            return False
+
+    def prepared_cursor(self, conn, query):
+        # only ever called by the thread holding conn, so the per-connection
+        # cache itself needs no lock
+        with self._cond:
+            cache = self._statements.setdefault(conn, OrderedDict())
+        cursor = cache.get(query)
+        if cursor is not None:
+            cache.move_to_end(query)
+            with self._cond:
+                self.metrics["statements_reused"] += 1
+            return cursor
+
+        cursor = conn.cursor(prepared=True)
+        cache[query] = cursor
+        if len(cache) > self.statement_cache_size:
+            _, oldest = cache.popitem(last=False)
+            try:
+                oldest.close()
+            except Exception:
+                pass
+        with self._cond:
+            self.metrics["statements_prepared"] += 1
+        return cursor
+
+    def _forget_statements(self, conn):
+        with self._cond:
+            self._statements.pop(conn, None)
+
+    def _discard(self, conn):
+        self._forget_statements(conn)
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._open -= 1
+            self.metrics["discarded"] += 1
+            self._cond.notify()
+
+    def get_connection(self):
+        waited_since = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise errors.PoolError("Connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._open < self.pool_size:
+                    # reserve the slot now, connect outside the lock
+                    self._open += 1
+                    conn, last_used = None, None
+                    break
+
+                now = time.monotonic()
+                if waited_since is None:
+                    waited_since = now
+                    self.metrics["waits"] += 1
+                remaining = self.timeout - (now - waited_since)
+                if remaining <= 0:
+                    self.metrics["timeouts"] += 1
+                    self.metrics["wait_time"] += now - waited_since
+                    raise errors.PoolError(
+                        f"No free database connection after {self.timeout}s (pool size {self.pool_size})"
+                    )
+                self._cond.wait(remaining)
+
+            if waited_since is not None:
+                self.metrics["wait_time"] += time.monotonic() - waited_since
+            self.metrics["checkouts"] += 1
+
+        if conn is not None and not self._is_healthy(conn, last_used):
+            self._discard(conn)
+            with self._cond:
+                self._open += 1
+            conn = None
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        # never hand out a connection with an open transaction: a leftover
+        # REPEATABLE READ snapshot would show the next caller stale rows
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._closed:
+                self._open -= 1
+                self._statements.pop(conn, None)
+                conn.close()
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self.metrics)
+            stats["pool_size"] = self.pool_size
+            stats["open"] = self._open
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._open - len(self._idle)
+        return stats
+
+    def close_all(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            for conn, _ in idle:
+                self._statements.pop(conn, None)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
@@ -0,0 +1,109 @@
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from datetime import datetime
+import ui_metrics
+
+
+class DiagnosticsView(tk.Frame):
+    def __init__(self, parent, query_log, db_pool):
+        super().__init__(parent)
+        self.parent = parent
+        self.metrics = ui_metrics.metrics
+        self.query_log = query_log
+        self.db_pool = db_pool
+        self.section = "diagnostics"
+        self.lavender = "#E6E6FA"
+        self.configure(bg=self.lavender)
+
+        # Buttons Frame
+        button_frame = tk.Frame(self, bg=self.lavender)
+        button_frame.pack(fill="x", padx=10, pady=(10, 0))
+        tk.Button(button_frame, text="Refresh", command=self.refresh).pack(side="left", padx=(0, 5))
+        tk.Button(button_frame, text="Reset", command=self.reset).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Export JSON", command=self.export_json).pack(side="right")
+        self.pool_label = tk.Label(button_frame, text="", bg=self.lavender)
+        self.pool_label.pack(side="left", padx=20)
+        self.startup_label = tk.Label(button_frame, text="", bg=self.lavender)
+        self.startup_label.pack(side="left", padx=20)
+
+        # Tables
+        self.interactions_tree = self.make_table(
+            "Interactions (ms, phases are averages)",
+            ("Name", "Count", "p50", "p95", "Max", "Query", "Fetch", "Format", "Insert", "Handler", "Other"), 8)
+        self.stalls_tree = self.make_table(
+            f"Event loop stalls over {ui_metrics.STALL_MS} ms", ("Time", "Blocked ms", "Blocking code"), 6)
+        self.queries_tree = self.make_table(
+            "Statements by total time", ("Statement", "Count", "Total ms", "Max ms", "Rows", "Slow"), 10)
+
+        self.refresh()
+
+    def make_table(self, title, columns, height):
+        tk.Label(self, text=title, bg=self.lavender, font=("Arial", 11, "bold")).pack(anchor="w", padx=10, pady=(10, 0))
+        tree_frame = tk.Frame(self)
+        tree_frame.pack(fill="both", expand=True, padx=10, pady=(0, 5))
+        scrollbar = ttk.Scrollbar(tree_frame)
+        scrollbar.pack(side="right", fill="y")
+        tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=height,
+                            yscrollcommand=scrollbar.set)
+        tree.pack(side="left", fill="both", expand=True)
+        scrollbar.config(command=tree.yview)
+        for col in columns:
+            tree.heading(col, text=col)
+            if col in ("Name", "Statement", "Blocking code"):
+                tree.column(col, anchor="w", width=420)
+            else:
+                tree.column(col, anchor="center", width=80)
+        return tree
+
+    def fill(self, tree, rows):
+        tree.delete(*tree.get_children())
+        for values in rows:
+            tree.insert("", "end", values=values)
+
+    def refresh(self):
+        self.fill(self.interactions_tree, [
+            (row["name"], row["count"], f"{row['p50_ms']:.0f}", f"{row['p95_ms']:.0f}", f"{row['max_ms']:.0f}",
+             *(f"{row[f'{phase}_ms']:.0f}" for phase in ui_metrics.PHASES))
+            for row in self.metrics.summary()
+        ])
+        self.fill(self.stalls_tree, [
+            (datetime.fromtimestamp(stall["at"]).strftime("%H:%M:%S"), f"{stall['blocked_ms']:.0f}",
+             " > ".join(stall["stack"][-3:]) or "-")
+            for stall in reversed(self.metrics.stalls)
+        ])
+        self.fill(self.queries_tree, [
+            (stats.fingerprint, stats.count, f"{stats.total_ms:.0f}", f"{stats.max_ms:.0f}", stats.rows, stats.slow)
+            for stats in (self.query_log.stats(50) if self.query_log is not None else [])
+        ])
+        if self.db_pool is None:
+            # the app opens the database with the first data section
+            self.pool_label.config(text="Connections: database not opened yet")
+        else:
+            pool = self.db_pool.stats()
+            self.pool_label.config(text=f"Connections: {pool['in_use']} in use, {pool['idle']} idle of "
+                                        f"{pool['pool_size']}, {pool['waits']} waits, {pool['timeouts']} timeouts")
+        startup = self.metrics.startup
+        if startup is not None:
+            steps = ", ".join(f"{step} {ms:.0f}" for step, ms in startup["steps"].items())
+            self.startup_label.config(text=f"Startup: {startup['total_ms']:.0f} ms to first window "
+                                           f"(budget {startup['budget_ms']} ms): {steps}")
+
+    def reset(self):
+        self.metrics.reset()
+        if self.query_log is not None:
+            self.query_log.reset()
+        self.refresh()
+
+    def export_json(self):
+        path = filedialog.asksaveasfilename(
+            parent=self, title="Export Diagnostics", initialfile="diagnostics.json",
+            defaultextension=".json", filetypes=[("JSON", "*.json"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            self.metrics.export_json(path, self.query_log, self.db_pool)
+        except OSError as err:
+            messagebox.showerror("Export Error", f"Error: {err}")
+            return
+        messagebox.showinfo("Export", f"Diagnostics saved to {path}")
@@ -0,0 +1,236 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import mysql.connector
+from backends import add_db_arguments, args_db_config, connect_pool
+from repositories import Repositories, OrderFilter
+
+
+# Streaming export of orders (with their lines), items and customers to CSV
+# or JSON Lines. Rows come off an unbuffered (server-side) cursor CHUNK_SIZE at
+# a time and are written straight to the file, so memory stays flat however
+# many years of orders are exported. Items and customers use the column names
+# bulk_import.py reads, so an export can be imported elsewhere.
+
+CHUNK_SIZE = 1000
+FORMATS = ("csv", "jsonl")
+
+ITEM_COLUMNS = ["Item_id", "Name", "Type", "Arrival_date", "Item_discount", "Price_amount",
+                "Price_date", "Stock_quantity", "Suppliers"]
+ITEMS_QUERY = """
+    SELECT i.Item_id, i.Name, i.Type, i.Arrival_date, i.Item_discount, i.Price_amount,
+        i.Price_date, i.Stock_quantity,
+        GROUP_CONCAT(s.Name ORDER BY s.Name SEPARATOR ';')
+    FROM Item i
+    LEFT JOIN Item_Supplier isr ON i.Item_id = isr.Item_id
+    LEFT JOIN Supplier s ON isr.Supplier_id = s.Supplier_id
+    GROUP BY i.Item_id
+    ORDER BY i.Item_id
+"""
+
+CUSTOMER_COLUMNS = ["Customer_id", "Name", "Phone", "Loyalty_points"]
+CUSTOMERS_QUERY = "SELECT Customer_id, Name, Phone, Loyalty_points FROM Customer ORDER BY Customer_id"
+
+ORDER_COLUMNS = ["Order_id", "Customer_id", "Customer_name", "Payment_date", "Payment_method",
+                 "Order_status", "Order_discount", "Total_price", "Deposit", "Remaining_Payment",
+                 "Budget", "Confirmation", "Receiver_address", "Receiver_phone"]
+LINE_COLUMNS = ["Item_id", "Item_name", "Quantity", "Unit_price"]
+# one row per order line, in Order_id order so an order's lines are adjacent
+ORDERS_QUERY = """
+    SELECT o.Order_id, o.Customer_id, c.Name, o.Payment_date, o.Payment_method,
+        o.Order_status, o.Order_discount, o.Total_price, o.Deposit, o.Remaining_Payment,
+        o.Budget, o.Confirmation, o.Receiver_address, o.Receiver_phone,
+        oi.Item_id, i.Name, oi.Quantity, oi.Unit_price
+    FROM Order_and_Payment o
+    JOIN Customer c ON o.Customer_id = c.Customer_id
+    LEFT JOIN Orders_Items oi ON oi.Order_id = o.Order_id
+    LEFT JOIN Item i ON i.Item_id = oi.Item_id
+    {where}
+    ORDER BY o.Order_id, oi.Item_id
+"""
+
+
+def csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def json_value(value):
+    # amounts stay exact as strings rather than becoming floats
+    if isinstance(value, (date, datetime, timedelta)):
+        return str(value) if isinstance(value, timedelta) else value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class CsvWriter:
+    def __init__(self, f, columns):
+        self.writer = csv.writer(f)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows([csv_value(value) for value in row] for row in rows)
+
+    def finish(self):
+        pass
+
+
+class JsonLinesWriter:
+    def __init__(self, f, columns):
+        self.f = f
+        self.columns = columns
+
+    def write(self, rows):
+        for row in rows:
+            self.f.write(json.dumps(dict(zip(self.columns, row)), default=json_value) + "\n")
+
+    def finish(self):
+        pass
+
+
+class OrderJsonLinesWriter:
+    # one JSON object per order with its lines nested under "Items"; only the
+    # order being assembled is held in memory
+    def __init__(self, f, columns):
+        self.f = f
+        self.order = None
+
+    def write(self, rows):
+        for row in rows:
+            head, line = row[:len(ORDER_COLUMNS)], row[len(ORDER_COLUMNS):]
+            if self.order is None or self.order["Order_id"] != head[0]:
+                self.finish()
+                self.order = dict(zip(ORDER_COLUMNS, head))
+                self.order["Items"] = []
+            if line[0] is not None:
+                self.order["Items"].append(dict(zip(LINE_COLUMNS, line)))
+
+    def finish(self):
+        if self.order is not None:
+            self.f.write(json.dumps(self.order, default=json_value) + "\n")
+            self.order = None
+
+
+def export_query(repos, kind, order_filter=None):
+    # (query, params, columns)
+    if kind == "items":
+        return ITEMS_QUERY, (), ITEM_COLUMNS
+    if kind == "customers":
+        return CUSTOMERS_QUERY, (), CUSTOMER_COLUMNS
+    conditions, params = repos.orders.filter_conditions(order_filter)
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    return ORDERS_QUERY.format(where=where), tuple(params), ORDER_COLUMNS + LINE_COLUMNS
+
+
+def format_for(path):
+    return "jsonl" if path.lower().endswith((".jsonl", ".json")) else "csv"
+
+
+def export_rows(repos, kind, path, fmt="csv", order_filter=None, chunk_size=CHUNK_SIZE):
+    # Writes one export file, yielding the number of rows written so far after
+    # every chunk (fits DBExecutor.stream). Stopping early removes the
+    # partial file.
+    query, params, columns = export_query(repos, kind, order_filter)
+    if fmt == "jsonl":
+        writer_type = OrderJsonLinesWriter if kind == "orders" else JsonLinesWriter
+    else:
+        writer_type = CsvWriter
+
+    rows = repos.orders.stream(query, params, chunk_size=chunk_size)
+    written = 0
+    complete = False
+    try:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = writer_type(f, columns)
+            for chunk in rows:
+                writer.write(chunk)
+                written += len(chunk)
+                yield written
+            writer.finish()
+        complete = True
+    finally:
+        rows.close()
+        if not complete:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def export(repos, kind, path, fmt=None, order_filter=None, progress=None):
+    # headless: runs the whole export, returns the number of rows written
+    written = 0
+    for written in export_rows(repos, kind, path, fmt or format_for(path), order_filter):
+        if progress is not None:
+            progress(written)
+    return written
+
+
+def start_export(view, executor, repos, kind, order_filter=None):
+    # "Export" button of the list views: ask for a file, then stream the
+    # export on the executor. Not tied to the view's section, so switching
+    # screens does not abort a long export.
+    from tkinter import filedialog, messagebox
+
+    path = filedialog.asksaveasfilename(
+        parent=view, title=f"Export {kind.capitalize()}", initialfile=f"{kind}.csv",
+        defaultextension=".csv",
+        filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("All files", "*.*")]
+    )
+    if not path:
+        return
+    state = {"written": 0}
+
+    def on_chunk(written):
+        state["written"] = written
+
+    executor.stream(
+        export_rows, repos, kind, path, format_for(path), order_filter,
+        on_chunk=on_chunk,
+        on_done=lambda _: messagebox.showinfo("Export", f"Exported {state['written']} rows to {path}"),
+        on_error=lambda err: messagebox.showerror("Export Error", f"Error: {err}"),
+        owner=view
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export orders, items or customers to CSV or JSON Lines")
+    parser.add_argument("kind", choices=["orders", "items", "customers"])
+    parser.add_argument("path", help="output file; .jsonl/.json writes JSON Lines, anything else CSV")
+    parser.add_argument("--format", choices=FORMATS, help="override the format picked from the file name")
+    parser.add_argument("--from", dest="date_from", help="orders paid on or after YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", help="orders paid on or before YYYY-MM-DD")
+    parser.add_argument("--status", help="only orders with this status")
+    add_db_arguments(parser)
+    args = parser.parse_args()
+
+    def parse_date(text):
+        return datetime.strptime(text, "%Y-%m-%d").date() if text else None
+
+    try:
+        db_config = args_db_config(args)
+    except ValueError as err:
+        sys.exit(f"Error: {err}")
+    db_pool = connect_pool(db_config, pool_size=1)
+
+    try:
+        order_filter = OrderFilter(
+            status=args.status, date_from=parse_date(args.date_from), date_to=parse_date(args.date_to)
+        )
+        written = export(
+            Repositories(db_pool), args.kind, args.path, args.format, order_filter,
+            progress=lambda written: print(f"{written} rows written", end="\r")
+        )
+        print(f"Exported {written} rows to {args.path}")
+    except (mysql.connector.Error, OSError, ValueError) as err:
+        print(f"Error: {err}")
+    finally:
+        db_pool.close_all()
@@ -0,0 +1,111 @@
+-- flowershop_schema.sql for the SQLite engine (backends.py), at the level of
+-- every migration in migrations.py: its indexes and stored order totals are
+-- part of the tables and Schema_migrations lists them as applied. A new
+-- migration has to be added here too. Names compare case-insensitively, as
+-- under MySQL's default collation; AUTOINCREMENT keeps ids of deleted rows
+-- from being handed out again, like AUTO_INCREMENT.
+
+CREATE TABLE IF NOT EXISTS Item (
+    Item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name VARCHAR(100) COLLATE NOCASE,
+    Type VARCHAR(50),
+    Arrival_date DATE,
+    Item_discount DECIMAL(5,2),
+    Price_amount DECIMAL(10,2),
+    Price_date DATE,
+    Stock_quantity INT DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS Customer (
+    Customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name VARCHAR(100) COLLATE NOCASE,
+    Phone VARCHAR(20),
+    Loyalty_points INT DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS Supplier (
+    Supplier_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name VARCHAR(100) COLLATE NOCASE,
+    Contact VARCHAR(100)
+);
+
+CREATE TABLE IF NOT EXISTS Employee (
+    Employee_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name VARCHAR(100),
+    Contact_info VARCHAR(100),
+    Position VARCHAR(50),
+    Salary DECIMAL(10,2),
+    Yearly_bonus DECIMAL(10,2)
+);
+
+CREATE TABLE IF NOT EXISTS Order_and_Payment (
+    Order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Customer_id INT,
+    Employee_id INT,
+    Order_status VARCHAR(50),
+    Order_discount DECIMAL(5,2),
+    Payment_date DATE,
+    Payment_method VARCHAR(50),
+    Amount_paid DECIMAL(10,2),
+    Deposit DECIMAL(10,2),
+    Budget DECIMAL(10,2),
+    Receiver_address VARCHAR(200),
+    Receiver_phone VARCHAR(20),
+    Confirmation BOOLEAN,
+    Total_price DECIMAL(10,2) NOT NULL DEFAULT 0,
+    Remaining_Payment DECIMAL(10,2) NOT NULL DEFAULT 0,
+    FOREIGN KEY (Customer_id) REFERENCES Customer(Customer_id),
+    FOREIGN KEY (Employee_id) REFERENCES Employee(Employee_id)
+);
+
+CREATE TABLE IF NOT EXISTS Delivery (
+    Delivery_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Order_id INT,
+    Employee_id INT,
+    Delivery_date DATE,
+    Delivery_time TIME,
+    FOREIGN KEY (Order_id) REFERENCES Order_and_Payment(Order_id),
+    FOREIGN KEY (Employee_id) REFERENCES Employee(Employee_id)
+);
+
+CREATE TABLE IF NOT EXISTS Item_Supplier (
+    Item_id INT,
+    Supplier_id INT,
+    PRIMARY KEY (Item_id, Supplier_id),
+    FOREIGN KEY (Item_id) REFERENCES Item(Item_id),
+    FOREIGN KEY (Supplier_id) REFERENCES Supplier(Supplier_id)
+);
+
+CREATE TABLE IF NOT EXISTS Orders_Items (
+    Order_id INT,
+    Item_id INT,
+    Quantity INT,
+    Unit_price DECIMAL(10,2),
+    PRIMARY KEY (Order_id, Item_id),
+    FOREIGN KEY (Order_id) REFERENCES Order_and_Payment(Order_id),
+    FOREIGN KEY (Item_id) REFERENCES Item(Item_id)
+);
+
+-- migration 1
+CREATE INDEX IF NOT EXISTS idx_customer_name ON Customer (Name);
+CREATE INDEX IF NOT EXISTS idx_customer_phone ON Customer (Phone);
+CREATE INDEX IF NOT EXISTS idx_item_name ON Item (Name);
+CREATE INDEX IF NOT EXISTS idx_supplier_name ON Supplier (Name);
+CREATE INDEX IF NOT EXISTS idx_order_status_id ON Order_and_Payment (Order_status, Order_id);
+CREATE INDEX IF NOT EXISTS idx_order_payment_date ON Order_and_Payment (Payment_date);
+CREATE INDEX IF NOT EXISTS idx_item_arrival ON Item (Arrival_date, Item_id);
+-- the joins MySQL indexes through its foreign keys
+CREATE INDEX IF NOT EXISTS idx_order_customer ON Order_and_Payment (Customer_id);
+CREATE INDEX IF NOT EXISTS idx_orders_items_item ON Orders_Items (Item_id);
+CREATE INDEX IF NOT EXISTS idx_item_supplier_supplier ON Item_Supplier (Supplier_id);
+CREATE INDEX IF NOT EXISTS idx_delivery_order ON Delivery (Order_id);
+
+CREATE TABLE IF NOT EXISTS Schema_migrations (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(200),
+    Applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT OR IGNORE INTO Schema_migrations (Version, Description) VALUES
+(1, 'Indexes for searched, filtered and sorted columns'),
+(2, 'Stored order totals on Order_and_Payment');
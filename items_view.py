@@ -1,13 +1,23 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import mysql.connector
+from backends import env_db_config, connect_pool
+from db_executor import DBExecutor
+from repositories import Repositories, RepositoryError
+from search_index import PrefixIndex, Debouncer
+from tree_rows import TreeRows
+from ui_metrics import measured
+from export import start_export
 from datetime import datetime
 
 class ItemView(tk.Frame):
-    def __init__(self, parent, db_config):
+    def __init__(self, parent, repos, executor):
         super().__init__(parent)
         self.parent = parent
-        self.db_config = db_config
+        self.repos = repos
+        self.item_repo = repos.items
+        self.catalog = repos.catalog
+        self.executor = executor
+        self.section = "items"
         self.lavender = "#E6E6FA"
         self.configure(bg=self.lavender)
 
@@ -19,12 +29,17 @@ class ItemView(tk.Frame):
         self.search_var = tk.StringVar()
         self.search_entry = tk.Entry(search_frame, textvariable=self.search_var)
         self.search_entry.pack(side="left", padx=(0, 5))
+        # search as you type; the button still runs the search straight away
+        self.item_index = None
+        self.search_debouncer = Debouncer(self, 250, self.filter_items)
+        self.search_var.trace_add("write", self.search_debouncer)
         search_btn = tk.Button(search_frame, text="Search", command=self.search_items)
         search_btn.pack(side="left", padx=(0, 10))
         tk.Button(search_frame, text="Clear", command=self.clear_search).pack(side="left", padx=5)
 
         add_btn = tk.Button(search_frame, text="Add Item", command=self.add_item)
         add_btn.pack(side="right")
+        tk.Button(search_frame, text="Export", command=self.export_items).pack(side="right", padx=5)
 
         # Treeview Frame and Scrollbar 
         tree_frame= tk.Frame(self)
@@ -62,106 +77,168 @@ class ItemView(tk.Frame):
         self.tree.tag_configure("lowstock", foreground="#b22222")
 
         self.tree.bind("<Button-1>", self.handle_click)
+        # rows are keyed by Item_id, so saves and deletes patch just their row
+        self.rows = TreeRows(self.tree, self.item_row)
 
         self.load_items()
 
-    def connect_db(self):
-        return mysql.connector.connect(
-            host=self.db_config.get("host", "localhost"),
-            user=self.db_config.get("user", "your_mysql_username"),
-            password=self.db_config.get("password", "your_mysql_password"),
-            database=self.db_config.get("database", "flowershop_management")
-        )
-        
     def clear_search(self):
         self.search_var.set("")
+        self.search_debouncer.cancel()
         self.load_items()
 
-    def load_items(self):
-        try:
-            conn = self.connect_db()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT 
-                    i.Item_id, i.Name, i.Type, i.Arrival_date, i.Item_discount,
-                    i.Price_amount, i.Price_date, i.Stock_quantity,
-                    GROUP_CONCAT(s.Name SEPARATOR ', ')
-                FROM Item i
-                LEFT JOIN Item_Supplier isr ON i.Item_id = isr.Item_id
-                LEFT JOIN Supplier s ON isr.Supplier_id = s.Supplier_id
-                GROUP BY i.Item_id
-                ORDER BY i.Arrival_date DESC, i.Item_id DESC
-            """)
-            items = cursor.fetchall()
-            conn.close()
-            self.display_items(items)
-
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+    def export_items(self):
+        start_export(self, self.executor, self.repos, "items")
 
-    def display_items(self, items):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-
-        for item in items:
-            item_id, name, type_, arrival_date, discount, price, price_date, stock_qty, suppliers_str = item
-
-            arrival_str = arrival_date.strftime("%Y-%m-%d") if arrival_date else ""
-            price_date_str = price_date.strftime("%Y-%m-%d") if price_date else ""
-            discount_pct = f"{discount * 100:.0f}%" if discount else "0%"
-            suppliers_str= suppliers_str or "_"
-
-            if stock_qty == 0:
-                status = "RESTOCK"
-                tag = "restock"
-            elif stock_qty < 10:
-                status = "Low Stock"
-                tag = "lowstock"
+    def refresh(self):
+        # shown again after its data changed; the catalog re-reads just the
+        # rows written since. The type-ahead filter is reapplied once the new
+        # list is indexed
+        self.load_items()
+
+    def expire(self):
+        # hidden longer than MAX_AGE: other terminals' writes never reach the
+        # catalog, so the refresh that follows reads the whole list again
+        self.catalog.invalidate()
+
+    def show_db_error(self, err):
+        messagebox.showerror("Database Error", f"Error: {err}")
+
+    def show_save_error(self, err):
+        if isinstance(err, RepositoryError):
+            messagebox.showerror(err.title, str(err))
+        else:
+            messagebox.showerror("Error", f"Invalid input or database error:\n{err}")
+
+    def load_items(self, search_text=None, on_empty=None):
+        # rows come in chunks off a streaming cursor; the old rows stay on screen
+        # until the first chunk lands
+        state = {"started": False, "rows": []}
+        if search_text is None:
+            self.item_index = None
+            # a pending search would land on top of the full list
+            self.executor.cancel_key("items.search")
+
+        def showing():
+            # the full list is still read for the type-ahead index while a
+            # search is typed, but its rows do not replace the matches
+            return search_text is not None or not self.search_var.get().strip()
+
+        def on_chunk(items):
+            if search_text is None:
+                state["rows"].extend(items)
+            if not showing():
+                return
+            if state["started"]:
+                self.insert_items(items)
             else:
-                status = "OK"
-                tag = ""
-
-            self.tree.insert(
-                "", "end",
-                values=(
-                    "🖉 edit",  
-                    item_id, name, type_, arrival_str, discount_pct, f"{price:.2f}",
-                    price_date_str, stock_qty, status, suppliers_str, "🗑️"
-                ),
-                tags=(f"id_{item_id}", tag)
-            )
+                state["started"] = True
+                self.display_items(items)
+
+        def on_done(_):
+            if not state["started"] and showing():
+                if on_empty is not None:
+                    on_empty()
+                else:
+                    self.display_items([])
+            if search_text is None:
+                # full list is in memory now: index it off the Tk thread for type-ahead
+                self.executor.submit(
+                    PrefixIndex, state["rows"], ("name",), on_success=self.set_item_index,
+                    group=self.section, key="items.index", owner=self
+                )
+
+        if search_text is None:
+            # the full list comes from the shared catalog, which only goes to
+            # the database the first time or for rows changed since
+            stream_args = (self.catalog.stream_items,)
+        else:
+            stream_args = (self.item_repo.stream_items, search_text)
+        self.executor.stream(
+            *stream_args,
+            on_chunk=on_chunk, on_done=on_done, on_error=self.show_db_error,
+            group=self.section, key="items.list" if search_text is None else "items.search", owner=self
+        )
+
+    def display_items(self, items):
+        self.rows.render(items)
+
+    def insert_items(self, items):
+        self.rows.append(items)
+
+    def item_row(self, item):
+        item_id, name, type_, arrival_date, discount, price, price_date, stock_qty, suppliers_str = item
+
+        arrival_str = arrival_date.strftime("%Y-%m-%d") if arrival_date else ""
+        price_date_str = price_date.strftime("%Y-%m-%d") if price_date else ""
+        discount_pct = f"{discount * 100:.0f}%" if discount else "0%"
+        suppliers_str= suppliers_str or "_"
+
+        if stock_qty == 0:
+            status = "RESTOCK"
+            tag = "restock"
+        elif stock_qty < 10:
+            status = "Low Stock"
+            tag = "lowstock"
+        else:
+            status = "OK"
+            tag = ""
+
+        values = (
+            "🖉 edit",  
+            item_id, name, type_, arrival_str, discount_pct, f"{price:.2f}",
+            price_date_str, stock_qty, status, suppliers_str, "🗑️"
+        )
+        return item_id, values, (tag,) if tag else ()
+
+    def set_item_index(self, index):
+        self.item_index = index
+        # catch up with anything typed while the list was loading
+        if self.search_var.get().strip():
+            self.filter_items()
+
+    def show_saved_item(self, item, index="end"):
+        # patch the saved row into the list and the type-ahead index
+        self.rows.put(item, index)
+        if self.item_index is not None:
+            self.item_index.put(item)
+
+    def forget_item(self, item_id):
+        self.rows.remove(item_id)
+        if self.item_index is not None:
+            self.item_index.remove(item_id)
+
+    def filter_items(self):
+        # type-ahead: from the local index once the full list is loaded,
+        # otherwise from the database (a newer query supersedes the pending one;
+        # the full load keeps going under its own key and builds the index)
+        search_text = self.search_var.get().strip()
+        if self.item_index is not None:
+            self.executor.cancel_key("items.search")
+            self.display_items(self.item_index.search(search_text))
+        else:
+            self.load_items(search_text or None)
 
     def search_items(self):
         search_text = self.search_var.get().strip()
         if not search_text:
             messagebox.showinfo("Search", "Please enter a name to search.")
             return
-        try:
-            conn = self.connect_db()
-            cursor = conn.cursor()
-            query = ("""
-                SELECT 
-                    i.Item_id, i.Name, i.Type, i.Arrival_date, i.Item_discount,
-                    i.Price_amount, i.Price_date, i.Stock_quantity,
-                    GROUP_CONCAT(s.Name SEPARATOR ', ')
-                FROM Item i
-                LEFT JOIN Item_Supplier isr ON i.Item_id = isr.Item_id
-                LEFT JOIN Supplier s ON isr.Supplier_id = s.Supplier_id
-                WHERE i.Name LIKE %s
-                GROUP BY i.Item_id
-                ORDER BY i.Arrival_date DESC, i.Item_id DESC
-            """)
-            cursor.execute(query, (f"%{search_text}%",))
-            results = cursor.fetchall()
-            conn.close()
+        self.search_debouncer.cancel()
 
+        def on_empty():
+            messagebox.showinfo("Search", f"No items found matching '{search_text}'")
+
+        if self.item_index is not None:
+            self.executor.cancel_key("items.search")
+            results = self.item_index.search(search_text)
             if results:
                 self.display_items(results)
             else:
-                messagebox.showinfo("Search", f"No items found matching '{search_text}'")
+                on_empty()
+            return
 
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        self.load_items(search_text, on_empty=on_empty)
 
     def add_item(self):
         # Create the add item popup
@@ -197,34 +274,24 @@ class ItemView(tk.Frame):
                 price = float(new_values[4])
                 price_date = datetime.strptime(new_values[5], "%Y-%m-%d").date()
                 stock_qty = int(new_values[6])
+            except ValueError as e:
+                messagebox.showerror("Error", f"Invalid input or database error:\n{e}")
+                return
 
-                conn = self.connect_db()
-                cursor = conn.cursor()
-
-                # Check if item with same name exists
-                cursor.execute("SELECT COUNT(*) FROM Item WHERE Name = %s", (new_name,))
-                if cursor.fetchone()[0] > 0:
-                    messagebox.showerror("Error", f"An item with name '{new_name}' already exists.")
-                    conn.close()
-                    return
-
-                cursor.execute("""
-                    INSERT INTO Item (Name, Type, Arrival_date, Item_discount, Price_amount, Price_date, Stock_quantity)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """, (new_name, type_, arrival_date, discount, price, price_date, stock_qty))
-                conn.commit()
-                conn.close()
-
+            def on_added(item):
                 messagebox.showinfo("Success", f"Item '{new_name}' added successfully.")
                 add_win.destroy()
-                self.load_items()
+                self.show_saved_item(item, 0)
 
-            except Exception as e:
-                messagebox.showerror("Error", f"Invalid input or database error:\n{e}")
+            self.executor.submit(
+                self.item_repo.add_item, new_name, type_, arrival_date, discount, price, price_date, stock_qty,
+                on_success=on_added, on_error=self.show_save_error, owner=self
+            )
 
         save_btn = tk.Button(add_win, text="Add Item", command=save_new_item)
         save_btn.pack(pady=20)
 
+    @measured
     def handle_click(self, event):
         region = self.tree.identify("region", event.x, event.y)
         if region == "cell":
@@ -234,130 +301,107 @@ class ItemView(tk.Frame):
             if not row_id:
                 return
 
-            item_values = self.tree.item(row_id, "values")
-            tags= self.tree.item(row_id, "tags")
-            item_id_tag= tags[0]
-            if not item_id_tag.startswith("id_"):
-                return
-            item_id= item_id_tag[3:]
+            # the row's iid is its Item_id
+            item_id = int(row_id)
 
             if col == "#1":  # Edit icon column
                 self.edit_item(item_id)
             elif col == "#12":  # Delete icon column
                 self.delete_item(item_id)
-                
-            print("Clicked column:", col, "item_id:", item_id)
 
     def delete_item(self, item_id):
         answer = messagebox.askyesno("Delete Item", f"Are you sure you want to delete this item?")
         if answer:
-            try:
-                conn = self.connect_db()
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM Item WHERE Item_id = %s", (item_id,))
-                conn.commit()
-                
-                if cursor.rowcount == 0:
+            def on_deleted(rowcount):
+                if rowcount == 0:
                     messagebox.showwarning("Delete Failed", "Item not found or could not be deleted.")
-                    
-                conn.close()
-                messagebox.showinfo("Deleted", "Item was deleted successfully.")
-                self.load_items()
-                
-            except mysql.connector.Error as err:
-                messagebox.showerror("Database Error", f"Error: {err}")
+                else:
+                    messagebox.showinfo("Deleted", "Item was deleted successfully.")
+                self.forget_item(item_id)
 
-    def edit_item(self, item_id):
-        try:
-            conn = self.connect_db()
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT Name, Type, Arrival_date, Item_discount, Price_amount, Price_date, Stock_quantity "
-                "FROM Item WHERE Item_id = %s", (item_id,)
+            self.executor.submit(
+                self.item_repo.delete_item, item_id,
+                on_success=on_deleted, on_error=self.show_db_error, owner=self
             )
-            item = cursor.fetchone()
-            conn.close()
 
-            if not item:
-                messagebox.showerror("Error", "No item found")
-                return
+    def edit_item(self, item_id):
+        self.executor.submit(
+            self.item_repo.get_item, item_id,
+            on_success=lambda item: self.open_edit_window(item_id, item), on_error=self.show_db_error,
+            group=self.section, key="items.edit", owner=self
+        )
 
-            # Create the edit popup
-            edit_win = tk.Toplevel(self)
-            edit_win.title(f"Edit Item")
-            edit_win.geometry("400x400")
-            edit_win.configure(bg=self.lavender)
-
-            labels = [
-                "Name", "Type", "Arrival Date (YYYY-MM-DD)", "Discount (0.0 - 1.0)",
-                "Price", "Price Date (YYYY-MM-DD)", "Stock Quantity"
-            ]
-            entries = []
-
-            for idx, (label, value) in enumerate(zip(labels, item)):
-                tk.Label(edit_win, text=label + ":", bg=self.lavender).pack(pady=(10 if idx == 0 else 5, 0))
-                entry = tk.Entry(edit_win)
-                entry.pack()
-                if idx == 3:
-                    entry.insert(0, str(float(value) * 100 if value is not None else ""))
-                else:
-                    entry.insert(0, str(value if value is not None else ""))
+    def open_edit_window(self, item_id, item):
+        if not item:
+            messagebox.showerror("Error", "No item found")
+            return
 
-                entries.append(entry)
+        # Create the edit popup
+        edit_win = tk.Toplevel(self)
+        edit_win.title(f"Edit Item")
+        edit_win.geometry("400x400")
+        edit_win.configure(bg=self.lavender)
+
+        labels = [
+            "Name", "Type", "Arrival Date (YYYY-MM-DD)", "Discount (0.0 - 1.0)",
+            "Price", "Price Date (YYYY-MM-DD)", "Stock Quantity"
+        ]
+        entries = []
 
-            def save_changes():
-                new_values = [e.get().strip() for e in entries]
+        for idx, (label, value) in enumerate(zip(labels, item)):
+            tk.Label(edit_win, text=label + ":", bg=self.lavender).pack(pady=(10 if idx == 0 else 5, 0))
+            entry = tk.Entry(edit_win)
+            entry.pack()
+            if idx == 3:
+                entry.insert(0, str(float(value) * 100 if value is not None else ""))
+            else:
+                entry.insert(0, str(value if value is not None else ""))
 
-                if not all(new_values):
-                    messagebox.showwarning("Missing Info", "All fields are required.")
-                    return
+            entries.append(entry)
 
-                try:
-                    new_name = new_values[0]
-                    type_ = new_values[1]
-                    arrival_date = datetime.strptime(new_values[2], "%Y-%m-%d").date()
-                    discount = float(new_values[3]) / 100 
-                    price = float(new_values[4])
-                    price_date = datetime.strptime(new_values[5], "%Y-%m-%d").date()
-                    stock_qty = int(new_values[6])
+        def save_changes():
+            new_values = [e.get().strip() for e in entries]
 
-                    conn = self.connect_db()
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                        UPDATE Item
-                        SET Name=%s, Type=%s, Arrival_date=%s, Item_discount=%s,
-                            Price_amount=%s, Price_date=%s, Stock_quantity=%s
-                        WHERE Item_id=%s
-                    """, (new_name, type_, arrival_date, discount, price, price_date, stock_qty, item_id))
-                    conn.commit()
-                    conn.close()
+            if not all(new_values):
+                messagebox.showwarning("Missing Info", "All fields are required.")
+                return
 
-                    messagebox.showinfo("Success", "Item updated.")
-                    edit_win.destroy()
-                    self.load_items()
+            try:
+                new_name = new_values[0]
+                type_ = new_values[1]
+                arrival_date = datetime.strptime(new_values[2], "%Y-%m-%d").date()
+                discount = float(new_values[3]) / 100 
+                price = float(new_values[4])
+                price_date = datetime.strptime(new_values[5], "%Y-%m-%d").date()
+                stock_qty = int(new_values[6])
+            except ValueError as e:
+                messagebox.showerror("Error", f"Invalid input or database error:\n{e}")
+                return
 
-                except Exception as e:
-                    messagebox.showerror("Error", f"Invalid input or database error:\n{e}")
+            def on_saved(item):
+                messagebox.showinfo("Success", "Item updated.")
+                edit_win.destroy()
+                if item is None:
+                    self.forget_item(item_id)
+                else:
+                    self.show_saved_item(item)
 
-            save_btn = tk.Button(edit_win, text="Save Changes", command=save_changes)
-            save_btn.pack(pady=20)
+            self.executor.submit(
+                self.item_repo.update_item, item_id, new_name, type_, arrival_date, discount, price, price_date, stock_qty,
+                on_success=on_saved, on_error=self.show_save_error, owner=self
+            )
 
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        save_btn = tk.Button(edit_win, text="Save Changes", command=save_changes)
+        save_btn.pack(pady=20)
 
 
 # To test the ItemView Frame standalone
 if __name__ == "__main__":
-    db_config = {
-        "host": "localhost",
-        "user": "root",
-        "password": "Root",
-        "database": "flowershop_management"
-    }
+    db_config = env_db_config()  # HERA_DB_*, like app_gui.py
 
     root = tk.Tk()
     root.title("Flower Shop Management - Items")
     root.geometry("950x500")
-    item_view = ItemView(root, db_config)
+    item_view = ItemView(root, Repositories(connect_pool(db_config)), DBExecutor(root))
     item_view.pack(fill="both", expand=True)
     root.mainloop()
@@ -0,0 +1,155 @@
+import argparse
+import sys
+import mysql.connector
+from backends import add_db_arguments, args_db_config, connect_pool
+
+
+# Versioned schema changes on top of flowershop_schema.sql. Each migration runs
+# once and is recorded in Schema_migrations. MySQL commits DDL implicitly, so a
+# migration that fails half way cannot be rolled back; every step is written to
+# be safe to run again instead.
+
+
+def add_index(table, name, columns):
+    def step(cursor):
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """, (table, name))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+    return step
+
+
+def add_column(table, name, definition):
+    def step(cursor):
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        """, (table, name))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+    return step
+
+
+MIGRATIONS = [
+    # (version, description, steps); a step is a SQL string or a function of the cursor
+    (1, "Indexes for searched, filtered and sorted columns", [
+        # name/phone lookups; only prefix matches (LIKE 'abc%') can use these
+        add_index("Customer", "idx_customer_name", "Name"),
+        add_index("Customer", "idx_customer_phone", "Phone"),
+        add_index("Item", "idx_item_name", "Name"),
+        add_index("Supplier", "idx_supplier_name", "Name"),
+        # status filter on the order list pages by Order_id inside one status
+        add_index("Order_and_Payment", "idx_order_status_id", "Order_status, Order_id"),
+        # monthly customer reports
+        add_index("Order_and_Payment", "idx_order_payment_date", "Payment_date"),
+        # item list is sorted newest arrival first
+        add_index("Item", "idx_item_arrival", "Arrival_date, Item_id"),
+    ]),
+    (2, "Stored order totals on Order_and_Payment", [
+        add_column("Order_and_Payment", "Total_price", "DECIMAL(10,2) NOT NULL DEFAULT 0"),
+        add_column("Order_and_Payment", "Remaining_Payment", "DECIMAL(10,2) NOT NULL DEFAULT 0"),
+        # backfill with the same rules the order screens write: item discounts per
+        # line, Order_discount as a percentage, cancelled orders count as 0
+        """
+        UPDATE Order_and_Payment o
+        LEFT JOIN (
+            SELECT oi.Order_id, SUM(oi.Quantity * oi.Unit_price * (1 - IFNULL(i.Item_discount, 0))) AS Subtotal
+            FROM Orders_Items oi
+            JOIN Item i ON oi.Item_id = i.Item_id
+            GROUP BY oi.Order_id
+        ) totals ON totals.Order_id = o.Order_id
+        SET o.Total_price = CASE
+                WHEN o.Order_status = 'Cancelled' THEN 0
+                ELSE IFNULL(totals.Subtotal, 0) * (1 - IFNULL(o.Order_discount, 0) / 100)
+            END
+        """,
+        "UPDATE Order_and_Payment SET Remaining_Payment = GREATEST(Total_price - IFNULL(Deposit, 0), 0)",
+    ]),
+]
+
+
+def ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Schema_migrations (
+            Version INT PRIMARY KEY,
+            Description VARCHAR(200),
+            Applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(cursor):
+    ensure_migrations_table(cursor)
+    cursor.execute("SELECT Version FROM Schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def pending_migrations(db_pool):
+    conn = db_pool.get_connection()
+    try:
+        cursor = conn.cursor()
+        applied = applied_versions(cursor)
+    finally:
+        conn.close()
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+
+def apply_migrations(db_pool, log=None):
+    # returns the versions applied by this call, oldest first
+    done = []
+    conn = db_pool.get_connection()
+    try:
+        cursor = conn.cursor()
+        applied = applied_versions(cursor)
+        for version, description, steps in MIGRATIONS:
+            if version in applied:
+                continue
+            if log is not None:
+                log(f"Applying migration {version}: {description}")
+            for step in steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            cursor.execute(
+                "INSERT INTO Schema_migrations (Version, Description) VALUES (%s, %s)",
+                (version, description)
+            )
+            conn.commit()
+            done.append(version)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--status", action="store_true", help="list pending migrations without applying them")
+    add_db_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        db_config = args_db_config(args)
+    except ValueError as err:
+        sys.exit(f"Error: {err}")
+    db_pool = connect_pool(db_config, pool_size=1)
+
+    try:
+        if args.status:
+            pending = pending_migrations(db_pool)
+            if not pending:
+                print("Database is up to date")
+            for version, description, _ in pending:
+                print(f"Pending migration {version}: {description}")
+        else:
+            applied = apply_migrations(db_pool, log=print)
+            print(f"Applied {len(applied)} migration(s)" if applied else "Database is up to date")
+    except mysql.connector.Error as err:
+        print(f"Error: {err}")
+    finally:
+        db_pool.close_all()
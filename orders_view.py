@@ -1,14 +1,31 @@
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
+from datetime import datetime
 import mysql.connector
+from backends import env_db_config, connect_pool
+from db_executor import DBExecutor
+from repositories import Repositories, RepositoryError, OrderFilter
+from search_index import PrefixIndex, Debouncer
+from tree_rows import TreeRows
+from ui_metrics import measured
+from export import start_export
+from view_manager import MAX_AGE
 
 class OrderView(tk.Frame):
-    def __init__(self, parent, db_config):
+    def __init__(self, parent, repos, executor):
         super().__init__(parent)
         self.parent = parent
-        self.db_config = db_config
+        self.repos = repos
+        self.order_repo = repos.orders
+        self.customer_repo = repos.customers
+        self.catalog = repos.catalog
+        self.executor = executor
+        self.section = "orders"
         self.lavender = "#E6E6FA"
         self.configure(bg=self.lavender)
+        # New Order customer lookup: (customers version, built at, PrefixIndex)
+        self.customer_index = None
 
         # Search and Buttons Frame 
         
@@ -24,13 +41,22 @@ class OrderView(tk.Frame):
         self.search_var = tk.StringVar()
         self.search_entry = tk.Entry(search_row, textvariable=self.search_var)
         self.search_entry.pack(side="left", padx=(0, 5))
-        search_btn = tk.Button(search_row, text="Search", command=self.search_orders)
+        self.search_entry.bind("<Return>", self.apply_filters)
+        # search as you type, combined with whatever filters are set
+        self.search_debouncer = Debouncer(self, 300, self.on_search_typed)
+        self.search_var.trace_add("write", self.search_debouncer)
+        search_btn = tk.Button(search_row, text="Search", command=self.apply_filters)
         search_btn.pack(side="left", padx=(0, 10))
 
         tk.Button(search_row, text="Clear", command=self.clear_search).pack(side="left", padx=5)
         
         add_order_btn = tk.Button(search_row, text="➕ New Order", command=self.add_order)
         add_order_btn.pack(side="right", padx=(10, 0))
+        # act on every selected row at once (Ctrl/Shift-click to select several)
+        tk.Button(search_row, text="Delete Selected", command=self.delete_selected).pack(side="right", padx=5)
+        tk.Button(search_row, text="Cancel Selected", command=self.cancel_selected).pack(side="right", padx=5)
+        # exports what the filters select, however many pages that is
+        tk.Button(search_row, text="Export", command=self.export_orders).pack(side="right", padx=5)
 
         
         # second:
@@ -42,9 +68,34 @@ class OrderView(tk.Frame):
         self.status_var= tk.StringVar()
         self.status_var.set("All")
         self.status_filter = ttk.Combobox(filter_row, textvariable= self.status_var, values=["All", "Pending", "Processing", "Completed", "Cancelled"], state="readonly", width=12)
-        self.status_filter.bind("<<ComboboxSelected>>", self.on_status_change)
+        self.status_filter.bind("<<ComboboxSelected>>", self.apply_filters)
         self.status_filter.pack(side="left", padx=5)
 
+        tk.Label(filter_row, text="Payment:", bg=self.lavender).pack(side="left", padx=(10, 5))
+        self.payment_var = tk.StringVar(value="All")
+        self.payment_filter = ttk.Combobox(filter_row, textvariable=self.payment_var, values=["All", "Cash", "Credit Card", "Whish", "OMT", "Bank Transfer", "Other"], state="readonly", width=12)
+        self.payment_filter.bind("<<ComboboxSelected>>", self.apply_filters)
+        self.payment_filter.pack(side="left", padx=5)
+
+        tk.Label(filter_row, text="Confirmed:", bg=self.lavender).pack(side="left", padx=(10, 5))
+        self.confirmed_var = tk.StringVar(value="All")
+        self.confirmed_filter = ttk.Combobox(filter_row, textvariable=self.confirmed_var, values=["All", "Yes", "No"], state="readonly", width=5)
+        self.confirmed_filter.bind("<<ComboboxSelected>>", self.apply_filters)
+        self.confirmed_filter.pack(side="left", padx=5)
+
+        # payment date range, YYYY-MM-DD; either end may be left empty
+        tk.Label(filter_row, text="From:", bg=self.lavender).pack(side="left", padx=(10, 5))
+        self.date_from_var = tk.StringVar()
+        date_from_entry = tk.Entry(filter_row, textvariable=self.date_from_var, width=11)
+        date_from_entry.bind("<Return>", self.apply_filters)
+        date_from_entry.pack(side="left")
+        tk.Label(filter_row, text="To:", bg=self.lavender).pack(side="left", padx=5)
+        self.date_to_var = tk.StringVar()
+        date_to_entry = tk.Entry(filter_row, textvariable=self.date_to_var, width=11)
+        date_to_entry.bind("<Return>", self.apply_filters)
+        date_to_entry.pack(side="left")
+        tk.Button(filter_row, text="Apply", command=self.apply_filters).pack(side="left", padx=10)
+
         # Treeview Frame and Scrollbar 
         tree_frame = tk.Frame(self)
         tree_frame.pack(fill="both", expand=True, padx=10, pady=10)
@@ -54,7 +105,8 @@ class OrderView(tk.Frame):
 
         columns = ("Edit", "Order ID", "Customer Name", "Budget", "Total Price", "Deposit", "Remaining Payment", "Order Status", "Confirmation", "Delete")
 
-        self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings", yscrollcommand=scrollbar.set)
+        self.scrollbar = scrollbar
+        self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings", yscrollcommand=self.on_tree_scroll)
         self.tree.pack(side="left", fill="both", expand=True)
 
         scrollbar.config(command=self.tree.yview)
@@ -78,176 +130,194 @@ class OrderView(tk.Frame):
 
         self.tree.configure(cursor="hand2")
         self.tree.bind("<Button-1>", self.handle_click)
+        # rows are keyed by Order_id, so saves and deletes patch just their row
+        self.rows = TreeRows(self.tree, self.order_row)
+
+        self.tree.tag_configure("status_pending", background="#FFFACD")       # light yellow
+        self.tree.tag_configure("status_completed", background="#DFFFD6")     # light green
+        self.tree.tag_configure("status_cancelled", background="#FFD6D6")     # light red/pink
+        self.tree.tag_configure("status_processing", background="#E0F0FF")    # light blue
+
+        # keyset paging state: the list only ever holds the pages scrolled so far
+        self.page_filter = OrderFilter()  # filter behind the rows on screen
+        self.last_order_id = None
+        self.has_more = False
+        self.page_task = None
 
         self.load_orders()
 
-    def connect_db(self):
-        return mysql.connector.connect(
-            host=self.db_config.get("host", "localhost"),
-            user=self.db_config.get("user", "root"),
-            password=self.db_config.get("password", ""),
-            database=self.db_config.get("database", "flowershop_management")
-        )
-        
     def clear_search(self):
         self.search_entry.delete(0, tk.END)
+        self.search_debouncer.cancel()
         self.status_filter.set("All")
+        self.payment_filter.set("All")
+        self.confirmed_filter.set("All")
+        self.date_from_var.set("")
+        self.date_to_var.set("")
+        self.load_first_page(OrderFilter())
+
+    def export_orders(self):
+        start_export(self, self.executor, self.repos, "orders", self.page_filter)
+
+    def refresh(self):
+        # shown again after its data changed; first page of the same filter
         self.load_orders()
 
-    def load_orders(self):
-        try:
-            conn = self.connect_db()
-            cursor = conn.cursor()
-
-            query = """
-                SELECT
-                    o.Order_id,
-                    c.Name,
-                    o.Budget,
-                    SUM(oi.Quantity * oi.Unit_price * (1 - i.Item_discount)) - IFNULL(o.Order_discount, 0) AS Total_Price,
-                    o.Deposit,
-                    GREATEST(
-                        (SUM(oi.Quantity * oi.Unit_price * (1 - i.Item_discount)) - IFNULL(o.Order_discount, 0)) - o.Deposit,
-                        0
-                    ) AS Remaining_Payment,
-                    o.Order_status,
-                    o.Confirmation
-                FROM Order_and_Payment o
-                JOIN Customer c ON o.Customer_id = c.Customer_id
-                JOIN Orders_Items oi ON o.Order_id = oi.Order_id
-                JOIN Item i ON oi.Item_id = i.Item_id
-                GROUP BY o.Order_id, c.Name, o.Budget, o.Deposit, o.Order_discount, o.Order_status, o.Confirmation
-                ORDER BY o.Order_id DESC
-            """
-            cursor.execute(query)
-            orders = cursor.fetchall()
-            conn.close()
-
-            self.display_orders(orders)
-
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+    def load_customer_index(self, on_ready):
+        # The customer table is read and indexed once, not per New Order window;
+        # the index is rebuilt after a customer write here bumps DataVersions,
+        # or after MAX_AGE for customers added from other terminals
+        version = self.repos.versions.snapshot(("customers",))
+        if self.customer_index is not None:
+            built_version, built_at, index = self.customer_index
+            if built_version == version and time.monotonic() - built_at <= MAX_AGE:
+                on_ready(index)
+                return
 
-    def display_orders(self, orders):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
+        def on_built(index):
+            self.customer_index = (version, time.monotonic(), index)
+            on_ready(index)
 
-        for order in orders:
-            (order_id, customer_name, budget, total_price, deposit, remaining_payment, order_status, confirmation) = order
-            
-            status_color_tag = f"status_{order_status.lower().replace(' ', '_')}"
-            self.tree.insert(
-                "", "end",
-                values=(
-                    "🖉 edit",
-                    order_id,
-                    customer_name,
-                    f"{budget:.2f}",
-                    f"{total_price:.2f}",
-                    f"{deposit:.2f}",
-                    f"{remaining_payment:.2f}",
-                    order_status,
-                    "Yes" if confirmation else "No",
-                    "🗑️"
-                ),
-                tags=(f"id_{order_id}", status_color_tag)
-            )
-            
-        self.tree.tag_configure("status_pending", background="#FFFACD")       # light yellow
-        self.tree.tag_configure("status_completed", background="#DFFFD6")     # light green
-        self.tree.tag_configure("status_cancelled", background="#FFD6D6")     # light red/pink
-        self.tree.tag_configure("status_processing", background="#E0F0FF")    # light blue
+        self.executor.submit(
+            lambda: PrefixIndex(self.customer_repo.list_customers(), ("name", "phone")),
+            on_success=on_built, group=self.section, key="orders.customer_index", owner=self
+        )
+
+    def show_db_error(self, err):
+        if isinstance(err, RepositoryError):
+            messagebox.showerror(err.title, str(err))
+        else:
+            messagebox.showerror("Database Error", f"Error: {err}")
+
+    def current_filter(self):
+        # raises ValueError for a date that is not YYYY-MM-DD
+        def parse_date(text):
+            text = text.strip()
+            return datetime.strptime(text, "%Y-%m-%d").date() if text else None
+
+        status = self.status_var.get()
+        payment_method = self.payment_var.get()
+        return OrderFilter(
+            customer_name=self.search_var.get().strip() or None,
+            status=None if status == "All" else status,
+            date_from=parse_date(self.date_from_var.get()),
+            date_to=parse_date(self.date_to_var.get()),
+            payment_method=None if payment_method == "All" else payment_method,
+            confirmed={"Yes": True, "No": False}.get(self.confirmed_var.get()),
+        )
 
-    def search_orders(self):
-        search_text = self.search_var.get().strip()
-        if not search_text:
-            messagebox.showinfo("Search", "Please enter a customer name to search.")
+    def on_search_typed(self):
+        # quiet version of apply_filters for type-ahead: no dialogs while typing
+        try:
+            order_filter = self.current_filter()
+        except ValueError:
             return
+        self.load_first_page(order_filter)
 
+    def apply_filters(self, event=None):
+        # search box and every filter widget end up here, combined into one query
+        self.search_debouncer.cancel()
         try:
-            conn = self.connect_db()
-            cursor = conn.cursor()
-
-            query = """
-                SELECT
-                    o.Order_id,
-                    c.Name,
-                    o.Budget,
-                    SUM(oi.Quantity * oi.Unit_price * (1 - i.Item_discount)) - IFNULL(o.Order_discount, 0) AS Total_Price,
-                    o.Deposit,
-                    GREATEST(
-                        (SUM(oi.Quantity * oi.Unit_price * (1 - i.Item_discount)) - IFNULL(o.Order_discount, 0)) - o.Deposit, 
-                        0
-                    ) AS Remaining_Payment,
-                    o.Order_status,
-                    o.Confirmation
-                FROM Order_and_Payment o
-                JOIN Customer c ON o.Customer_id = c.Customer_id
-                JOIN Orders_Items oi ON o.Order_id = oi.Order_id
-                JOIN Item i ON oi.Item_id = i.Item_id
-                WHERE c.Name LIKE %s
-                GROUP BY o.Order_id, c.Name, o.Budget, o.Deposit, o.Order_discount, o.Order_status, o.Confirmation
-                ORDER BY o.Order_id DESC
-            """
-            cursor.execute(query, (f"%{search_text}%",))
-            orders = cursor.fetchall()
-            conn.close()
-
-            if orders:
-                self.display_orders(orders)
-            else:
-                messagebox.showinfo("Search", f"No orders found for customer '{search_text}'")
+            order_filter = self.current_filter()
+        except ValueError:
+            messagebox.showerror("Input Error", "Dates must be in YYYY-MM-DD format.")
+            return
 
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
-            
-    def on_status_change(self, event):
-        selected_status = self.status_filter.get()
-        if selected_status == "All":
-            self.load_orders()
-        else:
-            self.load_orders_filtered(selected_status)
+        def on_empty():
+            messagebox.showinfo("Search", f"No orders found for customer '{order_filter.customer_name}'")
 
-            
-    def load_orders_filtered(self, status):
-        
-        try: 
-            
-            conn= self.connect_db()
-            cursor= conn.cursor()
-        
-            query= """
-                SELECT
-                    o.Order_id,
-                    c.Name,
-                    o.Budget,
-                    SUM(oi.Quantity * oi.Unit_price * (1 - i.Item_discount)) - IFNULL(o.Order_discount, 0) AS Total_Price,
-                    o.Deposit,
-                    GREATEST(
-                        (SUM(oi.Quantity * oi.Unit_price * (1 - i.Item_discount)) - IFNULL(o.Order_discount, 0)) - o.Deposit,
-                        0
-                    ) AS Remaining_Payment,
-                    o.Order_status,
-                    o.Confirmation
-                FROM Order_and_Payment o
-                JOIN Customer c ON o.Customer_id = c.Customer_id
-                JOIN Orders_Items oi ON o.Order_id = oi.Order_id
-                JOIN Item i ON oi.Item_id = i.Item_id
-                WHERE o.Order_status = %s
-                GROUP BY o.Order_id, c.Name, o.Budget, o.Deposit, o.Order_discount, o.Order_status, o.Confirmation
-                ORDER BY o.Order_id DESC
-            """
-        
-            cursor.execute(query, (status,))
-            orders= cursor.fetchall()
-            conn.close()
-            
-            self.display_orders(orders)
-            
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        # only a name search reports "nothing found"; other filters just show an empty list
+        self.load_first_page(order_filter, on_empty if order_filter.customer_name else None)
+
+    def load_orders(self):
+        # reload whatever filter is on screen
+        self.load_first_page(self.page_filter)
+
+    def load_first_page(self, order_filter, on_empty=None):
+        self.request_page(order_filter, None, on_empty)
+
+    def load_next_page(self):
+        if not self.has_more:
+            return
+        # one page request at a time; a task cancelled by a section switch no longer counts
+        if self.page_task is not None and not self.page_task.cancelled:
+            return
+        self.request_page(self.page_filter, self.last_order_id)
+
+    def request_page(self, order_filter, after_id, on_empty=None):
+        # one keyset page, streamed in chunks; the row past PAGE_SIZE is only
+        # fetched to tell whether another page exists
+        page_size = self.order_repo.PAGE_SIZE
+        state = {"rows": 0}
+
+        def on_chunk(orders):
+            first = state["rows"] == 0 and after_id is None
+            room = page_size - state["rows"]
+            state["rows"] += len(orders)
+            if first:
+                # the new first page replaces the list; rows already shown stay put
+                self.page_filter = order_filter
+                self.display_orders(orders[:room])
+            elif room > 0:
+                self.append_orders(orders[:room])
+
+        def on_done(_):
+            self.page_task = None
+            if state["rows"] == 0 and after_id is None:
+                if on_empty is not None:
+                    on_empty()
+                    return
+                self.page_filter = order_filter
+                self.display_orders([])
+            self.has_more = state["rows"] > page_size
+            # a short first page never scrolls, so check right away whether more is needed
+            if self.has_more:
+                self.after_idle(lambda: self.on_tree_scroll(*self.tree.yview()))
+
+        # same key for every page: a new search or filter supersedes a pending page
+        self.page_task = self.executor.stream(
+            self.order_repo.stream_orders, order_filter, after_id, page_size + 1,
+            on_chunk=on_chunk, on_done=on_done, on_error=self.on_page_error,
+            group=self.section, key="orders.list", owner=self
+        )
+
+    def on_page_error(self, err):
+        self.page_task = None
+        self.show_db_error(err)
+
+    def on_tree_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # fetch the next page before the user actually hits the bottom
+        if float(last) >= 0.9:
+            self.load_next_page()
+
+    def display_orders(self, orders):
+        self.rows.render(orders)
+        self.last_order_id = orders[-1].order_id if orders else None
+
+    def append_orders(self, orders):
+        self.rows.append(orders)
+        if orders:
+            self.last_order_id = orders[-1].order_id
+
+    def order_row(self, order):
+        (order_id, customer_name, budget, total_price, deposit, remaining_payment, order_status, confirmation) = order
         
-            
+        status_color_tag = f"status_{order_status.lower().replace(' ', '_')}"
+        values = (
+            "🖉 edit",
+            order_id,
+            customer_name,
+            f"{budget:.2f}",
+            f"{total_price:.2f}",
+            f"{deposit:.2f}",
+            f"{remaining_payment:.2f}",
+            order_status,
+            "Yes" if confirmation else "No",
+            "🗑️"
+        )
+        return order_id, values, (status_color_tag,)
+
     def add_order(self):
 
         # --- Step 1: Customer Search/Add ---
@@ -265,52 +335,77 @@ class OrderView(tk.Frame):
         search_results_frame.pack(fill="both", expand=True, padx=10, pady=5)
 
         selected_customer = {"id": None}
+        lookup = {"index": None}
+        max_results = 50
 
-        def search_customer():
-            query_text = search_var.get().strip()
+        def show_results(results):
             for widget in search_results_frame.winfo_children():
                 widget.destroy()
 
+            if not results:
+                tk.Label(search_results_frame, text="No customers found.", bg=self.lavender).pack()
+                return
+
+            # Show results with radiobuttons to select customer
+            selected_cust_var = tk.IntVar(value=0)
+
+            def on_select():
+                selected_customer["id"] = selected_cust_var.get()
+
+            for idx, (cid, name, phone, _) in enumerate(results[:max_results]):
+                rb = tk.Radiobutton(
+                    search_results_frame,
+                    text=f"{name} | {phone} (ID: {cid})",
+                    variable=selected_cust_var,
+                    value=cid,
+                    bg=self.lavender,
+                    anchor="w",
+                    command=on_select,
+                )
+                rb.pack(fill="x", anchor="w")
+
+            if len(results) > max_results:
+                tk.Label(search_results_frame, text=f"Showing the first {max_results} matches, keep typing to narrow down.",
+                         bg=self.lavender).pack()
+
+        def search_customer():
+            query_text = search_var.get().strip()
+
             if not query_text:
+                for widget in search_results_frame.winfo_children():
+                    widget.destroy()
                 tk.Label(search_results_frame, text="Enter a name or phone to search.", bg=self.lavender).pack()
                 return
 
-            try:
-                conn = self.connect_db()
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT Customer_id, Name, Phone FROM Customer
-                    WHERE Name LIKE %s OR Phone LIKE %s
-                """, (f"%{query_text}%", f"%{query_text}%"))
-                results = cursor.fetchall()
-                conn.close()
-
-                if not results:
-                    tk.Label(search_results_frame, text="No customers found.", bg=self.lavender).pack()
-                    return
+            # local lookup once the customer index is loaded, the database until then
+            if lookup["index"] is not None:
+                self.executor.cancel_key("orders.customer_lookup")
+                show_results(lookup["index"].search(query_text, limit=max_results + 1))
+                return
 
-                # Show results with radiobuttons to select customer
-                selected_cust_var = tk.IntVar(value=0)
+            self.executor.submit(
+                self.customer_repo.find_customers, query_text,
+                on_success=show_results, on_error=self.show_db_error,
+                group=self.section, key="orders.customer_lookup", owner=search_results_frame
+            )
 
-                def on_select():
-                    selected_customer["id"] = selected_cust_var.get()
+        def set_index(index):
+            if not cust_win.winfo_exists():
+                return
+            lookup["index"] = index
+            if search_var.get().strip():
+                search_customer()
 
-                for idx, (cid, name, phone) in enumerate(results):
-                    rb = tk.Radiobutton(
-                        search_results_frame,
-                        text=f"{name} | {phone} (ID: {cid})",
-                        variable=selected_cust_var,
-                        value=cid,
-                        bg=self.lavender,
-                        anchor="w",
-                        command=on_select,
-                    )
-                    rb.pack(fill="x", anchor="w")
+        self.load_customer_index(set_index)
 
-            except mysql.connector.Error as err:
-                messagebox.showerror("Database Error", f"Error: {err}")
+        search_debouncer = Debouncer(cust_win, 150, search_customer)
+        search_var.trace_add("write", search_debouncer)
 
-        tk.Button(cust_win, text="Search", command=search_customer).pack(pady=5)
+        def search_now():
+            search_debouncer.cancel()
+            search_customer()
+
+        tk.Button(cust_win, text="Search", command=search_now).pack(pady=5)
 
         # New customer inputs (name + phone)
         tk.Label(cust_win, text="Or add New Customer:", bg=self.lavender, font=("Arial", 10, "bold")).pack(pady=(10,2))
@@ -365,22 +460,22 @@ class OrderView(tk.Frame):
             item_dropdown = ttk.Combobox(form_frame, textvariable=item_var, width=40, state="readonly")
             item_dropdown.grid(row=0, column=1, columnspan=2, padx=5)
 
-                # Load in-stock items into dropdown
-            try:
-                conn = self.connect_db()
-                cursor = conn.cursor()
-                cursor.execute("SELECT Item_id, Name, Price_amount, Item_discount FROM Item WHERE Stock_quantity > 0 ORDER BY Name ASC")
-                available_items = cursor.fetchall()
-                conn.close()
-
-                item_map = {
-                    f"{name} (${price:.2f}) (ID: {iid})": (iid, name, price, discount)
-                    for iid, name, price, discount in available_items
-                }
+            # Load in-stock items into dropdown
+            item_map = {}
 
+            def fill_dropdown(available_items):
+                item_map.update({
+                    f"{item.name} (${item.price:.2f}) (ID: {item.item_id})": (item.item_id, item.name, item.price, item.discount)
+                    for item in available_items
+                })
                 item_dropdown["values"] = list(item_map.keys())
-            except mysql.connector.Error as err:
-                messagebox.showerror("Database Error", f"Error loading items: {err}")
+
+            self.executor.submit(
+                self.catalog.options, True,
+                on_success=fill_dropdown,
+                on_error=lambda err: messagebox.showerror("Database Error", f"Error loading items: {err}"),
+                owner=items_win
+            )
 
             tk.Label(form_frame, text="Quantity:", bg=self.lavender).grid(row=0, column=2, padx=5, sticky="e")
             quantity_var = tk.StringVar(value="1")
@@ -401,17 +496,12 @@ class OrderView(tk.Frame):
                     return
                 qty = int(qty_str)
 
-                try:
-                    conn = self.connect_db()
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT Name, Price_amount, Item_discount FROM Item WHERE Item_id = %s", (iid,))
-                    res = cursor.fetchone()
-                    conn.close()
+                def on_item(res):
                     if not res:
                         messagebox.showerror("Error", f"No item found with ID {iid}.")
                         return
 
-                    name, price_amount, discount = res
+                    name, price_amount, discount = res.name, res.price, res.discount
                     total_price = qty * price_amount * (1 - discount)
 
                     # Append to treeview and local list
@@ -420,8 +510,13 @@ class OrderView(tk.Frame):
 
                     # Clear entries
                     quantity_var.set("1")
-                except mysql.connector.Error as err:
-                    messagebox.showerror("Database Error", f"Error: {err}")
+
+                # re-read the item from the database for the current price; the
+                # total shown is a preview, place_order prices the lines itself
+                self.executor.submit(
+                    self.repos.items.get_item, iid,
+                    on_success=on_item, on_error=self.show_db_error, owner=items_win
+                )
 
             add_item_btn = tk.Button(form_frame, text="Add Item", command=add_item)
             add_item_btn.grid(row=0, column=4, padx=10)
@@ -521,8 +616,6 @@ class OrderView(tk.Frame):
             confirm_check.pack(pady=10)
 
             def save_order():
-                nonlocal customer_id
-                
                 try:
                     budget = float(budget_var.get())
                     deposit = float(deposit_var.get())
@@ -537,105 +630,33 @@ class OrderView(tk.Frame):
                 receiver_address = receiver_address_entry.get()
                 receiver_phone = receiver_phone_entry.get()
 
-                # Calculate total price from order_items
-                total_price = sum(float(item["quantity"]) * float(item["unit_price"]) * (1 - float(item["discount"])) for item in order_items)
-                
-                # Apply order discount as percentage
-                total_price_after_discount = total_price * (1 - (order_discount / 100))
-                remaining_payment = max(total_price_after_discount - deposit, 0)
-
+                if not customer_id and (not customer_name or not customer_phone):
+                    messagebox.showerror("Input Error", "Customer name and phone are required.")
+                    return
 
-                try:
-                    conn = self.connect_db()
-                    cursor = conn.cursor()
-                    
-                    if not customer_id: 
-                        if not customer_name or not customer_phone:
-                            messagebox.showerror("Input Error", "Customer name and phone are required.")
-                            return 
-                        
-                        cursor.execute("""
-                            SELECT Customer_id FROM Customer WHERE Name = %s AND Phone = %s
-                        """, (customer_name, customer_phone))
-                        customer= cursor.fetchone()
-                        
-                        if customer: 
-                            customer_id= customer[0]
-                        else: 
-                            cursor.execute("""
-                                INSERT INTO Customer (Name, Phone) VALUES (%s, %s)
-                            """, (customer_name, customer_phone))
-                            
-                            customer_id= cursor.lastrowid
-                        
-
-                    # Insert order_and_payment
-                    cursor.execute("""
-                        INSERT INTO Order_and_Payment
-                        (Customer_id, Employee_id, Order_status, Order_discount, Payment_date, Payment_method,
-                        Total_price, Budget, Deposit, Confirmation, Receiver_address, Receiver_phone)
-                    VALUES (%s, %s, %s, %s, NOW(), %s, %s, %s, %s, %s, %s, %s)
-                    """, (customer_id, 4, order_status, order_discount, payment_method, total_price_after_discount, budget,
-                            deposit, int(confirmation_var.get()), receiver_address, receiver_phone ))
-                    order_id = cursor.lastrowid
-
-                    # Insert Orders_Items
-                    for item in order_items:
-                        
-                        item_id= item["item_id"]
-                        quantity= int(item["quantity"])
-                        unit_price= item["unit_price"]
-                        
-                        # check stock for each item before placing the order
-                        
-                        cursor.execute("SELECT Stock_quantity, Name FROM Item WHERE Item_id = %s", (item_id,))
-                        result = cursor.fetchone()
-
-                        if result is None:
-                            messagebox.showerror("Error", f"Item ID: {item_id} not found.")
-                            conn.rollback()
-                            conn.close()
-                            return
-                        
-                        stock_available, item_name = result[0], result[1]
-                        
-                        if quantity > stock_available:
-                            messagebox.showerror("Stock Error", f"Only {stock_available} units in stock for {item_name}. You tried to order {quantity}.")
-                            conn.rollback()
-                            conn.close()
-                            return
-                        
-                        # insert Orders_Items and update stock
-                        
-                        cursor.execute("""
-                            INSERT INTO Orders_Items (Order_id, Item_id, Quantity, Unit_price)
-                            VALUES (%s, %s, %s, %s)
-                        """, (order_id, item_id, quantity, unit_price))
-                            
-                        # decrease stock
-                        cursor.execute("""
-                            UPDATE Item SET Stock_quantity = Stock_quantity - %s WHERE Item_id = %s
-                        """, (quantity, item_id))
-                        
-                    
-                    # award loyalty points if fully paid
-                    if deposit >= total_price_after_discount:
-                        points_to_add= int(total_price_after_discount // 10) # assuming 10$ = 1 point
-                        cursor.execute("""
-                            UPDATE Customer
-                            SET Loyalty_points = Loyalty_points + %s
-                            WHERE Customer_id = %s
-                        """, (points_to_add, customer_id))
-                    
-                    conn.commit()
-                    conn.close()
-
-                    messagebox.showinfo("Success", f"Order #{order_id} added successfully!")
+                def on_saved(order):
+                    messagebox.showinfo("Success", f"Order #{order.order_id} added successfully!")
                     details_win.destroy()
-                    self.load_orders()
-
-                except mysql.connector.Error as err:
-                    messagebox.showerror("Database Error", f"Error saving order: {err}")
+                    # newest order goes on top; under a filter it may not belong
+                    # in the list at all, so it shows up with the next search
+                    if self.page_filter == OrderFilter():
+                        self.rows.put(order, 0)
+
+                def on_failed(err):
+                    save_btn.config(state="normal")
+                    if isinstance(err, RepositoryError):
+                        messagebox.showerror(err.title, str(err))
+                    else:
+                        messagebox.showerror("Database Error", f"Error saving order: {err}")
+
+                # no double submit while the order is being written
+                save_btn.config(state="disabled")
+                self.executor.submit(
+                    self.order_repo.place_order, customer_id, customer_name, customer_phone, order_items,
+                    budget, deposit, order_discount, payment_method, order_status, confirmation,
+                    receiver_address, receiver_phone,
+                    on_success=on_saved, on_error=on_failed, owner=self
+                )
 
 
             def go_back_to_step2():
@@ -646,8 +667,10 @@ class OrderView(tk.Frame):
             nav_frame.pack(pady=10)
 
             tk.Button(nav_frame, text="Back", command=go_back_to_step2).pack(side=tk.LEFT, padx=(20, 5))
-            tk.Button(nav_frame, text="Save Order", command=save_order).pack(side=tk.RIGHT, padx=(5, 20))
+            save_btn = tk.Button(nav_frame, text="Save Order", command=save_order)
+            save_btn.pack(side=tk.RIGHT, padx=(5, 20))
 
+    @measured
     def handle_click(self, event):
         region = self.tree.identify("region", event.x, event.y)
         if region != "cell":
@@ -659,12 +682,8 @@ class OrderView(tk.Frame):
         if not row_id:
             return
 
-        order_values = self.tree.item(row_id, "values")
-        tags = self.tree.item(row_id, "tags")
-        item_id_tag = tags[0]
-        if not item_id_tag.startswith("id_"):
-            return
-        order_id = item_id_tag[3:]
+        # the row's iid is its Order_id
+        order_id = int(row_id)
 
         if col == "#1":  # Edit column
             self.edit_order(order_id)
@@ -675,56 +694,56 @@ class OrderView(tk.Frame):
 
     def delete_order(self, order_id):
         answer = messagebox.askyesno("Delete Order", f"Are you sure you want to delete order {order_id}?")
-        if answer:
-            try:
-                conn = self.connect_db()
-                cursor = conn.cursor()
-                
-                # get items and quantities from the order to return to stock
-                cursor.execute("""
-                    SELECT Item_id, Quantity 
-                    FROM Orders_Items 
-                    WHERE Order_id = %s
-                """, (order_id,))
-                items= cursor.fetchall()
-                
-                # return quantities to stock
-                for item_id, quantity in items:
-                    cursor.execute("""
-                        UPDATE Item
-                        SET Stock_quantity = Stock_quantity + %s
-                        WHERE Item_id = %s
-                    """, (quantity, item_id))
-                    
-                # get order total and customer id
-                cursor.execute("""
-                    SELECT Total_price, Customer_id
-                    FROM Order_and_Payment
-                    WHERE Order_id = %s
-                """, (order_id,))
-                result= cursor.fetchone()
-                
-                if result:
-                    total_price, customer_id = result
-                    
-                    # adjust loyalty points (assuming 10$ = 1 point)
-                    loyalty_points_to_deduct= int(total_price // 10)
-                    cursor.execute("""
-                        UPDATE Customer
-                        SET Loyalty_points = GREATEST(Loyalty_points - %s, 0)
-                        WHERE Customer_id = %s
-                    """, (loyalty_points_to_deduct, customer_id))
-                    
-                # delete order
-                cursor.execute("DELETE FROM Order_and_Payment WHERE Order_id = %s", (order_id,))
-                conn.commit()
-                conn.close()
-                
-                messagebox.showinfo("Deleted", "Order was deleted successfully.")
-                self.load_orders()
-                
-            except mysql.connector.Error as err:
-                messagebox.showerror("Database Error", f"Error: {err}")
+        if not answer:
+            return
+
+        def on_deleted(_):
+            messagebox.showinfo("Deleted", "Order was deleted successfully.")
+            self.rows.remove(order_id)
+
+        self.executor.submit(
+            self.order_repo.delete_order, order_id,
+            on_success=on_deleted, on_error=self.show_db_error, owner=self
+        )
+
+    def selected_order_ids(self):
+        return [int(iid) for iid in self.tree.selection()]
+
+    def cancel_selected(self):
+        order_ids = self.selected_order_ids()
+        if not order_ids:
+            messagebox.showwarning("No Selection", "Please select the orders to cancel.")
+            return
+        if not messagebox.askyesno("Cancel Orders", f"Cancel {len(order_ids)} selected order(s)? Their items go back to stock."):
+            return
+
+        def on_cancelled(orders):
+            for order in orders:
+                self.rows.update(order)
+            messagebox.showinfo("Orders Cancelled", f"{len(orders)} order(s) cancelled.")
+
+        self.executor.submit(
+            self.order_repo.cancel_orders, order_ids,
+            on_success=on_cancelled, on_error=self.show_db_error, owner=self
+        )
+
+    def delete_selected(self):
+        order_ids = self.selected_order_ids()
+        if not order_ids:
+            messagebox.showwarning("No Selection", "Please select the orders to delete.")
+            return
+        if not messagebox.askyesno("Delete Orders", f"Are you sure you want to delete {len(order_ids)} selected order(s)?"):
+            return
+
+        def on_deleted(count):
+            for order_id in order_ids:
+                self.rows.remove(order_id)
+            messagebox.showinfo("Deleted", f"{count} order(s) deleted.")
+
+        self.executor.submit(
+            self.order_repo.delete_orders, order_ids,
+            on_success=on_deleted, on_error=self.show_db_error, owner=self
+        )
 
     def edit_order(self, order_id):
         
@@ -738,41 +757,24 @@ class OrderView(tk.Frame):
             order_id= self.tree.item(selected, "values")[0]
         
 
-        # load existing order data
-        try:
-            conn = self.connect_db()
-            cursor = conn.cursor(dictionary=True)
-
-            # get order + customer info
-            cursor.execute("""
-                SELECT o.Order_id, o.Customer_id, c.Name AS Customer_name, c.Phone AS Customer_phone,
-                   o.Budget, o.Deposit, o.Order_discount, o.Payment_method, o.Order_status,
-                   o.Confirmation, o.Receiver_address, o.Receiver_phone
-                FROM Order_and_Payment o
-                JOIN Customer c ON o.Customer_id = c.Customer_id
-                WHERE o.Order_id = %s
-            """, (order_id,))
-            order_info = cursor.fetchone()
-
-            # get order items
-            cursor.execute("""
-                SELECT oi.Item_id, i.Name, oi.Quantity, oi.Unit_price, i.Item_discount, i.Stock_quantity
-                FROM Orders_Items oi
-                JOIN Item i ON oi.Item_id = i.Item_id
-                WHERE oi.Order_id = %s
-            """, (order_id,))
-            order_items = cursor.fetchall()
-            
-            conn.close()
-        except mysql.connector.Error as err:
-            messagebox.showerror("DB Error", f"Failed to load order info: {err}")
-            return
+        def fetch_order():
+            # runs on a worker thread
+            order_info, order_items = self.order_repo.get_order_for_edit(order_id)
+            return order_info, order_items, self.catalog.options()
 
+        self.executor.submit(
+            fetch_order,
+            on_success=lambda result: self.open_edit_window(order_id, *result),
+            on_error=lambda err: messagebox.showerror("DB Error", f"Failed to load order info: {err}"),
+            group=self.section, key="orders.edit", owner=self
+        )
+
+    def open_edit_window(self, order_id, order_info, order_items, available_items):
         if not order_info:
             messagebox.showerror("Error", "Order not found.")
             return
 
-        original_items = {item['Item_id']: item['Quantity'] for item in order_items}
+        original_items = {item.item_id: item.quantity for item in order_items}
 
         # create edit window 
         edit_win = tk.Toplevel(self)
@@ -780,7 +782,7 @@ class OrderView(tk.Frame):
         edit_win.geometry("750x770")
         edit_win.configure(bg=self.lavender)
 
-        tk.Label(edit_win, text=f"Customer: {order_info['Customer_name']} (ID: {order_info['Customer_id']})",
+        tk.Label(edit_win, text=f"Customer: {order_info.customer_name} (ID: {order_info.customer_id})",
             bg=self.lavender, font=("Arial", 12, "bold")).pack(pady=10)
 
         # treeview for order items
@@ -793,10 +795,10 @@ class OrderView(tk.Frame):
 
         # insert existing items
         for item in order_items:
-            total_price = item['Quantity'] * item['Unit_price'] * (1 - item['Item_discount'])
+            total_price = item.quantity * item.unit_price * (1 - item.item_discount)
             tree.insert("", "end", values=(
-                item['Item_id'], item['Name'], item['Quantity'], f"{item['Unit_price']:.2f}",
-                f"{item['Item_discount']:.2%}", f"{total_price:.2f}"
+                item.item_id, item.name, item.quantity, f"{item.unit_price:.2f}",
+                f"{item.item_discount:.2%}", f"{total_price:.2f}"
         ))
 
         # add item form
@@ -808,20 +810,11 @@ class OrderView(tk.Frame):
         item_dropdown = ttk.Combobox(form_frame, textvariable=item_var, width=40, state="readonly")
         item_dropdown.grid(row=0, column=1, columnspan=2, padx=5)
 
-        try:
-            conn = self.connect_db()
-            cursor = conn.cursor()
-            cursor.execute("SELECT Item_id, Name, Price_amount, Item_discount, Stock_quantity FROM Item ORDER BY Name ASC")
-            available_items = cursor.fetchall()
-            conn.close()
-
-            item_map = {
-                f"{name} (${price:.2f}) (ID: {item_id})": (item_id, name, price, stock, status)
-                for item_id, name, price, stock, status in available_items
-            }
-            item_dropdown["values"] = list(item_map.keys())
-        except mysql.connector.Error as err:
-            messagebox.showerror("DB Error", f"Failed loading items: {err}")
+        item_map = {
+            f"{name} (${price:.2f}) (ID: {item_id})": (item_id, name, price, stock, status)
+            for item_id, name, price, stock, status in available_items
+        }
+        item_dropdown["values"] = list(item_map.keys())
 
         tk.Label(form_frame, text="Quantity:", bg=self.lavender).grid(row=0, column=3, padx=5, sticky="e")
         quantity_var = tk.StringVar(value="1")
@@ -880,14 +873,14 @@ class OrderView(tk.Frame):
 
 
         # order details entries 
-        budget_var = tk.StringVar(value=str(order_info['Budget']))
-        deposit_var = tk.StringVar(value=str(order_info['Deposit']))
-        discount_var = tk.StringVar(value=str(order_info['Order_discount']))
-        payment_method_var = tk.StringVar(value=order_info.get('Payment_method', 'Cash'))
-        status_var = tk.StringVar(value=order_info['Order_status'])
-        confirmation_var = tk.BooleanVar(value=bool(order_info['Confirmation']))
-        receiver_address_var = tk.StringVar(value=order_info.get('Receiver_address', ''))
-        receiver_phone_var = tk.StringVar(value=order_info.get('Receiver_phone', ''))
+        budget_var = tk.StringVar(value=str(order_info.budget))
+        deposit_var = tk.StringVar(value=str(order_info.deposit))
+        discount_var = tk.StringVar(value=str(order_info.order_discount))
+        payment_method_var = tk.StringVar(value=order_info.payment_method or 'Cash')
+        status_var = tk.StringVar(value=order_info.order_status)
+        confirmation_var = tk.BooleanVar(value=bool(order_info.confirmation))
+        receiver_address_var = tk.StringVar(value=order_info.receiver_address or '')
+        receiver_phone_var = tk.StringVar(value=order_info.receiver_phone or '')
         
 
         def create_labeled_entry(parent, label, var):
@@ -919,7 +912,7 @@ class OrderView(tk.Frame):
         confirm_check.pack(pady=10)
         
         # If order is cancelled, disable editing
-        if order_info['Order_status'] == "Cancelled":
+        if order_info.order_status == "Cancelled":
             tree.configure(selectmode="none")  # Disable item selection in treeview
             for widget in edit_win.winfo_children():
                 if isinstance(widget, tk.Entry) or isinstance(widget, ttk.Combobox):
@@ -967,232 +960,114 @@ class OrderView(tk.Frame):
                 discount = float(vals[4].strip('%')) / 100
                 updated_items.append({"item_id": iid, "quantity": qty, "unit_price": unit_price, "discount": discount})
 
-            # calculate total price after discount
-            total_price = sum(item['quantity'] * item['unit_price'] * (1 - item['discount']) for item in updated_items)
-            total_price_after_discount = total_price * (1 - (order_discount / 100))
-            
-                    
-            try:
-                conn = self.connect_db()
-                cursor = conn.cursor()
-                
-                # get old total price and customer id before any updates
-                cursor.execute("""
-                    SELECT Total_price, Customer_id, Deposit
-                    FROM Order_and_Payment WHERE Order_id = %s
-                """, (order_id,))
-                
-                result= cursor.fetchone()
-                if not result:
-                    messagebox.showerror("Error", "Order not found for loyalty update.")
-                    conn.close()
-                    return 
-                
-                prev_total, customer_id, deposit_old= result
-                
-                old_loyalty_points = int(prev_total // 10) if deposit_old >= prev_total else 0
-                
-                # always subtract previously awarded loyalty points if any
-                cursor.execute("""
-                    UPDATE Customer 
-                    SET Loyalty_points = GREATEST(Loyalty_points - %s, 0)
-                    WHERE Customer_id = %s
-                """, (old_loyalty_points, customer_id))
-
-                
-                # check if order was changed to "Cancelled"
+            def on_saved(order):
                 if order_status == "Cancelled":
-                    
-                    cursor.execute("SELECT Item_id, Quantity FROM Orders_Items WHERE Order_id = %s", (order_id,))
-                    
-                    for item_id, qty in cursor.fetchall():
-                        cursor.execute("UPDATE Item SET Stock_quantity = Stock_quantity + %s WHERE Item_id = %s", (qty, item_id))
-
-                    #cursor.execute("DELETE FROM Orders_Items WHERE Order_id = %s", (order_id,))
-                    
-                    cursor.execute("""
-                        UPDATE Order_and_Payment
-                        SET Budget=%s, Deposit=%s, Order_discount=%s, Payment_method=%s,
-                            Order_status=%s, Confirmation=%s, Receiver_address=%s, Receiver_phone=%s,
-                            Total_price = 0
-                        WHERE Order_id = %s
-                    """, (budget, deposit, order_discount, payment_method, order_status, int(confirmation),
-                        receiver_address, receiver_phone, order_id))
-                    
-                    conn.commit()
-                    conn.close()
-                    
                     messagebox.showinfo("Order Cancelled", "Order cancelled and reverted successfully.")
-                    
-                    edit_win.destroy()
-                    self.load_orders()
-            
-                    return
-                    
-                # update order info
-                cursor.execute("""
-                    UPDATE Order_and_Payment
-                    SET Budget=%s, Deposit=%s, Order_discount=%s, Payment_method=%s,
-                        Order_status=%s, Confirmation=%s, Receiver_address=%s, Receiver_phone=%s
-                    WHERE Order_id= %s
-                """, (budget, deposit, order_discount, payment_method,
-                    order_status, int(confirmation), receiver_address, receiver_phone, order_id))
-                
-                cursor.execute("SELECT Item_id, Quantity FROM Orders_Items WHERE Order_id = %s", (order_id,))
-                original = {iid: qty for iid, qty in cursor.fetchall()}
-
-                updated = {item['item_id']: item for item in updated_items}
-                
-                # adjust stock and Orders_Items
-                for iid in set(original) | set(updated):
-                    old_qty = original.get(iid, 0)
-                    new_qty = updated.get(iid, {}).get("quantity", 0)
-                    diff = new_qty - old_qty
-                    if diff != 0:
-                        cursor.execute("UPDATE Item SET Stock_quantity = Stock_quantity - %s WHERE Item_id = %s", (diff, iid))
-
-                    if old_qty and not new_qty:
-                        cursor.execute("DELETE FROM Orders_Items WHERE Order_id = %s AND Item_id = %s", (order_id, iid))
-                    elif new_qty and not old_qty:
-                        data = updated[iid]
-                        cursor.execute("""
-                            INSERT INTO Orders_Items (Order_id, Item_id, Quantity, Unit_price)
-                            VALUES (%s, %s, %s, %s)
-                        """, (order_id, iid, data['quantity'], data['unit_price']))
-                    elif old_qty and new_qty:
-                        cursor.execute("""
-                            UPDATE Orders_Items SET Quantity = %s WHERE Order_id = %s AND Item_id = %s
-                        """, (new_qty, order_id, iid))
-                        
-                # loyalty points (only if fully paid)
-                
-                if int(confirmation) == 1 and deposit >= total_price_after_discount:
-                    new_points = int(total_price_after_discount // 10)
-                    cursor.execute("UPDATE Customer SET Loyalty_points = Loyalty_points + %s WHERE Customer_id = %s",
-                           (new_points, customer_id))
-
-                cursor.execute("UPDATE Order_and_Payment SET Total_price = %s WHERE Order_id = %s",
-                       (total_price_after_discount, order_id))
-
-                conn.commit()
-                conn.close()
-
-                messagebox.showinfo("Success", f"Order #{order_id} updated successfully!")
+                else:
+                    messagebox.showinfo("Success", f"Order #{order_id} updated successfully!")
                 edit_win.destroy()
-                self.load_orders()
-
-
-            except mysql.connector.Error as err:
-                messagebox.showerror("Database Error", f"Database error: {err}")
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
+                if order is None:
+                    self.rows.remove(order_id)
+                else:
+                    self.rows.update(order)
+
+            def on_failed(err):
+                save_btn.config(state="normal")
+                if isinstance(err, RepositoryError):
+                    messagebox.showerror(err.title, str(err))
+                elif isinstance(err, mysql.connector.Error):
+                    messagebox.showerror("Database Error", f"Database error: {err}")
+                else:
+                    messagebox.showerror("Error", str(err))
+
+            save_btn.config(state="disabled")
+            self.executor.submit(
+                self.order_repo.update_order, order_id, updated_items, budget, deposit, order_discount,
+                payment_method, order_status, confirmation, receiver_address, receiver_phone,
+                on_success=on_saved, on_error=on_failed, owner=self
+            )
 
-        tk.Button(edit_win, text="Save Changes", command=save_edit).pack(pady=20)
+        save_btn = tk.Button(edit_win, text="Save Changes", command=save_edit)
+        save_btn.pack(pady=20)
 
     def show_order_details(self, order_id):
-        try:
-            conn = self.connect_db()
-            cursor = conn.cursor()
-
-            # Get order and customer details
-            cursor.execute("""
-                SELECT o.Order_id, o.Customer_id, o.Employee_id, o.Order_status, o.Order_discount, o.Payment_date,
-                       o.Payment_method, o.Budget, o.Deposit, o.Receiver_address, o.Receiver_phone, o.Confirmation,
-                       c.Name, c.Phone, c.Loyalty_points
-                FROM Order_and_Payment o
-                JOIN Customer c ON o.Customer_id = c.Customer_id
-                WHERE o.Order_id = %s
-            """, (order_id,))
-            order_customer = cursor.fetchone()
-
-            if not order_customer:
-                messagebox.showerror("Error", f"No details found for order {order_id}")
-                return
+        self.executor.submit(
+            self.order_repo.get_order_details, order_id,
+            on_success=lambda result: self.open_details_window(order_id, *result),
+            on_error=self.show_db_error,
+            group=self.section, key="orders.details", owner=self
+        )
 
-            # Get order items details
-            cursor.execute("""
-                SELECT i.Name, oi.Quantity, oi.Unit_price, i.Item_discount
-                FROM Orders_Items oi
-                JOIN Item i ON oi.Item_id = i.Item_id
-                WHERE oi.Order_id = %s
-            """, (order_id,))
-            items = cursor.fetchall()
-
-            conn.close()
-
-            # Create a new window to show details
-            detail_win = tk.Toplevel(self)
-            detail_win.title(f"Order Details - ID {order_id}")
-            detail_win.geometry("700x500")
-            detail_win.configure(bg=self.lavender)
-
-            # Display customer and order info
-            labels = [
-                ("Order ID", order_customer[0]),
-                ("Customer ID", order_customer[1]),
-                ("Employee ID", order_customer[2]),
-                ("Order Status", order_customer[3]),
-                ("Order Discount", order_customer[4]),
-                ("Payment Date", order_customer[5]),
-                ("Payment Method", order_customer[6]),
-                ("Budget", order_customer[7]),
-                ("Deposit", order_customer[8]),
-                ("Receiver Address", order_customer[9]),
-                ("Receiver Phone", order_customer[10]),
-                ("Confirmation", "Yes" if order_customer[11] else "No"),
-                ("Customer Name", order_customer[12]),
-                ("Customer Phone", order_customer[13]),
-                ("Loyalty Points", order_customer[14])
-            ]
-
-            row = 0
-            for label, value in labels:
-                tk.Label(detail_win, text=f"{label}:", bg=self.lavender, anchor="w", font=("Arial", 10, "bold")).grid(row=row, column=0, sticky="w", padx=10, pady=2)
-                tk.Label(detail_win, text=str(value), bg=self.lavender, anchor="w", font=("Arial", 10)).grid(row=row, column=1, sticky="w", padx=10, pady=2)
-                row += 1
-
-            # Separator
-            ttk.Separator(detail_win, orient="horizontal").grid(row=row, column=0, columnspan=2, sticky="ew", pady=10)
-            row += 1
+    def open_details_window(self, order_id, order_customer, items):
+        if not order_customer:
+            messagebox.showerror("Error", f"No details found for order {order_id}")
+            return
 
-            # Items Label
-            tk.Label(detail_win, text="Ordered Items:", bg=self.lavender, font=("Arial", 11, "bold")).grid(row=row, column=0, sticky="w", padx=10)
+        # Create a new window to show details
+        detail_win = tk.Toplevel(self)
+        detail_win.title(f"Order Details - ID {order_id}")
+        detail_win.geometry("700x500")
+        detail_win.configure(bg=self.lavender)
+
+        # Display customer and order info
+        labels = [
+            ("Order ID", order_customer[0]),
+            ("Customer ID", order_customer[1]),
+            ("Employee ID", order_customer[2]),
+            ("Order Status", order_customer[3]),
+            ("Order Discount", order_customer[4]),
+            ("Payment Date", order_customer[5]),
+            ("Payment Method", order_customer[6]),
+            ("Budget", order_customer[7]),
+            ("Deposit", order_customer[8]),
+            ("Receiver Address", order_customer[9]),
+            ("Receiver Phone", order_customer[10]),
+            ("Confirmation", "Yes" if order_customer[11] else "No"),
+            ("Customer Name", order_customer[12]),
+            ("Customer Phone", order_customer[13]),
+            ("Loyalty Points", order_customer[14])
+        ]
+
+        row = 0
+        for label, value in labels:
+            tk.Label(detail_win, text=f"{label}:", bg=self.lavender, anchor="w", font=("Arial", 10, "bold")).grid(row=row, column=0, sticky="w", padx=10, pady=2)
+            tk.Label(detail_win, text=str(value), bg=self.lavender, anchor="w", font=("Arial", 10)).grid(row=row, column=1, sticky="w", padx=10, pady=2)
             row += 1
 
-            # Items Treeview
-            columns = ("Item Name", "Quantity", "Unit Price", "Item Discount", "Total Price")
-            tree = ttk.Treeview(detail_win, columns=columns, show="headings", height=8)
-            for col in columns:
-                tree.heading(col, text=col)
-                tree.column(col, anchor="center", width=120)
-            tree.grid(row=row, column=0, columnspan=2, sticky="nsew", padx=10)
+        # Separator
+        ttk.Separator(detail_win, orient="horizontal").grid(row=row, column=0, columnspan=2, sticky="ew", pady=10)
+        row += 1
 
-            # Insert item data
-            for item in items:
-                name, qty, unit_price, discount = item
-                total = qty * unit_price * (1 - discount)
-                tree.insert("", "end", values=(name, qty, f"{unit_price:.2f}", f"{discount:.2%}", f"{total:.2f}"))
+        # Items Label
+        tk.Label(detail_win, text="Ordered Items:", bg=self.lavender, font=("Arial", 11, "bold")).grid(row=row, column=0, sticky="w", padx=10)
+        row += 1
 
-            detail_win.grid_rowconfigure(row, weight=1)
-            detail_win.grid_columnconfigure(1, weight=1)
+        # Items Treeview
+        columns = ("Item Name", "Quantity", "Unit Price", "Item Discount", "Total Price")
+        tree = ttk.Treeview(detail_win, columns=columns, show="headings", height=8)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, anchor="center", width=120)
+        tree.grid(row=row, column=0, columnspan=2, sticky="nsew", padx=10)
 
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        # Insert item data
+        for item in items:
+            name, qty, unit_price, discount = item
+            total = qty * unit_price * (1 - discount)
+            tree.insert("", "end", values=(name, qty, f"{unit_price:.2f}", f"{discount:.2%}", f"{total:.2f}"))
+
+        detail_win.grid_rowconfigure(row, weight=1)
+        detail_win.grid_columnconfigure(1, weight=1)
 
 
 
 # For testing standalone:
 if __name__ == "__main__":
-    db_config = {
-        "host": "localhost",
-        "user": "root",
-        "password": "Root",  
-        "database": "flowershop_management"
-    }
+    db_config = env_db_config()  # HERA_DB_*, like app_gui.py
 
     root = tk.Tk()
     root.title("Flower Shop Management - Orders")
     root.geometry("1100x500")
-    order_view = OrderView(root, db_config)
+    order_view = OrderView(root, Repositories(connect_pool(db_config)), DBExecutor(root))
     order_view.pack(fill="both", expand=True)
     root.mainloop()
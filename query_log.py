@@ -0,0 +1,273 @@
+import contextvars
+import functools
+import logging
+import queue
+import re
+import sys
+import threading
+import time
+from collections import deque
+from typing import NamedTuple, Optional
+import ui_metrics
+
+
+# Instrumentation for every statement the app runs. A ConnectionPool given a
+# QueryLog hands out cursors wrapped in InstrumentedCursor, which reports per
+# statement: its fingerprint (the SQL with literals and parameters turned
+# into ?), how long it took including reading its rows, how many rows came
+# back and who ran it. Statements slower than the threshold go to the
+# slow-query log, and the first time a SELECT lands there its EXPLAIN is
+# captured on a background thread with a connection of its own.
+#
+# Parameters are never logged, only fingerprints: they hold customer names
+# and phone numbers.
+
+SLOW_QUERY_MS = 200
+EXPLAIN_QUEUE_SIZE = 20
+
+logger = logging.getLogger("flowershop.slow_queries")
+
+# "ItemView.load_items" style name of the view method whose work is running;
+# DBExecutor sets it on its worker threads for every task
+caller = contextvars.ContextVar("query_caller", default=None)
+
+# frames skipped when looking for the code that ran a statement
+PLUMBING_MODULES = {__name__, "db_pool", "db_executor", "contextlib", "threading", "concurrent.futures.thread"}
+PLUMBING_FUNCTIONS = {"fetch_all", "fetch_on", "fetch_one", "stream", "transaction", "wrapper"}
+
+
+class SlowQuery(NamedTuple):
+    at: float
+    ms: float
+    rows: int
+    caller: Optional[str]
+    origin: str
+    fingerprint: str
+
+
+class QueryStats(NamedTuple):
+    fingerprint: str
+    count: int
+    total_ms: float
+    max_ms: float
+    rows: int
+    slow: int
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(statement):
+    text = re.sub(r"/\*.*?\*/|--[^\n]*", " ", statement, flags=re.S)
+    text = re.sub(r"'(?:[^'\\]|\\.|'')*'", "?", text)
+    text = re.sub(r"%s|\b\d+(?:\.\d+)?\b", "?", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    # IN lists and multi-row VALUES of any length are the same statement
+    text = re.sub(r"\bIN \(\?(?:, ?\?)*\)", "IN (...)", text, flags=re.I)
+    text = re.sub(r"(\(\?(?:, ?\?)*\))(?:, ?\(\?(?:, ?\?)*\))+", r"\1, ...", text)
+    return text
+
+
+def frame_name(frame):
+    owner = frame.f_locals.get("self")
+    name = frame.f_code.co_name
+    return f"{type(owner).__name__}.{name}" if owner is not None else name
+
+
+def statement_origin():
+    # the repository method (or script function) that ran the statement
+    frame = sys._getframe(2)
+    while frame is not None and (frame.f_globals.get("__name__") in PLUMBING_MODULES
+                                 or frame.f_code.co_name in PLUMBING_FUNCTIONS):
+        frame = frame.f_back
+    return frame_name(frame) if frame is not None else "-"
+
+
+class QueryLog:
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, path=None, db_config=None, recent=100):
+        # path: slow-query log file; db_config: connection settings for
+        # EXPLAIN, which is skipped without them (and on engines other than MySQL)
+        self.threshold_ms = threshold_ms
+        if db_config is not None and db_config.get("engine", "mysql") != "mysql":
+            db_config = None
+        self.db_config = db_config
+        self.recent_slow = deque(maxlen=recent)
+        self.plans = {}  # fingerprint -> EXPLAIN output
+        self._lock = threading.Lock()
+        self._stats = {}  # fingerprint -> [count, total_ms, max_ms, rows, slow]
+        self._explained = set()
+        self._explain_queue = queue.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+        self._explainer = None
+        if path:
+            self._handler = logging.FileHandler(path, encoding="utf-8")
+            self._handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.setLevel(logging.INFO)
+        else:
+            # without a file the stats and recent_slow are the record; this keeps
+            # the warnings off stderr (logging.lastResort) unless the app routes them
+            self._handler = logging.NullHandler()
+        logger.addHandler(self._handler)
+
+    def record(self, statement, params, ms, rows, origin):
+        text = fingerprint(statement)
+        who = caller.get()
+        slow = ms >= self.threshold_ms
+        with self._lock:
+            entry = self._stats.get(text)
+            if entry is None:
+                entry = self._stats[text] = [0, 0.0, 0.0, 0, 0]
+            entry[0] += 1
+            entry[1] += ms
+            entry[2] = max(entry[2], ms)
+            entry[3] += rows
+            if slow:
+                entry[4] += 1
+                self.recent_slow.append(SlowQuery(time.time(), ms, rows, who, origin, text))
+            explain = (slow and self.db_config is not None and text not in self._explained
+                       and text.upper().startswith("SELECT"))
+            if explain:
+                self._explained.add(text)
+        if not slow:
+            return
+        logger.warning("%.0f ms, %d rows, %s via %s: %s", ms, rows, who or "-", origin, text)
+        if explain:
+            self._queue_explain(text, statement, params)
+
+    def stats(self, limit=None):
+        # busiest statements first (by total time)
+        with self._lock:
+            rows = [QueryStats(text, *entry) for text, entry in self._stats.items()]
+        rows.sort(key=lambda row: row.total_ms, reverse=True)
+        return rows[:limit] if limit else rows
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.recent_slow.clear()
+
+    def _queue_explain(self, text, statement, params):
+        if self._explainer is None:
+            self._explainer = threading.Thread(target=self._explain_worker, name="query-explain", daemon=True)
+            self._explainer.start()
+        try:
+            self._explain_queue.put_nowait((text, statement, params))
+        except queue.Full:
+            with self._lock:
+                self._explained.discard(text)
+
+    def _explain_worker(self):
+        # runs EXPLAIN on a plain connection, outside the pool and uninstrumented;
+        # the driver is imported here so the GUI does not load it before it opens the database
+        import mysql.connector
+        conn = None
+        while True:
+            item = self._explain_queue.get()
+            if item is None:
+                break
+            text, statement, params = item
+            try:
+                if conn is None:
+                    conn = mysql.connector.connect(**{key: value for key, value in self.db_config.items()
+                                                      if key != "engine"})
+                cursor = conn.cursor()
+                cursor.execute("EXPLAIN " + statement, params or ())
+                columns = cursor.column_names
+                plan = "\n".join(
+                    "  " + ", ".join(f"{column}={value}" for column, value in zip(columns, row)
+                                     if value is not None)
+                    for row in cursor.fetchall()
+                )
+                cursor.close()
+            except mysql.connector.Error as err:
+                logger.warning("EXPLAIN failed for %s: %s", text, err)
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                conn = None
+                continue
+            with self._lock:
+                self.plans[text] = plan
+            logger.warning("EXPLAIN %s\n%s", text, plan)
+        if conn is not None:
+            conn.close()
+
+    def close(self):
+        if self._explainer is not None:
+            self._explain_queue.put(None)
+            self._explainer = None
+        if self._handler is not None:
+            logger.removeHandler(self._handler)
+            self._handler.close()
+            self._handler = None
+
+
+class InstrumentedCursor:
+    # Wraps a DB-API cursor. A statement's time is its execute() plus every
+    # fetch that reads its rows, so unbuffered cursors are timed in full; it
+    # is recorded once its rows run out, or at the next execute() or close().
+    # The current UI interaction gets the execute and fetch parts separately.
+    def __init__(self, cursor, query_log):
+        self._cursor = cursor
+        self._log = query_log
+        self._pending = None  # [statement, params, execute ms, fetch ms, origin]
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def flush(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            statement, params, execute_ms, fetch_ms, origin = pending
+            self._log.record(statement, params, execute_ms + fetch_ms, max(self._cursor.rowcount or 0, 0), origin)
+            ui_metrics.add_time("query", execute_ms)
+            ui_metrics.add_time("fetch", fetch_ms)
+
+    def _timed_fetch(self, fetch, *args):
+        started = time.perf_counter()
+        rows = fetch(*args)
+        if self._pending is not None:
+            self._pending[3] += (time.perf_counter() - started) * 1000
+        return rows
+
+    def execute(self, operation, params=(), *args, **kwargs):
+        self.flush()
+        origin = statement_origin()
+        started = time.perf_counter()
+        result = self._cursor.execute(operation, params, *args, **kwargs)
+        self._pending = [operation, params, (time.perf_counter() - started) * 1000, 0.0, origin]
+        if not self._cursor.with_rows:
+            self.flush()
+        return result
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self.flush()
+        origin = statement_origin()
+        started = time.perf_counter()
+        result = self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        self._pending = [operation, None, (time.perf_counter() - started) * 1000, 0.0, origin]
+        self.flush()
+        return result
+
+    def fetchone(self):
+        row = self._timed_fetch(self._cursor.fetchone)
+        if row is None:
+            self.flush()
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed_fetch(self._cursor.fetchmany, *([] if size is None else [size]))
+        if not rows or (size is not None and len(rows) < size):
+            self.flush()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed_fetch(self._cursor.fetchall)
+        self.flush()
+        return rows
+
+    def close(self):
+        self.flush()
+        return self._cursor.close()
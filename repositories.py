@@ -0,0 +1,1119 @@
+import functools
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date
+from decimal import Decimal
+from typing import NamedTuple, Optional
+import mysql.connector
+
+
+# Headless data-access layer: every SQL statement the views run lives here, so
+# queries can be reused, cached, benchmarked or instrumented without Tk.
+
+
+class RepositoryError(Exception):
+    # business-rule failure (duplicate name, not enough stock, ...) with the
+    # dialog title the views show it under
+    def __init__(self, title, message):
+        super().__init__(message)
+        self.title = title
+
+
+# === Typed rows ===
+
+class ItemListRow(NamedTuple):
+    item_id: int
+    name: str
+    type: str
+    arrival_date: Optional[date]
+    discount: Decimal
+    price: Decimal
+    price_date: Optional[date]
+    stock_quantity: int
+    suppliers: Optional[str]
+
+
+class ItemRow(NamedTuple):
+    name: str
+    type: str
+    arrival_date: Optional[date]
+    discount: Decimal
+    price: Decimal
+    price_date: Optional[date]
+    stock_quantity: int
+
+
+class ItemOption(NamedTuple):
+    item_id: int
+    name: str
+    price: Decimal
+    discount: Decimal
+    stock_quantity: int
+
+
+class CustomerRow(NamedTuple):
+    customer_id: int
+    name: str
+    phone: str
+    loyalty_points: int
+
+
+class CustomerOrderHistoryRow(NamedTuple):
+    customer_id: int
+    customer_name: str
+    order_id: int
+    payment_date: Optional[date]
+    total_price: Decimal
+    items: str
+    order_status: str
+
+
+class SupplierListRow(NamedTuple):
+    supplier_id: int
+    name: str
+    contact: str
+    items: Optional[str]
+
+
+class SupplierRow(NamedTuple):
+    name: str
+    contact: str
+
+
+class OrderListRow(NamedTuple):
+    order_id: int
+    customer_name: str
+    budget: Decimal
+    total_price: Decimal
+    deposit: Decimal
+    remaining_payment: Decimal
+    order_status: str
+    confirmation: bool
+
+
+class OrderFilter(NamedTuple):
+    # every field is optional; the set ones are ANDed together
+    customer_name: Optional[str] = None
+    status: Optional[str] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    payment_method: Optional[str] = None
+    confirmed: Optional[bool] = None
+
+
+class OrderEditInfo(NamedTuple):
+    order_id: int
+    customer_id: int
+    customer_name: str
+    customer_phone: str
+    budget: Decimal
+    deposit: Decimal
+    order_discount: Decimal
+    payment_method: str
+    order_status: str
+    confirmation: bool
+    receiver_address: str
+    receiver_phone: str
+
+
+class OrderLineRow(NamedTuple):
+    item_id: int
+    name: str
+    quantity: int
+    unit_price: Decimal
+    item_discount: Decimal
+    stock_quantity: int
+
+
+class OrderDetailRow(NamedTuple):
+    order_id: int
+    customer_id: int
+    employee_id: int
+    order_status: str
+    order_discount: Decimal
+    payment_date: Optional[date]
+    payment_method: str
+    budget: Decimal
+    deposit: Decimal
+    receiver_address: str
+    receiver_phone: str
+    confirmation: bool
+    customer_name: str
+    customer_phone: str
+    loyalty_points: int
+
+
+class OrderDetailLineRow(NamedTuple):
+    name: str
+    quantity: int
+    unit_price: Decimal
+    item_discount: Decimal
+
+
+def order_total(items, order_discount):
+    # items: dicts with quantity, unit_price and discount; order_discount in percent
+    total_price = sum(float(item["quantity"]) * float(item["unit_price"]) * (1 - float(item["discount"])) for item in items)
+    return total_price * (1 - (float(order_discount) / 100))
+
+
+def remaining_payment(total_price, deposit):
+    return max(float(total_price) - float(deposit), 0)
+
+
+# InnoDB errors that roll the whole transaction back and are worth another try
+RETRYABLE_ERRNOS = {
+    1213,  # ER_LOCK_DEADLOCK
+    1205,  # ER_LOCK_WAIT_TIMEOUT
+}
+DEADLOCK_RETRIES = 3
+
+
+def retry_deadlocks(method):
+    # For repository methods that run exactly one transaction. When InnoDB
+    # picks it as a deadlock victim nothing has been committed, so the whole
+    # method can run again; a short random pause lets the winner finish first.
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        for attempt in range(DEADLOCK_RETRIES):
+            try:
+                return method(self, *args, **kwargs)
+            except mysql.connector.Error as err:
+                if err.errno not in RETRYABLE_ERRNOS or attempt == DEADLOCK_RETRIES - 1:
+                    raise
+                time.sleep(random.uniform(0.01, 0.05) * (attempt + 1))
+    return wrapper
+
+
+# === Repositories ===
+
+class DataVersions:
+    # A change counter per kind of data ("items", "orders", ...), bumped after
+    # every committed write that changes it. A screen remembers the counters
+    # of the data it shows and only reloads once one of them has moved.
+    # Only writes made by this process are counted.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = defaultdict(int)
+
+    def bump(self, names):
+        with self._lock:
+            for name in names:
+                self._versions[name] += 1
+
+    def snapshot(self, names):
+        with self._lock:
+            return tuple(self._versions[name] for name in names)
+
+
+class Repository:
+    STREAM_CHUNK_SIZE = 200
+    # data a committed transaction of this repository may have changed
+    WRITES = ()
+
+    def __init__(self, db_pool):
+        self.db_pool = db_pool
+        self.catalog = None  # shared ItemCatalog, set by Repositories
+        self.versions = None  # shared DataVersions, set by Repositories
+
+    def fetch_all(self, query, params=(), row_type=None, prepared=False):
+        conn = self.db_pool.get_connection()
+        try:
+            cursor = conn.prepared_cursor(query) if prepared else conn.cursor()
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+        if row_type is None:
+            return rows
+        return [row_type._make(row) for row in rows]
+
+    def fetch_on(self, cursor, query, params=(), row_type=None):
+        # fetch_all on a cursor inside a transaction, so the rows include its
+        # own uncommitted writes; used to hand the saved row back to the screen
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        if row_type is None:
+            return rows
+        return [row_type._make(row) for row in rows]
+
+    def fetch_one(self, query, params=(), row_type=None):
+        conn = self.db_pool.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            row = cursor.fetchone()
+        finally:
+            conn.close()
+        if row is None or row_type is None:
+            return row
+        return row_type._make(row)
+
+    def stream(self, query, params=(), row_type=None, chunk_size=None, prepared=False):
+        # yields lists of rows straight off an unbuffered (server-side) cursor,
+        # so the first chunk is ready before MySQL has sent the whole result
+        chunk_size = chunk_size or self.STREAM_CHUNK_SIZE
+        conn = self.db_pool.get_connection()
+        cursor = None
+        try:
+            cursor = conn.prepared_cursor(query) if prepared else conn.cursor(buffered=False)
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if row_type is not None:
+                    rows = [row_type._make(row) for row in rows]
+                yield rows
+        finally:
+            # left early: the rest of the result must be read off the wire before
+            # the connection can run anything else; if that fails the pool drops it
+            try:
+                if conn.unread_result:
+                    if prepared:
+                        # binary protocol rows: only the prepared cursor can read them
+                        while cursor.fetchmany(chunk_size):
+                            pass
+                    else:
+                        conn.consume_results()
+            except Exception:
+                pass
+            conn.close()
+
+    @contextmanager
+    def transaction(self, changed_item_ids=None):
+        # changed_item_ids: a set the block fills with the Item ids it touches.
+        # The catalog hears about them only after the commit; a reader
+        # refreshing before that would cache the old rows as current.
+        conn = self.db_pool.get_connection()
+        try:
+            cursor = conn.cursor()
+            yield cursor
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        if changed_item_ids and self.catalog is not None:
+            self.catalog.invalidate(changed_item_ids)
+        if self.versions is not None:
+            self.versions.bump(self.WRITES)
+
+
+class ItemRepository(Repository):
+    WRITES = ("items",)
+    LIST_QUERY = """
+        SELECT
+            i.Item_id, i.Name, i.Type, i.Arrival_date, i.Item_discount,
+            i.Price_amount, i.Price_date, i.Stock_quantity,
+            GROUP_CONCAT(s.Name SEPARATOR ', ')
+        FROM Item i
+        LEFT JOIN Item_Supplier isr ON i.Item_id = isr.Item_id
+        LEFT JOIN Supplier s ON isr.Supplier_id = s.Supplier_id
+        {where}
+        GROUP BY i.Item_id
+        ORDER BY i.Arrival_date DESC, i.Item_id DESC
+    """
+
+    def _list_query(self, search_text):
+        if search_text:
+            return self.LIST_QUERY.format(where="WHERE i.Name LIKE %s"), (f"%{search_text}%",)
+        return self.LIST_QUERY.format(where=""), ()
+
+    def list_items(self, search_text=None):
+        query, params = self._list_query(search_text)
+        return self.fetch_all(query, params, ItemListRow)
+
+    def stream_items(self, search_text=None, chunk_size=None):
+        query, params = self._list_query(search_text)
+        return self.stream(query, params, ItemListRow, chunk_size)
+
+    def _by_id_query(self, item_ids):
+        placeholders = ", ".join(["%s"] * len(item_ids))
+        return self.LIST_QUERY.format(where=f"WHERE i.Item_id IN ({placeholders})"), tuple(item_ids)
+
+    def list_items_by_id(self, item_ids):
+        if not item_ids:
+            return []
+        query, params = self._by_id_query(item_ids)
+        return self.fetch_all(query, params, ItemListRow)
+
+    def _list_row(self, cursor, item_id):
+        query, params = self._by_id_query([item_id])
+        rows = self.fetch_on(cursor, query, params, ItemListRow)
+        return rows[0] if rows else None
+
+    def get_item(self, item_id):
+        return self.fetch_one(
+            "SELECT Name, Type, Arrival_date, Item_discount, Price_amount, Price_date, Stock_quantity "
+            "FROM Item WHERE Item_id = %s", (item_id,), ItemRow
+        )
+
+    def list_options(self, in_stock_only=False):
+        # items for order and supplier pickers, sorted by name
+        where = "WHERE Stock_quantity > 0" if in_stock_only else ""
+        return self.fetch_all(
+            f"SELECT Item_id, Name, Price_amount, Item_discount, Stock_quantity FROM Item {where} ORDER BY Name ASC",
+            row_type=ItemOption
+        )
+
+    def add_item(self, name, type_, arrival_date, discount, price, price_date, stock_qty):
+        # returns the new ItemListRow
+        changed = set()
+        with self.transaction(changed) as cursor:
+            # Check if item with same name exists
+            cursor.execute("SELECT COUNT(*) FROM Item WHERE Name = %s", (name,))
+            if cursor.fetchone()[0] > 0:
+                raise RepositoryError("Error", f"An item with name '{name}' already exists.")
+
+            cursor.execute("""
+                INSERT INTO Item (Name, Type, Arrival_date, Item_discount, Price_amount, Price_date, Stock_quantity)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, (name, type_, arrival_date, discount, price, price_date, stock_qty))
+            item_id = cursor.lastrowid
+            changed.add(item_id)
+            return self._list_row(cursor, item_id)
+
+    def update_item(self, item_id, name, type_, arrival_date, discount, price, price_date, stock_qty):
+        # returns the saved ItemListRow, None if the item is gone
+        with self.transaction({item_id}) as cursor:
+            cursor.execute("""
+                UPDATE Item
+                SET Name=%s, Type=%s, Arrival_date=%s, Item_discount=%s,
+                    Price_amount=%s, Price_date=%s, Stock_quantity=%s
+                WHERE Item_id=%s
+            """, (name, type_, arrival_date, discount, price, price_date, stock_qty, item_id))
+            return self._list_row(cursor, item_id)
+
+    def delete_item(self, item_id):
+        with self.transaction({item_id}) as cursor:
+            cursor.execute("DELETE FROM Item WHERE Item_id = %s", (item_id,))
+            return cursor.rowcount
+
+
+class CustomerRepository(Repository):
+    WRITES = ("customers",)
+    LIST_QUERY = "SELECT Customer_id, Name, Phone, Loyalty_points FROM Customer ORDER BY Customer_id DESC"
+
+    def list_customers(self):
+        return self.fetch_all(self.LIST_QUERY, row_type=CustomerRow)
+
+    def stream_customers(self):
+        return self.stream(self.LIST_QUERY, row_type=CustomerRow)
+
+    def find_customers(self, query_text):
+        # name or phone lookup used by the new-order wizard
+        return self.fetch_all("""
+            SELECT Customer_id, Name, Phone, Loyalty_points FROM Customer
+            WHERE Name LIKE %s OR Phone LIKE %s
+        """, (f"%{query_text}%", f"%{query_text}%"), CustomerRow)
+
+    def order_history(self, name_search):
+        return self.fetch_all("""
+            SELECT
+                c.Customer_id,
+                c.Name,
+                o.Order_id,
+                o.Payment_date,
+                o.Total_price,
+                GROUP_CONCAT(CONCAT(i.Name, ' (', oi.Quantity, ')') SEPARATOR ', ') AS Items,
+                o.Order_status
+            FROM Customer c
+            JOIN Order_and_Payment o ON c.Customer_id = o.Customer_id
+            JOIN Orders_Items oi ON o.Order_id = oi.Order_id
+            JOIN Item i ON oi.Item_id = i.Item_id
+            WHERE c.Name LIKE %s
+            GROUP BY c.Customer_id, c.Name, o.Order_id, o.Payment_date, o.Total_price, o.Order_status
+            ORDER BY o.Payment_date DESC
+        """, (f"%{name_search}%",), CustomerOrderHistoryRow)
+
+    def monthly_customers(self):
+        return self.fetch_all("""
+            SELECT DISTINCT c.Customer_id, c.Name, c.Phone, c.Loyalty_points
+            FROM Customer c
+            JOIN Order_and_Payment o ON c.Customer_id = o.Customer_id
+            WHERE MONTH(o.Payment_date) = MONTH(CURRENT_DATE())
+            AND YEAR(o.Payment_date) = YEAR(CURRENT_DATE())
+            ORDER BY c.Name
+        """, row_type=CustomerRow)
+
+    def new_customers_this_month(self):
+        return self.fetch_all("""
+            SELECT c.Customer_id, c.Name, c.Phone, c.Loyalty_points
+            FROM Customer c
+            WHERE c.Customer_id IN (
+                SELECT o.Customer_id
+                FROM Order_and_Payment o
+                GROUP BY o.Customer_id
+                HAVING MONTH(MIN(o.Payment_date)) = MONTH(CURRENT_DATE())
+                    AND YEAR(MIN(o.Payment_date)) = YEAR(CURRENT_DATE())
+            )
+            ORDER BY c.Name
+        """, row_type=CustomerRow)
+
+    ROW_QUERY = "SELECT Customer_id, Name, Phone, Loyalty_points FROM Customer WHERE Customer_id = %s"
+
+    def get_customer(self, customer_id):
+        return self.fetch_one(self.ROW_QUERY, (customer_id,), CustomerRow)
+
+    def update_customer(self, customer_id, name, phone, loyalty_points):
+        # returns the saved CustomerRow, None if the customer is gone
+        with self.transaction() as cursor:
+            cursor.execute("""
+                UPDATE Customer
+                SET Name=%s, Phone=%s, Loyalty_points=%s
+                WHERE Customer_id=%s
+            """, (name, phone, loyalty_points, customer_id))
+            rows = self.fetch_on(cursor, self.ROW_QUERY, (customer_id,), CustomerRow)
+            return rows[0] if rows else None
+
+    def delete_customer(self, customer_id):
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM Customer WHERE Customer_id = %s", (customer_id,))
+            return cursor.rowcount
+
+
+class SupplierRepository(Repository):
+    WRITES = ("suppliers",)
+    LIST_QUERY = """
+        SELECT s.Supplier_id, s.Name, s.Contact,
+            GROUP_CONCAT(i.Name SEPARATOR ', ') AS Items
+        FROM Supplier s
+        LEFT JOIN Item_Supplier isup ON s.Supplier_id = isup.Supplier_id
+        LEFT JOIN Item i ON isup.Item_id = i.Item_id
+        {where}
+        GROUP BY s.Supplier_id
+        ORDER BY s.Supplier_id DESC
+    """
+
+    def _list_query(self, search_text):
+        if search_text:
+            return self.LIST_QUERY.format(where="WHERE s.Name LIKE %s"), (f"%{search_text}%",)
+        return self.LIST_QUERY.format(where=""), ()
+
+    def list_suppliers(self, search_text=None):
+        query, params = self._list_query(search_text)
+        return self.fetch_all(query, params, SupplierListRow)
+
+    def stream_suppliers(self, search_text=None):
+        query, params = self._list_query(search_text)
+        return self.stream(query, params, SupplierListRow)
+
+    def _list_row(self, cursor, supplier_id):
+        query = self.LIST_QUERY.format(where="WHERE s.Supplier_id = %s")
+        rows = self.fetch_on(cursor, query, (supplier_id,), SupplierListRow)
+        return rows[0] if rows else None
+
+    def get_supplier(self, supplier_id):
+        # (SupplierRow or None, set of linked item ids)
+        supplier = self.fetch_one(
+            "SELECT Name, Contact FROM Supplier WHERE Supplier_id = %s", (supplier_id,), SupplierRow
+        )
+        linked = self.fetch_all("SELECT Item_id FROM Item_Supplier WHERE Supplier_id = %s", (supplier_id,))
+        return supplier, {row[0] for row in linked}
+
+    LINK_BATCH = 1000  # links per DELETE statement
+
+    def _sync_links(self, cursor, links, additive=False):
+        # links: {supplier_id: item ids it should be linked to}. Reads the
+        # current links of those suppliers in one SELECT and writes only the
+        # difference: new links go in with executemany (one multi-row INSERT),
+        # dropped ones go out LINK_BATCH at a time with a row-constructor IN.
+        # additive=True only adds links and keeps the rest.
+        # Returns the Item ids whose links changed.
+        links = {supplier_id: set(item_ids) for supplier_id, item_ids in links.items()}
+        if not links:
+            return set()
+
+        supplier_ids = sorted(links)
+        placeholders = ", ".join(["%s"] * len(supplier_ids))
+        cursor.execute(
+            f"SELECT Supplier_id, Item_id FROM Item_Supplier WHERE Supplier_id IN ({placeholders})",
+            tuple(supplier_ids)
+        )
+        current = set(cursor.fetchall())
+        wanted = {(supplier_id, item_id) for supplier_id, item_ids in links.items() for item_id in item_ids}
+        if additive:
+            wanted |= current
+
+        added = sorted(wanted - current)
+        removed = sorted(current - wanted)
+        for start in range(0, len(removed), self.LINK_BATCH):
+            batch = removed[start:start + self.LINK_BATCH]
+            pairs = ", ".join(["(%s, %s)"] * len(batch))
+            cursor.execute(
+                f"DELETE FROM Item_Supplier WHERE (Supplier_id, Item_id) IN ({pairs})",
+                tuple(value for pair in batch for value in pair)
+            )
+        if added:
+            cursor.executemany("""
+                INSERT INTO Item_Supplier (Item_id, Supplier_id)
+                VALUES (%s, %s)
+            """, [(item_id, supplier_id) for supplier_id, item_id in added])
+        return {item_id for _, item_id in added + removed}
+
+    def sync_links(self, links, additive=False):
+        # bulk version for catalog imports: {supplier_id: item ids}, one
+        # transaction; returns the number of Item ids whose links changed
+        changed = set()
+        with self.transaction(changed) as cursor:
+            changed.update(self._sync_links(cursor, links, additive))
+            return len(changed)
+
+    def add_supplier(self, name, contact, item_ids):
+        # returns the new SupplierListRow
+        # item rows list their suppliers, so linked items change too
+        changed = set()
+        with self.transaction(changed) as cursor:
+            cursor.execute("SELECT COUNT(*) FROM Supplier WHERE Name = %s", (name,))
+            if cursor.fetchone()[0] > 0:
+                raise RepositoryError("Error", f"A Supplier with name '{name}' already exists.")
+
+            cursor.execute("""
+                INSERT INTO Supplier (Name, Contact)
+                VALUES (%s, %s)
+            """, (name, contact))
+            supplier_id = cursor.lastrowid
+
+            # link with selected items
+            changed.update(self._sync_links(cursor, {supplier_id: item_ids}))
+            return self._list_row(cursor, supplier_id)
+
+    def update_supplier(self, supplier_id, name, contact, item_ids):
+        # returns the saved SupplierListRow, None if the supplier is gone
+        # item rows show the supplier's name, so every linked item may change
+        changed = set(item_ids)
+        with self.transaction(changed) as cursor:
+            cursor.execute("""
+                UPDATE Supplier
+                SET Name=%s, Contact=%s
+                WHERE Supplier_id=%s
+            """, (name, contact, supplier_id))
+
+            # only links that were ticked or unticked are written
+            changed.update(self._sync_links(cursor, {supplier_id: item_ids}))
+            return self._list_row(cursor, supplier_id)
+
+    def delete_supplier(self, supplier_id):
+        changed = set()
+        with self.transaction(changed) as cursor:
+            # links reference the supplier, so they go first
+            changed.update(self._sync_links(cursor, {supplier_id: ()}))
+            cursor.execute("DELETE FROM Supplier WHERE Supplier_id = %s", (supplier_id,))
+            return cursor.rowcount
+
+
+class OrderRepository(Repository):
+    # Orders are listed newest first and paged by keyset on Order_id. Totals are
+    # stored on Order_and_Payment by place_order/update_order, so a page is a
+    # straight primary key range scan plus the customer name.
+    # Orders also move item stock, loyalty points and may add a customer.
+    WRITES = ("orders", "items", "customers")
+    LIST_QUERY = """
+        SELECT
+            o.Order_id,
+            c.Name,
+            o.Budget,
+            o.Total_price,
+            o.Deposit,
+            o.Remaining_Payment,
+            o.Order_status,
+            o.Confirmation
+        FROM Order_and_Payment o
+        JOIN Customer c ON o.Customer_id = c.Customer_id
+        {where}
+        ORDER BY o.Order_id DESC
+        {limit}
+    """
+    PAGE_SIZE = 100
+
+    def filter_conditions(self, order_filter=None):
+        # (conditions, params) for an OrderFilter over Order_and_Payment o
+        # joined to Customer c. Conditions always come in the same order, so
+        # the same combination of filters yields the same SQL text.
+        order_filter = order_filter or OrderFilter()
+        conditions, params = [], []
+        if order_filter.customer_name:
+            conditions.append("c.Name LIKE %s")
+            params.append(f"%{order_filter.customer_name}%")
+        if order_filter.status:
+            conditions.append("o.Order_status = %s")
+            params.append(order_filter.status)
+        if order_filter.date_from is not None:
+            conditions.append("o.Payment_date >= %s")
+            params.append(order_filter.date_from)
+        if order_filter.date_to is not None:
+            conditions.append("o.Payment_date <= %s")
+            params.append(order_filter.date_to)
+        if order_filter.payment_method:
+            conditions.append("o.Payment_method = %s")
+            params.append(order_filter.payment_method)
+        if order_filter.confirmed is not None:
+            conditions.append("o.Confirmation = %s")
+            params.append(int(order_filter.confirmed))
+        return conditions, params
+
+    def build_list_query(self, order_filter=None, after_id=None, limit=None):
+        # One builder for every order list, so the same combination of filters
+        # reuses its prepared statement. Status and date filters hit
+        # idx_order_status_id / idx_order_payment_date; after_id is the last
+        # Order_id of the previous page (pages run newest first).
+        conditions, params = self.filter_conditions(order_filter)
+        if after_id is not None:
+            conditions.append("o.Order_id < %s")
+            params.append(after_id)
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        if limit is not None:
+            limit_clause = "LIMIT %s"
+            params.append(limit)
+        else:
+            limit_clause = ""
+        return self.LIST_QUERY.format(where=where, limit=limit_clause), tuple(params)
+
+    def list_orders(self, order_filter=None, after_id=None, limit=None):
+        query, params = self.build_list_query(order_filter, after_id, limit)
+        return self.fetch_all(query, params, OrderListRow, prepared=True)
+
+    def stream_orders(self, order_filter=None, after_id=None, limit=None):
+        query, params = self.build_list_query(order_filter, after_id, limit)
+        return self.stream(query, params, OrderListRow, prepared=True)
+
+    def _list_rows(self, cursor, order_ids):
+        placeholders = ", ".join(["%s"] * len(order_ids))
+        query = self.LIST_QUERY.format(where=f"WHERE o.Order_id IN ({placeholders})", limit="")
+        return self.fetch_on(cursor, query, tuple(order_ids), OrderListRow)
+
+    def _list_row(self, cursor, order_id):
+        rows = self._list_rows(cursor, [order_id])
+        return rows[0] if rows else None
+
+    def list_orders_page(self, order_filter=None, after_id=None, page_size=None):
+        # (rows, has_more); one extra row is fetched to know if another page exists
+        page_size = page_size or self.PAGE_SIZE
+        rows = self.list_orders(order_filter, after_id, page_size + 1)
+        return rows[:page_size], len(rows) > page_size
+
+    def get_order_for_edit(self, order_id):
+        # (OrderEditInfo or None, [OrderLineRow])
+        order_info = self.fetch_one("""
+            SELECT o.Order_id, o.Customer_id, c.Name AS Customer_name, c.Phone AS Customer_phone,
+               o.Budget, o.Deposit, o.Order_discount, o.Payment_method, o.Order_status,
+               o.Confirmation, o.Receiver_address, o.Receiver_phone
+            FROM Order_and_Payment o
+            JOIN Customer c ON o.Customer_id = c.Customer_id
+            WHERE o.Order_id = %s
+        """, (order_id,), OrderEditInfo)
+
+        order_items = self.fetch_all("""
+            SELECT oi.Item_id, i.Name, oi.Quantity, oi.Unit_price, i.Item_discount, i.Stock_quantity
+            FROM Orders_Items oi
+            JOIN Item i ON oi.Item_id = i.Item_id
+            WHERE oi.Order_id = %s
+        """, (order_id,), OrderLineRow)
+        return order_info, order_items
+
+    def get_order_details(self, order_id):
+        # (OrderDetailRow or None, [OrderDetailLineRow])
+        order_customer = self.fetch_one("""
+            SELECT o.Order_id, o.Customer_id, o.Employee_id, o.Order_status, o.Order_discount, o.Payment_date,
+                   o.Payment_method, o.Budget, o.Deposit, o.Receiver_address, o.Receiver_phone, o.Confirmation,
+                   c.Name, c.Phone, c.Loyalty_points
+            FROM Order_and_Payment o
+            JOIN Customer c ON o.Customer_id = c.Customer_id
+            WHERE o.Order_id = %s
+        """, (order_id,), OrderDetailRow)
+
+        if not order_customer:
+            return None, []
+
+        items = self.fetch_all("""
+            SELECT i.Name, oi.Quantity, oi.Unit_price, i.Item_discount
+            FROM Orders_Items oi
+            JOIN Item i ON oi.Item_id = i.Item_id
+            WHERE oi.Order_id = %s
+        """, (order_id,), OrderDetailLineRow)
+        return order_customer, items
+
+    def _lock_items(self, cursor, item_ids):
+        # One round trip for every Item row an order touches. FOR UPDATE holds
+        # the rows until commit, so the stock read here is the stock written;
+        # locking in Item_id order means two orders over the same items queue
+        # up instead of deadlocking. Returns
+        # {item_id: (stock, name, price, discount)}.
+        item_ids = sorted(set(item_ids))
+        if not item_ids:
+            return {}
+        placeholders = ", ".join(["%s"] * len(item_ids))
+        cursor.execute(f"""
+            SELECT Item_id, Stock_quantity, Name, Price_amount, Item_discount FROM Item
+            WHERE Item_id IN ({placeholders})
+            ORDER BY Item_id
+            FOR UPDATE
+        """, tuple(item_ids))
+        return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+    def _price_lines(self, locked, quantities, kept_prices=None):
+        # Order lines priced from the locked Item rows, so the total is the one
+        # in the database at commit, not what a screen or cache showed.
+        # kept_prices: item_id -> unit price of lines already on the order,
+        # which keep the price they were sold at.
+        lines = []
+        for item_id, quantity in quantities.items():
+            if item_id not in locked:
+                raise RepositoryError("Error", f"Item ID: {item_id} not found.")
+            _, _, price, discount = locked[item_id]
+            unit_price = kept_prices[item_id] if kept_prices and item_id in kept_prices else price
+            lines.append({"item_id": item_id, "quantity": quantity,
+                          "unit_price": unit_price, "discount": discount or 0})
+        return lines
+
+    def _reserve_stock(self, cursor, changes, locked=None):
+        # The one place order code changes Stock_quantity. changes maps
+        # item_id -> quantity to take from stock; a negative quantity puts
+        # stock back. Rows are locked before the check and written in one
+        # UPDATE, so two terminals selling the last bouquet cannot both pass
+        # the check: the second one waits for the first to commit and then
+        # sees the lower stock. locked: the rows already locked by the caller.
+        changes = {item_id: quantity for item_id, quantity in changes.items() if quantity}
+        if not changes:
+            return
+
+        if locked is None:
+            locked = self._lock_items(cursor, changes)
+        for item_id, quantity in changes.items():
+            if quantity < 0:
+                continue
+            if item_id not in locked:
+                raise RepositoryError("Error", f"Item ID: {item_id} not found.")
+
+            stock_available, item_name = locked[item_id][:2]
+            if quantity > stock_available:
+                raise RepositoryError(
+                    "Stock Error",
+                    f"Only {stock_available} units in stock for {item_name}. You tried to order {quantity}."
+                )
+
+        item_ids = sorted(changes)
+        cases = " ".join(["WHEN %s THEN %s"] * len(item_ids))
+        placeholders = ", ".join(["%s"] * len(item_ids))
+        params = [value for item_id in item_ids for value in (item_id, changes[item_id])]
+        cursor.execute(f"""
+            UPDATE Item
+            SET Stock_quantity = Stock_quantity - CASE Item_id {cases} END
+            WHERE Item_id IN ({placeholders})
+        """, tuple(params) + tuple(item_ids))
+
+    def _lock_orders(self, cursor, order_ids):
+        # locks the order rows so two terminals editing or deleting the same
+        # order cannot both return its stock. Returns
+        # {order_id: (total_price, customer_id, deposit, order_status)} for
+        # the orders that exist.
+        order_ids = sorted(set(order_ids))
+        if not order_ids:
+            return {}
+        placeholders = ", ".join(["%s"] * len(order_ids))
+        cursor.execute(f"""
+            SELECT Order_id, Total_price, Customer_id, Deposit, Order_status
+            FROM Order_and_Payment WHERE Order_id IN ({placeholders})
+            ORDER BY Order_id
+            FOR UPDATE
+        """, tuple(order_ids))
+        return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+    def _lock_order(self, cursor, order_id):
+        # (total_price, customer_id, deposit, order_status) or None
+        return self._lock_orders(cursor, [order_id]).get(order_id)
+
+    def _restore_stock(self, cursor, order_ids):
+        # Puts back the stock of every line of these orders with one
+        # UPDATE ... JOIN, however many orders and lines there are. Only adds to
+        # stock, so there is nothing to check first. Returns the Item ids touched.
+        if not order_ids:
+            return set()
+        placeholders = ", ".join(["%s"] * len(order_ids))
+        cursor.execute(f"SELECT DISTINCT Item_id FROM Orders_Items WHERE Order_id IN ({placeholders})",
+                       tuple(order_ids))
+        item_ids = {row[0] for row in cursor.fetchall()}
+        if item_ids:
+            cursor.execute(f"""
+                UPDATE Item i
+                JOIN (
+                    SELECT Item_id, SUM(Quantity) AS Quantity
+                    FROM Orders_Items
+                    WHERE Order_id IN ({placeholders})
+                    GROUP BY Item_id
+                ) returned ON returned.Item_id = i.Item_id
+                SET i.Stock_quantity = i.Stock_quantity + returned.Quantity
+            """, tuple(order_ids))
+        return item_ids
+
+    def _deduct_loyalty(self, cursor, points):
+        # points: {customer_id: points to take away}, one UPDATE for all of them
+        points = {customer_id: value for customer_id, value in points.items() if value}
+        if not points:
+            return
+        customer_ids = sorted(points)
+        cases = " ".join(["WHEN %s THEN %s"] * len(customer_ids))
+        placeholders = ", ".join(["%s"] * len(customer_ids))
+        params = [value for customer_id in customer_ids for value in (customer_id, points[customer_id])]
+        cursor.execute(f"""
+            UPDATE Customer
+            SET Loyalty_points = GREATEST(Loyalty_points - CASE Customer_id {cases} END, 0)
+            WHERE Customer_id IN ({placeholders})
+        """, tuple(params) + tuple(customer_ids))
+
+    def _order_lines(self, cursor, order_id):
+        # ({item_id: quantity}, {item_id: unit_price})
+        cursor.execute("SELECT Item_id, Quantity, Unit_price FROM Orders_Items WHERE Order_id = %s", (order_id,))
+        rows = cursor.fetchall()
+        return {row[0]: row[1] for row in rows}, {row[0]: row[2] for row in rows}
+
+    @retry_deadlocks
+    def place_order(self, customer_id, customer_name, customer_phone, order_items, budget, deposit,
+                    order_discount, payment_method, order_status, confirmation,
+                    receiver_address, receiver_phone, employee_id=4):
+        # returns the new order's OrderListRow
+        # order_items: dicts with item_id and quantity; prices are read here.
+        # The round trips do not grow with the number of lines: one locking
+        # SELECT and one UPDATE for all stock, one multi-row INSERT for the lines.
+
+        # the same item added twice becomes one line (Orders_Items is keyed on it)
+        quantities = {}
+        for item in order_items:
+            quantities[item["item_id"]] = quantities.get(item["item_id"], 0) + int(item["quantity"])
+
+        with self.transaction(set(quantities)) as cursor:
+            # lock the items first: prices come from the rows the stock is
+            # taken from, and a missing item or short stock fails before
+            # anything else is written
+            locked = self._lock_items(cursor, quantities)
+            lines = self._price_lines(locked, quantities)
+            total_price_after_discount = order_total(lines, order_discount)
+            remaining = remaining_payment(total_price_after_discount, deposit)
+            self._reserve_stock(cursor, quantities, locked)
+
+            if not customer_id:
+                cursor.execute("""
+                    SELECT Customer_id FROM Customer WHERE Name = %s AND Phone = %s
+                """, (customer_name, customer_phone))
+                customer = cursor.fetchone()
+
+                if customer:
+                    customer_id = customer[0]
+                else:
+                    cursor.execute("""
+                        INSERT INTO Customer (Name, Phone) VALUES (%s, %s)
+                    """, (customer_name, customer_phone))
+                    customer_id = cursor.lastrowid
+
+            # Insert order_and_payment
+            cursor.execute("""
+                INSERT INTO Order_and_Payment
+                (Customer_id, Employee_id, Order_status, Order_discount, Payment_date, Payment_method,
+                Total_price, Remaining_Payment, Budget, Deposit, Confirmation, Receiver_address, Receiver_phone)
+            VALUES (%s, %s, %s, %s, CURRENT_DATE(), %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (customer_id, employee_id, order_status, order_discount, payment_method, total_price_after_discount,
+                  remaining, budget, deposit, int(confirmation), receiver_address, receiver_phone))
+            order_id = cursor.lastrowid
+
+            if lines:
+                # Insert Orders_Items; executemany sends one multi-row INSERT
+                cursor.executemany("""
+                    INSERT INTO Orders_Items (Order_id, Item_id, Quantity, Unit_price)
+                    VALUES (%s, %s, %s, %s)
+                """, [(order_id, line["item_id"], line["quantity"], line["unit_price"]) for line in lines])
+
+            # award loyalty points if fully paid
+            if deposit >= total_price_after_discount:
+                points_to_add = int(total_price_after_discount // 10)  # assuming 10$ = 1 point
+                cursor.execute("""
+                    UPDATE Customer
+                    SET Loyalty_points = Loyalty_points + %s
+                    WHERE Customer_id = %s
+                """, (points_to_add, customer_id))
+
+            return self._list_row(cursor, order_id)
+
+    @retry_deadlocks
+    def update_order(self, order_id, updated_items, budget, deposit, order_discount, payment_method,
+                     order_status, confirmation, receiver_address, receiver_phone):
+        # returns the saved OrderListRow; a cancelled order comes back with
+        # Order_status 'Cancelled' and zero totals. updated_items: dicts with
+        # item_id and quantity; lines already on the order keep their unit
+        # price, new ones are priced from Item here.
+        quantities = {item["item_id"]: int(item["quantity"]) for item in updated_items}
+
+        changed = set(quantities)
+        with self.transaction(changed) as cursor:
+            # get old total price and customer id before any updates
+            result = self._lock_order(cursor, order_id)
+            if not result:
+                raise RepositoryError("Error", "Order not found for loyalty update.")
+
+            prev_total, customer_id, deposit_old, prev_status = result
+
+            old_loyalty_points = int(prev_total // 10) if deposit_old >= prev_total else 0
+
+            # always subtract previously awarded loyalty points if any
+            cursor.execute("""
+                UPDATE Customer
+                SET Loyalty_points = GREATEST(Loyalty_points - %s, 0)
+                WHERE Customer_id = %s
+            """, (old_loyalty_points, customer_id))
+
+            original, sold_at = self._order_lines(cursor, order_id)
+            changed.update(original)
+            # a cancelled order already gave its stock back
+            held = {} if prev_status == "Cancelled" else original
+
+            # check if order was changed to "Cancelled"
+            if order_status == "Cancelled":
+                if held:
+                    self._restore_stock(cursor, [order_id])
+
+                cursor.execute("""
+                    UPDATE Order_and_Payment
+                    SET Budget=%s, Deposit=%s, Order_discount=%s, Payment_method=%s,
+                        Order_status=%s, Confirmation=%s, Receiver_address=%s, Receiver_phone=%s,
+                        Total_price = 0, Remaining_Payment = 0
+                    WHERE Order_id = %s
+                """, (budget, deposit, order_discount, payment_method, order_status, int(confirmation),
+                      receiver_address, receiver_phone, order_id))
+                return self._list_row(cursor, order_id)
+
+            locked = self._lock_items(cursor, set(held) | set(quantities))
+            updated = {line["item_id"]: line for line in self._price_lines(locked, quantities, sold_at)}
+            total_price_after_discount = order_total(updated.values(), order_discount)
+
+            # take or return the difference in stock (all of it for a re-opened order)
+            self._reserve_stock(cursor, {
+                iid: updated.get(iid, {}).get("quantity", 0) - held.get(iid, 0)
+                for iid in set(held) | set(updated)
+            }, locked)
+
+            # update order info
+            cursor.execute("""
+                UPDATE Order_and_Payment
+                SET Budget=%s, Deposit=%s, Order_discount=%s, Payment_method=%s,
+                    Order_status=%s, Confirmation=%s, Receiver_address=%s, Receiver_phone=%s
+                WHERE Order_id= %s
+            """, (budget, deposit, order_discount, payment_method,
+                  order_status, int(confirmation), receiver_address, receiver_phone, order_id))
+
+            # adjust Orders_Items
+            for iid in set(original) | set(updated):
+                old_qty = original.get(iid, 0)
+                new_qty = updated.get(iid, {}).get("quantity", 0)
+
+                if old_qty and not new_qty:
+                    cursor.execute("DELETE FROM Orders_Items WHERE Order_id = %s AND Item_id = %s", (order_id, iid))
+                elif new_qty and not old_qty:
+                    data = updated[iid]
+                    cursor.execute("""
+                        INSERT INTO Orders_Items (Order_id, Item_id, Quantity, Unit_price)
+                        VALUES (%s, %s, %s, %s)
+                    """, (order_id, iid, data['quantity'], data['unit_price']))
+                elif old_qty != new_qty:
+                    cursor.execute("""
+                        UPDATE Orders_Items SET Quantity = %s WHERE Order_id = %s AND Item_id = %s
+                    """, (new_qty, order_id, iid))
+
+            # loyalty points (only if fully paid)
+            if int(confirmation) == 1 and deposit >= total_price_after_discount:
+                new_points = int(total_price_after_discount // 10)
+                cursor.execute("UPDATE Customer SET Loyalty_points = Loyalty_points + %s WHERE Customer_id = %s",
+                               (new_points, customer_id))
+
+            cursor.execute("UPDATE Order_and_Payment SET Total_price = %s, Remaining_Payment = %s WHERE Order_id = %s",
+                           (total_price_after_discount, remaining_payment(total_price_after_discount, deposit), order_id))
+            return self._list_row(cursor, order_id)
+
+    def delete_order(self, order_id):
+        return self.delete_orders([order_id])
+
+    @retry_deadlocks
+    def delete_orders(self, order_ids):
+        # Deletes any number of orders in one transaction with a fixed number
+        # of statements, e.g. to clean up abandoned orders. Returns how many
+        # were deleted.
+        changed = set()
+        with self.transaction(changed) as cursor:
+            # get order totals and customer ids
+            locked = self._lock_orders(cursor, order_ids)
+            if not locked:
+                return 0
+            order_ids = sorted(locked)
+
+            # return quantities to stock, unless cancelling already did
+            changed.update(self._restore_stock(
+                cursor, [order_id for order_id in order_ids if locked[order_id][3] != "Cancelled"]
+            ))
+
+            # adjust loyalty points (assuming 10$ = 1 point)
+            points = defaultdict(int)
+            for total_price, customer_id, _, _ in locked.values():
+                points[customer_id] += int(total_price // 10)
+            self._deduct_loyalty(cursor, points)
+
+            # delete the orders; their lines and deliveries reference them, so they go first
+            placeholders = ", ".join(["%s"] * len(order_ids))
+            cursor.execute(f"DELETE FROM Orders_Items WHERE Order_id IN ({placeholders})", tuple(order_ids))
+            cursor.execute(f"DELETE FROM Delivery WHERE Order_id IN ({placeholders})", tuple(order_ids))
+            cursor.execute(f"DELETE FROM Order_and_Payment WHERE Order_id IN ({placeholders})", tuple(order_ids))
+            return cursor.rowcount
+
+    @retry_deadlocks
+    def cancel_orders(self, order_ids):
+        # Cancels any number of orders in one transaction, the same way an
+        # edit to 'Cancelled' does: stock goes back, loyalty points awarded
+        # for a fully paid order are taken back and the totals become 0.
+        # Orders already cancelled are left alone. Returns the cancelled
+        # orders' OrderListRows.
+        changed = set()
+        with self.transaction(changed) as cursor:
+            locked = self._lock_orders(cursor, order_ids)
+            order_ids = sorted(order_id for order_id, row in locked.items() if row[3] != "Cancelled")
+            if not order_ids:
+                return []
+
+            changed.update(self._restore_stock(cursor, order_ids))
+
+            points = defaultdict(int)
+            for order_id in order_ids:
+                total_price, customer_id, deposit, _ = locked[order_id]
+                if deposit is not None and deposit >= total_price:
+                    points[customer_id] += int(total_price // 10)
+            self._deduct_loyalty(cursor, points)
+
+            placeholders = ", ".join(["%s"] * len(order_ids))
+            cursor.execute(f"""
+                UPDATE Order_and_Payment
+                SET Order_status = 'Cancelled', Total_price = 0, Remaining_Payment = 0
+                WHERE Order_id IN ({placeholders})
+            """, tuple(order_ids))
+            return self._list_rows(cursor, order_ids)
+
+
+class Repositories:
+    # one shared set of repositories per process, built on the connection pool
+    def __init__(self, db_pool, catalog_max_age=None):
+        # catalog_cache builds on the row types above, so it is imported here
+        from catalog_cache import ItemCatalog, CATALOG_MAX_AGE
+
+        self.db_pool = db_pool
+        self.items = ItemRepository(db_pool)
+        self.customers = CustomerRepository(db_pool)
+        self.suppliers = SupplierRepository(db_pool)
+        self.orders = OrderRepository(db_pool)
+
+        # every repository that writes items tells the shared catalog
+        self.catalog = ItemCatalog(self.items, CATALOG_MAX_AGE if catalog_max_age is None else catalog_max_age)
+        for repo in (self.items, self.suppliers, self.orders):
+            repo.catalog = self.catalog
+
+        self.versions = DataVersions()
+        for repo in (self.items, self.customers, self.suppliers, self.orders):
+            repo.versions = self.versions
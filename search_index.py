@@ -0,0 +1,128 @@
+import re
+from bisect import bisect_left, insort
+
+
+WORD_RE = re.compile(r"[0-9a-z]+")
+
+
+def words(text):
+    # lowercased words of a name or phone; a phone also gets its bare digits
+    # so "03 123" and "03123" both find it
+    if not text:
+        return []
+    text = str(text).lower()
+    found = WORD_RE.findall(text)
+    digits = "".join(ch for ch in text if ch.isdigit())
+    if digits and digits not in found:
+        found.append(digits)
+    return found
+
+
+class PrefixIndex:
+    # In-memory type-ahead index over rows already fetched from the database.
+    # Every word of the indexed fields goes into one sorted list, so a prefix
+    # lookup is two bisects instead of a LIKE '%text%' scan. A query with several
+    # words returns the rows matching all of them, in their original order.
+    #
+    # put() and remove() keep the index in step with single-row edits; rows
+    # are found by key(row), the row's id by default.
+    def __init__(self, rows, fields, key=lambda row: row[0]):
+        self.rows = list(rows)
+        self.fields = fields
+        self.key = key
+        self._front = []  # rows put() after the build, newest last; positions -1, -2, ...
+        self._position = {}
+        entries = set()
+        for position, row in enumerate(self.rows):
+            self._position[key(row)] = position
+            entries.update(self._row_entries(row, position))
+        self._entries = sorted(entries)
+
+    def _row_entries(self, row, position):
+        return {(word, position) for field in self.fields for word in words(getattr(row, field))}
+
+    def _row(self, position):
+        return self.rows[position] if position >= 0 else self._front[-position - 1]
+
+    def _positions(self, prefix):
+        start = bisect_left(self._entries, (prefix,))
+        end = bisect_left(self._entries, (prefix + "\uffff",))
+        return {position for _, position in self._entries[start:end]}
+
+    def all_rows(self):
+        rows = [row for row in reversed(self._front) if row is not None]
+        rows.extend(row for row in self.rows if row is not None)
+        return rows
+
+    def search(self, text, limit=None):
+        query_words = words(text)
+        if not query_words:
+            rows = self.all_rows()
+            return rows[:limit] if limit else rows
+
+        positions = None
+        for word in query_words:
+            found = self._positions(word)
+            positions = found if positions is None else positions & found
+            if not positions:
+                return []
+
+        matches = [self._row(position) for position in sorted(positions)]
+        return matches[:limit] if limit else matches
+
+    def _drop(self, position):
+        for entry in self._row_entries(self._row(position), position):
+            i = bisect_left(self._entries, entry)
+            if i < len(self._entries) and self._entries[i] == entry:
+                del self._entries[i]
+
+    def put(self, row):
+        # replace the row with the same key in place, or add it in front
+        position = self._position.get(self.key(row))
+        if position is None:
+            self._front.append(row)
+            position = -len(self._front)
+            self._position[self.key(row)] = position
+        else:
+            self._drop(position)
+            if position >= 0:
+                self.rows[position] = row
+            else:
+                self._front[-position - 1] = row
+        for entry in self._row_entries(row, position):
+            insort(self._entries, entry)
+
+    def remove(self, row_key):
+        position = self._position.pop(row_key, None)
+        if position is None:
+            return
+        self._drop(position)
+        if position >= 0:
+            self.rows[position] = None
+        else:
+            self._front[-position - 1] = None
+
+
+class Debouncer:
+    # Runs callback once the user has stopped typing for delay ms; every call
+    # restarts the wait. widget is any Tk widget, used for after().
+    def __init__(self, widget, delay, callback):
+        self.widget = widget
+        self.delay = delay
+        self.callback = callback
+        self._after_id = None
+
+    def __call__(self, *args):
+        self.cancel()
+        self._after_id = self.widget.after(self.delay, self._fire)
+
+    def _fire(self):
+        self._after_id = None
+        # the window may have been closed while we waited
+        if self.widget.winfo_exists():
+            self.callback()
+
+    def cancel(self):
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
@@ -0,0 +1,524 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import mysql.connector
+from backends import env_db_config, connect_pool
+from export import json_value
+from migrations import apply_migrations
+from query_log import QueryLog
+from repositories import Repositories, RepositoryError, OrderFilter
+
+
+# Headless HTTP/JSON front of the repositories, so several terminals and a web
+# storefront share one process: one connection pool, one item catalog and one
+# response cache instead of a MySQL login and cold caches per terminal.
+#
+#   GET  /items[?search=]      GET|PUT|DELETE /items/<id>      POST /items
+#   POST /items/batch          {"ids": [...]}
+#   GET  /customers[?search=]  GET|PUT|DELETE /customers/<id>
+#   GET  /suppliers[?search=]  GET|PUT|DELETE /suppliers/<id>  POST /suppliers
+#   GET  /orders[?customer=&status=&from=&to=&payment_method=&confirmed=&after=&limit=]
+#   GET|PUT|DELETE /orders/<id>  POST /orders
+#   POST /orders/delete, /orders/cancel  {"ids": [...]}, one transaction each
+#   POST /batch                [{"method", "path", "body"}, ...] in one round trip
+#   GET  /health, /stats
+#
+# Bodies and answers are JSON with the repositories' field names; amounts are
+# strings (exact decimals), dates YYYY-MM-DD and discounts fractions, as stored.
+# Order lines are {"item_id", "quantity"}; prices are read from Item inside the
+# order's transaction, never taken from the client. Item reads come from the
+# shared catalog, which reloads once it is older than the cache max age.
+# Errors answer {"error": title, "message": ...}.
+
+DEFAULT_PORT = 8765
+CACHE_MAX_AGE = 30  # seconds; terminals still on direct MySQL do not bump DataVersions
+CACHE_ENTRIES = 256
+MAX_BODY = 1024 * 1024
+MAX_BATCH = 100
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message, title="Error"):
+        super().__init__(message)
+        self.status = status
+        self.title = title
+
+
+def records(rows):
+    return [row._asdict() for row in rows]
+
+
+def record(row):
+    return row._asdict() if row is not None else None
+
+
+def found(row, what):
+    if row is None:
+        raise ServiceError(404, f"{what} not found", "Not Found")
+    return row
+
+
+def encode(payload):
+    return json.dumps(payload, default=json_value).encode("utf-8")
+
+
+def etag_of(body):
+    return '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+
+
+def integrity_message(err):
+    # the client's request broke a key: say which way, not the server's wording
+    if getattr(err, "errno", None) == 1062:
+        return "A record with the same key already exists."
+    if getattr(err, "errno", None) in (1451, 1452, 1216, 1217):
+        # SQLite reports both directions as one foreign key failure
+        return "It would break a link between records, e.g. a customer that still has orders."
+    return f"Error: {err}"
+
+
+# === Input ===
+
+def field(body, name, convert=str, default=None, required=True):
+    value = body.get(name)
+    if value is None or value == "":
+        if required and default is None:
+            raise ServiceError(400, f"'{name}' is required", "Input Error")
+        return default
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        raise ServiceError(400, f"'{name}' is not a valid {convert.__name__}", "Input Error")
+
+
+def date_value(text):
+    return datetime.strptime(text, "%Y-%m-%d").date()
+
+
+def ids_value(values):
+    if not isinstance(values, list):
+        raise ValueError(values)
+    return [int(value) for value in values]
+
+
+def flag(value):
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() in ("1", "true", "yes"):
+        return True
+    if str(value).lower() in ("0", "false", "no"):
+        return False
+    raise ValueError(value)
+
+
+class ResponseCache:
+    # Encoded GET answers by path and query string, each valid while the
+    # DataVersions it depends on are unchanged. Writes made through the service
+    # bump those versions; writes from elsewhere are only caught by max_age.
+    # The snapshot is taken before the query runs, so an answer that raced
+    # with a write is stale on arrival instead of being served for max_age.
+    def __init__(self, versions, max_age=CACHE_MAX_AGE, max_entries=CACHE_ENTRIES):
+        self.versions = versions
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (snapshot, stored at, body, etag)
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0}
+
+    def get(self, key, depends, compute):
+        # (body, etag), computed by compute() on a miss
+        snapshot = self.versions.snapshot(depends)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == snapshot and time.monotonic() - entry[1] <= self.max_age:
+                self._entries.move_to_end(key)
+                self.metrics["hits"] += 1
+                return entry[2], entry[3]
+            self.metrics["misses"] += 1
+
+        body = encode(compute())
+        etag = etag_of(body)
+        with self._lock:
+            self._entries[key] = (snapshot, time.monotonic(), body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body, etag
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), **self.metrics}
+
+
+class FlowerShopService:
+    # the routes: (method, path pattern, handler, DataVersions a GET depends on)
+    ROUTES = [
+        ("GET", r"/health", "health", None),
+        ("GET", r"/stats", "stats", None),
+        ("POST", r"/batch", "batch", None),
+        ("GET", r"/items", "list_items", ("items", "suppliers")),
+        ("POST", r"/items", "add_item", None),
+        ("POST", r"/items/batch", "items_by_id", None),
+        ("GET", r"/items/(\d+)", "get_item", ("items", "suppliers")),
+        ("PUT", r"/items/(\d+)", "update_item", None),
+        ("DELETE", r"/items/(\d+)", "delete_item", None),
+        ("GET", r"/customers", "list_customers", ("customers",)),
+        ("GET", r"/customers/(\d+)", "get_customer", ("customers",)),
+        ("PUT", r"/customers/(\d+)", "update_customer", None),
+        ("DELETE", r"/customers/(\d+)", "delete_customer", None),
+        ("GET", r"/suppliers", "list_suppliers", ("suppliers", "items")),
+        ("POST", r"/suppliers", "add_supplier", None),
+        ("GET", r"/suppliers/(\d+)", "get_supplier", ("suppliers", "items")),
+        ("PUT", r"/suppliers/(\d+)", "update_supplier", None),
+        ("DELETE", r"/suppliers/(\d+)", "delete_supplier", None),
+        ("GET", r"/orders", "list_orders", ("orders", "customers")),
+        ("POST", r"/orders", "place_order", None),
+        ("POST", r"/orders/delete", "delete_orders", None),
+        ("POST", r"/orders/cancel", "cancel_orders", None),
+        ("GET", r"/orders/(\d+)", "get_order", ("orders", "customers", "items")),
+        ("PUT", r"/orders/(\d+)", "update_order", None),
+        ("DELETE", r"/orders/(\d+)", "delete_order", None),
+    ]
+    CREATES = ("add_item", "add_supplier", "place_order")  # answer 201
+    # answered straight from the item catalog, itself a cache with the same
+    # max age; caching its answers again would double how stale they can get
+    CATALOG_READS = ("list_items", "get_item")
+
+    def __init__(self, db_pool, query_log=None, cache_max_age=CACHE_MAX_AGE):
+        self.db_pool = db_pool
+        self.query_log = query_log
+        self.repos = Repositories(db_pool, catalog_max_age=cache_max_age)
+        self.catalog = self.repos.catalog
+        self.cache = ResponseCache(self.repos.versions, cache_max_age)
+        self.started = time.time()
+        self.routes = [(method, re.compile(pattern + r"/?"), name, depends)
+                       for method, pattern, name, depends in self.ROUTES]
+
+    def dispatch(self, method, target, body=None, etag=None):
+        # (status, encoded body, etag) for one call; never raises
+        parts = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        try:
+            name, args, depends = self.route(method, parts.path)
+            handler = getattr(self, name)
+            if body is not None and not isinstance(body, dict) and name != "batch":
+                raise ServiceError(400, "Expected a JSON object", "Input Error")
+            if depends is None:
+                status = 201 if name in self.CREATES else 200
+                return status, encode(handler(params, body or {}, *args)), None
+            if name in self.CATALOG_READS:
+                payload = encode(handler(params, body or {}, *args))
+                new_etag = etag_of(payload)
+            else:
+                key = parts.path.rstrip("/") + "?" + parts.query
+                payload, new_etag = self.cache.get(key, depends, lambda: handler(params, body or {}, *args))
+            if etag is not None and etag == new_etag:
+                return 304, b"", new_etag
+            return 200, payload, new_etag
+        except ServiceError as err:
+            return err.status, encode({"error": err.title, "message": str(err)}), None
+        except RepositoryError as err:
+            return 409, encode({"error": err.title, "message": str(err)}), None
+        except mysql.connector.IntegrityError as err:
+            return 409, encode({"error": "Conflict", "message": integrity_message(err)}), None
+        except (mysql.connector.PoolError, mysql.connector.OperationalError, mysql.connector.InterfaceError) as err:
+            # the database is out of reach or busy: worth retrying later
+            return 503, encode({"error": "Database Error", "message": f"Error: {err}"}), None
+        except Exception as err:
+            return 500, encode({"error": "Error", "message": f"Error: {err}"}), None
+
+    def route(self, method, path):
+        allowed = False
+        for route_method, pattern, name, depends in self.routes:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            if route_method == method:
+                return name, [int(group) for group in match.groups()], depends
+            allowed = True
+        if allowed:
+            raise ServiceError(405, f"{method} is not supported on {path}", "Method Not Allowed")
+        raise ServiceError(404, f"No such resource: {path}", "Not Found")
+
+    # === Service ===
+
+    def health(self, params, body):
+        return {"status": "ok", "uptime_s": round(time.time() - self.started)}
+
+    def stats(self, params, body):
+        return {
+            "pool": self.db_pool.stats(),
+            "cache": self.cache.stats(),
+            "catalog": dict(self.catalog.metrics),
+            "queries": [stats._asdict() for stats in self.query_log.stats(20)] if self.query_log else [],
+        }
+
+    def batch(self, params, body):
+        # [{"method", "path", "body"}] run one after the other; each answers for
+        # itself, so one failing call does not undo the others
+        calls = body if isinstance(body, list) else None
+        if calls is None:
+            raise ServiceError(400, "Expected a JSON list of calls", "Input Error")
+        if len(calls) > MAX_BATCH:
+            raise ServiceError(400, f"At most {MAX_BATCH} calls per batch", "Input Error")
+        answers = []
+        for call in calls:
+            path = call.get("path") if isinstance(call, dict) else None
+            method = call.get("method", "GET") if isinstance(call, dict) else None
+            if not isinstance(path, str) or not path or path.startswith("/batch") or not isinstance(method, str):
+                answers.append({"status": 400, "body": {"error": "Input Error", "message": "Invalid call"}})
+                continue
+            status, payload, _ = self.dispatch(method.upper(), path, call.get("body"))
+            answers.append({"status": status, "body": json.loads(payload) if payload else None})
+        return answers
+
+    # === Items ===
+
+    def list_items(self, params, body):
+        # served from the shared catalog; search matches like Name LIKE %text%
+        search = params.get("search", "").strip().casefold()
+        rows = self.catalog.items()
+        if search:
+            rows = [row for row in rows if search in (row.name or "").casefold()]
+        return records(rows)
+
+    def items_by_id(self, params, body):
+        item_ids = field(body, "ids", ids_value)
+        return records(row for row in map(self.catalog.get, item_ids) if row is not None)
+
+    def get_item(self, params, body, item_id):
+        return record(found(self.catalog.get(item_id), f"Item {item_id}"))
+
+    def item_fields(self, body):
+        return (
+            field(body, "name"), field(body, "type"),
+            field(body, "arrival_date", date_value), field(body, "discount", float, 0.0),
+            field(body, "price", float), field(body, "price_date", date_value),
+            field(body, "stock_quantity", int, 0)
+        )
+
+    def add_item(self, params, body):
+        return record(self.repos.items.add_item(*self.item_fields(body)))
+
+    def update_item(self, params, body, item_id):
+        return record(found(self.repos.items.update_item(item_id, *self.item_fields(body)), f"Item {item_id}"))
+
+    def delete_item(self, params, body, item_id):
+        return {"deleted": self.repos.items.delete_item(item_id)}
+
+    # === Customers ===
+
+    def list_customers(self, params, body):
+        search = params.get("search", "").strip()
+        if search:
+            return records(self.repos.customers.find_customers(search))
+        return records(self.repos.customers.list_customers())
+
+    def get_customer(self, params, body, customer_id):
+        return record(found(self.repos.customers.get_customer(customer_id), f"Customer {customer_id}"))
+
+    def update_customer(self, params, body, customer_id):
+        customer = self.repos.customers.update_customer(
+            customer_id, field(body, "name"), field(body, "phone"), field(body, "loyalty_points", int, 0)
+        )
+        return record(found(customer, f"Customer {customer_id}"))
+
+    def delete_customer(self, params, body, customer_id):
+        return {"deleted": self.repos.customers.delete_customer(customer_id)}
+
+    # === Suppliers ===
+
+    def list_suppliers(self, params, body):
+        return records(self.repos.suppliers.list_suppliers(params.get("search", "").strip() or None))
+
+    def get_supplier(self, params, body, supplier_id):
+        supplier, item_ids = self.repos.suppliers.get_supplier(supplier_id)
+        return {**record(found(supplier, f"Supplier {supplier_id}")), "item_ids": sorted(item_ids)}
+
+    def supplier_fields(self, body):
+        return field(body, "name"), field(body, "contact", default=""), field(body, "item_ids", ids_value, [])
+
+    def add_supplier(self, params, body):
+        return record(self.repos.suppliers.add_supplier(*self.supplier_fields(body)))
+
+    def update_supplier(self, params, body, supplier_id):
+        supplier = self.repos.suppliers.update_supplier(supplier_id, *self.supplier_fields(body))
+        return record(found(supplier, f"Supplier {supplier_id}"))
+
+    def delete_supplier(self, params, body, supplier_id):
+        return {"deleted": self.repos.suppliers.delete_supplier(supplier_id)}
+
+    # === Orders ===
+
+    def list_orders(self, params, body):
+        # one keyset page; pass next_after back as after= for the next one
+        order_filter = OrderFilter(
+            customer_name=field(params, "customer", required=False),
+            status=field(params, "status", required=False),
+            date_from=field(params, "from", date_value, required=False),
+            date_to=field(params, "to", date_value, required=False),
+            payment_method=field(params, "payment_method", required=False),
+            confirmed=field(params, "confirmed", flag, required=False),
+        )
+        page_size = min(field(params, "limit", int, self.repos.orders.PAGE_SIZE), 1000)
+        rows, has_more = self.repos.orders.list_orders_page(
+            order_filter, field(params, "after", int, required=False), page_size
+        )
+        return {"orders": records(rows), "has_more": has_more,
+                "next_after": rows[-1].order_id if has_more else None}
+
+    def get_order(self, params, body, order_id):
+        order, lines = self.repos.orders.get_order_details(order_id)
+        return {**record(found(order, f"Order {order_id}")), "items": records(lines)}
+
+    def order_lines(self, body):
+        # [{"item_id", "quantity"}]; the repository prices them
+        lines = field(body, "items", list)
+        order_items = []
+        for line in lines:
+            if not isinstance(line, dict):
+                raise ServiceError(400, "Each order line needs item_id and quantity", "Input Error")
+            item_id = field(line, "item_id", int)
+            quantity = field(line, "quantity", int)
+            if quantity <= 0:
+                raise ServiceError(400, f"Quantity of item {item_id} must be positive", "Input Error")
+            order_items.append({"item_id": item_id, "quantity": quantity})
+        return order_items
+
+    def order_fields(self, body):
+        order_discount = field(body, "order_discount", float, 0.0)
+        if not 0 <= order_discount <= 100:
+            raise ServiceError(400, "Discount must be between 0 and 100.", "Input Error")
+        return (
+            field(body, "budget", float, 0.0), field(body, "deposit", float, 0.0), order_discount,
+            field(body, "payment_method", default="Cash"), field(body, "order_status", default="Pending"),
+            field(body, "confirmation", flag, False), field(body, "receiver_address", default=""),
+            field(body, "receiver_phone", default="")
+        )
+
+    def place_order(self, params, body):
+        customer_id = field(body, "customer_id", int, required=False)
+        customer_name = field(body, "customer_name", required=False)
+        customer_phone = field(body, "customer_phone", required=False)
+        if not customer_id and (not customer_name or not customer_phone):
+            raise ServiceError(400, "Customer name and phone are required.", "Input Error")
+        order = self.repos.orders.place_order(
+            customer_id, customer_name, customer_phone, self.order_lines(body), *self.order_fields(body)
+        )
+        return record(order)
+
+    def update_order(self, params, body, order_id):
+        info, _ = self.repos.orders.get_order_for_edit(order_id)
+        found(info, f"Order {order_id}")
+        return record(self.repos.orders.update_order(order_id, self.order_lines(body), *self.order_fields(body)))
+
+    def delete_order(self, params, body, order_id):
+        return {"deleted": self.repos.orders.delete_order(order_id)}
+
+    def delete_orders(self, params, body):
+        return {"deleted": self.repos.orders.delete_orders(field(body, "ids", ids_value))}
+
+    def cancel_orders(self, params, body):
+        return records(self.repos.orders.cancel_orders(field(body, "ids", ids_value)))
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so a terminal reuses its connection
+    server_version = "HeraService/1.0"
+
+    def do_GET(self):
+        self.handle_call("GET")
+
+    def do_POST(self):
+        self.handle_call("POST")
+
+    def do_PUT(self):
+        self.handle_call("PUT")
+
+    def do_DELETE(self):
+        self.handle_call("DELETE")
+
+    def handle_call(self, method):
+        try:
+            body = self.read_body()
+        except ServiceError as err:
+            self.close_connection = True
+            self.answer(err.status, encode({"error": err.title, "message": str(err)}))
+            return
+        status, payload, etag = self.server.service.dispatch(
+            method, self.path, body, self.headers.get("If-None-Match")
+        )
+        self.answer(status, payload, etag)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            raise ServiceError(413, f"Request body over {MAX_BODY} bytes", "Input Error")
+        if not length:
+            return None
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ServiceError(400, "Request body is not valid JSON", "Input Error")
+
+    def answer(self, status, payload, etag=None):
+        self.send_response(status)
+        if etag is not None:
+            self.send_header("ETag", etag)
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def serve(service, host, port, verbose=False):
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the flowershop data as HTTP/JSON for terminals and the storefront")
+    parser.add_argument("--host", default=os.environ.get("HERA_SERVICE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("HERA_SERVICE_PORT", DEFAULT_PORT)))
+    parser.add_argument("--pool-size", type=int, default=10, help="database connections shared by all requests")
+    parser.add_argument("--cache-max-age", type=float, default=CACHE_MAX_AGE,
+                        help="seconds a cached answer or item row is trusted against writes from outside the service")
+    parser.add_argument("--slow-log", default="slow_queries.log", help="where slow statements and their EXPLAIN go")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    try:
+        db_config = env_db_config()
+    except ValueError as err:
+        sys.exit(f"Error: {err}")
+    query_log = QueryLog(path=args.slow_log, db_config=db_config)
+    db_pool = connect_pool(db_config, pool_size=args.pool_size, query_log=query_log)
+
+    try:
+        apply_migrations(db_pool)
+        server = serve(FlowerShopService(db_pool, query_log, args.cache_max_age), args.host, args.port, args.verbose)
+        print(f"Serving on http://{args.host}:{args.port}")
+        server.serve_forever()
+    except mysql.connector.Error as err:
+        print(f"Error: {err}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db_pool.close_all()
+        query_log.close()
@@ -0,0 +1,159 @@
+import argparse
+import random
+import sys
+import threading
+import mysql.connector
+from backends import add_db_arguments, args_db_config, connect_pool
+from repositories import ItemRepository, OrderRepository, RepositoryError
+
+
+# Stress check for stock reservation. N writers place, edit, cancel and delete
+# orders for one scarce test item at the same time, the way several terminals
+# would on a busy day. Afterwards the item's stock must be non-negative and
+# equal to what it started with minus what the remaining orders hold.
+#
+# Run it against a local (scratch) database: it creates its own item, customer
+# and orders and removes them again at the end.
+
+CUSTOMER_NAME = "Stock Stress"
+CUSTOMER_PHONE = "000-STRESS"
+
+
+def order_line(item_id, quantity):
+    return {"item_id": item_id, "quantity": quantity, "unit_price": 1, "discount": 0}
+
+
+def writer(order_repo, item_id, rounds, seed, orders, stats, lock):
+    rng = random.Random(seed)
+
+    def count(name):
+        with lock:
+            stats[name] += 1
+
+    for _ in range(rounds):
+        try:
+            order = order_repo.place_order(
+                None, CUSTOMER_NAME, CUSTOMER_PHONE, [order_line(item_id, rng.randint(1, 3))],
+                0, 0, 0, "Cash", "Pending", False, "", ""
+            )
+        except RepositoryError:
+            count("sold_out")
+            continue
+        except mysql.connector.Error as err:
+            print(f"Error placing order: {err}")
+            count("errors")
+            continue
+        count("placed")
+        with lock:
+            orders.add(order.order_id)
+
+        # then do something else to the same order, like a clerk correcting it
+        action = rng.random()
+        try:
+            if action < 0.3:
+                order_repo.update_order(
+                    order.order_id, [order_line(item_id, rng.randint(1, 4))],
+                    0, 0, 0, "Cash", "Pending", False, "", ""
+                )
+                count("edited")
+            elif action < 0.45:
+                order_repo.update_order(
+                    order.order_id, [order_line(item_id, 1)],
+                    0, 0, 0, "Cash", "Cancelled", False, "", ""
+                )
+                count("cancelled")
+            elif action < 0.6:
+                order_repo.delete_order(order.order_id)
+                with lock:
+                    orders.discard(order.order_id)
+                count("deleted")
+        except RepositoryError:
+            count("sold_out")
+        except mysql.connector.Error as err:
+            print(f"Error changing order {order.order_id}: {err}")
+            count("errors")
+
+
+def held_quantity(db_pool, item_id):
+    conn = db_pool.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT Stock_quantity FROM Item WHERE Item_id = %s", (item_id,))
+        stock = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT IFNULL(SUM(oi.Quantity), 0)
+            FROM Orders_Items oi
+            JOIN Order_and_Payment o ON o.Order_id = oi.Order_id
+            WHERE oi.Item_id = %s AND o.Order_status <> 'Cancelled'
+        """, (item_id,))
+        held = int(cursor.fetchone()[0])
+    finally:
+        conn.close()
+    return stock, held
+
+
+def clean_up(db_pool, order_repo, item_id, orders):
+    for order_id in orders:
+        order_repo.delete_order(order_id)
+    conn = db_pool.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM Item WHERE Item_id = %s", (item_id,))
+        cursor.execute(
+            "DELETE FROM Customer WHERE Name = %s AND Phone = %s", (CUSTOMER_NAME, CUSTOMER_PHONE)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent order writers against one scarce item")
+    parser.add_argument("--writers", type=int, default=8, help="concurrent writer threads")
+    parser.add_argument("--rounds", type=int, default=50, help="orders placed by each writer")
+    parser.add_argument("--stock", type=int, default=100, help="starting stock of the test item")
+    parser.add_argument("--seed", type=int, default=1)
+    add_db_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        db_config = args_db_config(args)
+    except ValueError as err:
+        sys.exit(f"Error: {err}")
+    db_pool = connect_pool(db_config, pool_size=args.writers + 1)
+    item_repo = ItemRepository(db_pool)
+    order_repo = OrderRepository(db_pool)
+
+    try:
+        item = item_repo.add_item(
+            f"Stress test item {random.randrange(10**9)}", "Test", None, 0, 1, None, args.stock
+        )
+        orders = set()
+        stats = {"placed": 0, "edited": 0, "cancelled": 0, "deleted": 0, "sold_out": 0, "errors": 0}
+        lock = threading.Lock()
+        threads = [
+            threading.Thread(
+                target=writer,
+                args=(order_repo, item.item_id, args.rounds, args.seed + n, orders, stats, lock)
+            )
+            for n in range(args.writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stock, held = held_quantity(db_pool, item.item_id)
+        print(", ".join(f"{name}: {value}" for name, value in stats.items()))
+        print(f"Stock left: {stock}, held by orders: {held}, started with: {args.stock}")
+        ok = stock >= 0 and stock + held == args.stock and stats["errors"] == 0
+        print("OK" if ok else "FAILED: stock does not add up")
+
+        clean_up(db_pool, order_repo, item.item_id, orders)
+    except mysql.connector.Error as err:
+        print(f"Error: {err}")
+        ok = False
+    finally:
+        db_pool.close_all()
+
+    sys.exit(0 if ok else 1)
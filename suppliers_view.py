@@ -1,13 +1,21 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import mysql.connector
+from backends import env_db_config, connect_pool
+from db_executor import DBExecutor
+from repositories import Repositories, RepositoryError
+from search_index import PrefixIndex, Debouncer
+from tree_rows import TreeRows
+from ui_metrics import measured
 from datetime import datetime
 
 class SupplierView(tk.Frame):
-    def __init__(self, parent, db_config):
+    def __init__(self, parent, repos, executor):
         super().__init__(parent)
         self.parent = parent
-        self.db_config = db_config
+        self.supplier_repo = repos.suppliers
+        self.catalog = repos.catalog
+        self.executor = executor
+        self.section = "suppliers"
         self.lavender = "#E6E6FA"
         self.configure(bg=self.lavender)
 
@@ -19,6 +27,10 @@ class SupplierView(tk.Frame):
         self.search_var = tk.StringVar()
         self.search_entry = tk.Entry(search_frame, textvariable=self.search_var)
         self.search_entry.pack(side="left", padx=(0, 5))
+        # search as you type; the button still runs the search straight away
+        self.supplier_index = None
+        self.search_debouncer = Debouncer(self, 250, self.filter_suppliers)
+        self.search_var.trace_add("write", self.search_debouncer)
         search_btn = tk.Button(search_frame, text="Search", command=self.search_suppliers)
         search_btn.pack(side="left", padx=(0, 10))
         tk.Button(search_frame, text="Clear", command=self.clear_search).pack(side="left", padx=5)
@@ -56,91 +68,148 @@ class SupplierView(tk.Frame):
 
         self.tree.configure(cursor="hand2")
         self.tree.bind("<Button-1>", self.handle_click)
+        # rows are keyed by Supplier_id, so saves and deletes patch just their row
+        self.rows = TreeRows(self.tree, self.supplier_row)
 
         self.load_suppliers()
 
-    def connect_db(self):
-        return mysql.connector.connect(
-            host=self.db_config.get("host", "localhost"),
-            user=self.db_config.get("user", "your_mysql_username"),
-            password=self.db_config.get("password", "your_mysql_password"),
-            database=self.db_config.get("database", "flowershop_management")
-        )
-        
     def clear_search(self):
         self.search_var.set("")
+        self.search_debouncer.cancel()
+        self.load_suppliers()
+
+    def refresh(self):
+        # shown again after its data changed; the type-ahead filter is reapplied
+        # once the new list is indexed
         self.load_suppliers()
 
-    def load_suppliers(self):
-        try:
-            conn = self.connect_db()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT s.Supplier_id, s.Name, s.Contact,
-                    GROUP_CONCAT(i.Name SEPARATOR ', ') AS Items
-                FROM Supplier s
-                LEFT JOIN Item_Supplier isup ON s.Supplier_id = isup.Supplier_id
-                LEFT JOIN Item i ON isup.Item_id = i.Item_id
-                GROUP BY s.Supplier_id
-                ORDER BY s.Supplier_id DESC
-            """)
-            suppliers = cursor.fetchall()
-            conn.close()
-            self.display_suppliers(suppliers)
-
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+    def show_db_error(self, err):
+        messagebox.showerror("Database Error", f"Error: {err}")
+
+    def show_save_error(self, err):
+        if isinstance(err, RepositoryError):
+            messagebox.showerror(err.title, str(err))
+        else:
+            messagebox.showerror("Error", f"Invalid input or database error:\n{err}")
+
+    def load_suppliers(self, search_text=None, on_empty=None):
+        # rows come in chunks off a streaming cursor; the old rows stay on screen
+        # until the first chunk lands
+        state = {"started": False, "rows": []}
+        if search_text is None:
+            self.supplier_index = None
+            # a pending search would land on top of the full list
+            self.executor.cancel_key("suppliers.search")
+
+        def showing():
+            # the full list is still read for the type-ahead index while a
+            # search is typed, but its rows do not replace the matches
+            return search_text is not None or not self.search_var.get().strip()
+
+        def on_chunk(suppliers):
+            if search_text is None:
+                state["rows"].extend(suppliers)
+            if not showing():
+                return
+            if state["started"]:
+                self.insert_suppliers(suppliers)
+            else:
+                state["started"] = True
+                self.display_suppliers(suppliers)
+
+        def on_done(_):
+            if not state["started"] and showing():
+                if on_empty is not None:
+                    on_empty()
+                else:
+                    self.display_suppliers([])
+            if search_text is None:
+                # full list is in memory now: index it off the Tk thread for type-ahead
+                self.executor.submit(
+                    PrefixIndex, state["rows"], ("name",), on_success=self.set_supplier_index,
+                    group=self.section, key="suppliers.index", owner=self
+                )
+
+        self.executor.stream(
+            self.supplier_repo.stream_suppliers, search_text,
+            on_chunk=on_chunk, on_done=on_done, on_error=self.show_db_error,
+            group=self.section, key="suppliers.list" if search_text is None else "suppliers.search", owner=self
+        )
 
     def display_suppliers(self, suppliers):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
+        self.rows.render(suppliers)
 
-        for supplier in suppliers:
-            supplier_id, name, contact_, items_str= supplier
-            
-            if items_str is None:
-                items_str= "_"
-
-            self.tree.insert(
-                "", "end",
-                values=(
-                    "🖉 edit",  
-                    supplier_id, name, contact_, items_str, "🗑️"
-                ),
-                tags=(f"id_{supplier_id}")
-            )
+    def insert_suppliers(self, suppliers):
+        self.rows.append(suppliers)
+
+    def supplier_row(self, supplier):
+        supplier_id, name, contact_, items_str= supplier
+        
+        if items_str is None:
+            items_str= "_"
+
+        values = (
+            "🖉 edit",  
+            supplier_id, name, contact_, items_str, "🗑️"
+        )
+        return supplier_id, values, ()
+
+    def set_supplier_index(self, index):
+        self.supplier_index = index
+        # catch up with anything typed while the list was loading
+        if self.search_var.get().strip():
+            self.filter_suppliers()
+
+    def show_saved_supplier(self, supplier, index="end"):
+        # patch the saved row into the list and the type-ahead index
+        self.rows.put(supplier, index)
+        if self.supplier_index is not None:
+            self.supplier_index.put(supplier)
+
+    def forget_supplier(self, supplier_id):
+        self.rows.remove(supplier_id)
+        if self.supplier_index is not None:
+            self.supplier_index.remove(supplier_id)
+
+    def filter_suppliers(self):
+        # type-ahead: from the local index once the full list is loaded,
+        # otherwise from the database (a newer query supersedes the pending one;
+        # the full load keeps going under its own key and builds the index)
+        search_text = self.search_var.get().strip()
+        if self.supplier_index is not None:
+            self.executor.cancel_key("suppliers.search")
+            self.display_suppliers(self.supplier_index.search(search_text))
+        else:
+            self.load_suppliers(search_text or None)
 
     def search_suppliers(self):
         search_text = self.search_var.get().strip()
         if not search_text:
             messagebox.showinfo("Search", "Please enter supplier name to search.")
             return
-        try:
-            conn = self.connect_db()
-            cursor = conn.cursor()
-            query = ("""
-                SELECT s.Supplier_id, s.Name, s.Contact,
-                    GROUP_CONCAT(i.Name SEPARATOR ', ') AS Items
-                FROM Supplier s
-                LEFT JOIN Item_Supplier isup ON s.Supplier_id = isup.Supplier_id
-                LEFT JOIN Item i ON isup.Item_id = i.Item_id
-                WHERE s.Name LIKE %s
-                GROUP BY s.Supplier_id
-                ORDER BY s.Supplier_id DESC
-            """)
-            cursor.execute(query, (f"%{search_text}%",))
-            results = cursor.fetchall()
-            conn.close()
+        self.search_debouncer.cancel()
+
+        def on_empty():
+            messagebox.showinfo("Search", f"No Suppliers found matching '{search_text}'")
 
+        if self.supplier_index is not None:
+            self.executor.cancel_key("suppliers.search")
+            results = self.supplier_index.search(search_text)
             if results:
                 self.display_suppliers(results)
             else:
-                messagebox.showinfo("Search", f"No Suppliers found matching '{search_text}'")
+                on_empty()
+            return
 
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        self.load_suppliers(search_text, on_empty=on_empty)
 
     def add_supplier(self):
+        self.executor.submit(
+            self.catalog.options, on_success=self.open_add_window, on_error=self.show_db_error,
+            group=self.section, key="suppliers.edit", owner=self
+        )
+
+    def open_add_window(self, items):
         # Create the add supplier popup
         add_win = tk.Toplevel(self)
         add_win.title("Add New Supplier")
@@ -155,21 +224,14 @@ class SupplierView(tk.Frame):
             entry = tk.Entry(add_win)
             entry.pack()
             entries.append(entry)
-            
-        # fetch items
-        conn= self.connect_db()
-        cursor= conn.cursor()
-        cursor.execute("SELECT Item_id, Name FROM Item")
-        items= cursor.fetchall()
-        conn.close()
         
         tk.Label(add_win, text= "Select Items this Supplier provides:", bg= self.lavender).pack(pady= 5)
         
         item_vars= {}
-        for item_id, item_name in items:
+        for item in items:
             var= tk.BooleanVar()
-            tk.Checkbutton(add_win, text= item_name, variable= var, bg= self.lavender).pack(anchor='w')
-            item_vars[item_id]= var
+            tk.Checkbutton(add_win, text= item.name, variable= var, bg= self.lavender).pack(anchor='w')
+            item_vars[item.item_id]= var
 
         def save_new_supplier():
             new_values = [e.get().strip() for e in entries]
@@ -178,48 +240,24 @@ class SupplierView(tk.Frame):
                 messagebox.showwarning("Missing Info", "All fields are required.")
                 return
 
-            try:
-                new_name = new_values[0]
-                contact_ = new_values[1]
-
-                conn = self.connect_db()
-                cursor = conn.cursor()
-
-                # Check if item with same name exists
-                cursor.execute("SELECT COUNT(*) FROM Supplier WHERE Name = %s", (new_name,))
-                if cursor.fetchone()[0] > 0:
-                    messagebox.showerror("Error", f"A Supplier with name '{new_name}' already exists.")
-                    conn.close()
-                    return
-
-                cursor.execute("""
-                    INSERT INTO Supplier (Name, Contact)
-                    VALUES (%s, %s)
-                """, (new_name, contact_))
-                
-                supplier_id= cursor.lastrowid
-                
-                # link with selected items
-                for item_id, var in item_vars.items():
-                    if var.get(): 
-                        cursor.execute("""
-                            INSERT INTO Item_Supplier (Item_id, Supplier_id)
-                            VALUES (%s, %s)
-                        """, (item_id, supplier_id))
-                
-                conn.commit()
-                conn.close()
+            new_name = new_values[0]
+            contact_ = new_values[1]
+            selected_ids = [item_id for item_id, var in item_vars.items() if var.get()]
 
+            def on_added(supplier):
                 messagebox.showinfo("Success", f"Supplier '{new_name}' added and linked to items successfully.")
                 add_win.destroy()
-                self.load_suppliers()
+                self.show_saved_supplier(supplier, 0)
 
-            except Exception as e:
-                messagebox.showerror("Error", f"Invalid input or database error:\n{e}")
+            self.executor.submit(
+                self.supplier_repo.add_supplier, new_name, contact_, selected_ids,
+                on_success=on_added, on_error=self.show_save_error, owner=self
+            )
 
         save_btn = tk.Button(add_win, text="Add Supplier", command=save_new_supplier)
         save_btn.pack(pady=20)
 
+    @measured
     def handle_click(self, event):
         region = self.tree.identify("region", event.x, event.y)
         if region == "cell":
@@ -229,150 +267,106 @@ class SupplierView(tk.Frame):
             if not row_id:
                 return
 
-            supplier_values = self.tree.item(row_id, "values")
-            tags= self.tree.item(row_id, "tags")
-            item_id_tag= tags[0]
-            if not item_id_tag.startswith("id_"):
-                return
-            supplier_id= item_id_tag[3:]
+            # the row's iid is its Supplier_id
+            supplier_id = int(row_id)
 
             if col == "#1":  # Edit icon column
                 self.edit_supplier(supplier_id)
             elif col == "#6":  # Delete icon column
                 self.delete_supplier(supplier_id)
-                
-            print("Clicked column:", col, "supplier_id:", supplier_id)
 
     def delete_supplier(self, supplier_id):
         answer = messagebox.askyesno("Delete Supplier", f"Are you sure you want to delete this supplier?")
         if answer:
-            try:
-                conn = self.connect_db()
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM Supplier WHERE Supplier_id = %s", (supplier_id,))
-                conn.commit()
-                
-                if cursor.rowcount == 0:
+            def on_deleted(rowcount):
+                if rowcount == 0:
                     messagebox.showwarning("Delete Failed", "Supplier not found or could not be deleted.")
-                    
-                conn.close()
-                messagebox.showinfo("Deleted", "Supplier was deleted successfully.")
-                self.load_suppliers()
-                
-            except mysql.connector.Error as err:
-                messagebox.showerror("Database Error", f"Error: {err}")
+                else:
+                    messagebox.showinfo("Deleted", "Supplier was deleted successfully.")
+                self.forget_supplier(supplier_id)
 
-    def edit_supplier(self, supplier_id):
-        try:
-            conn = self.connect_db()
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT Name, Contact FROM Supplier WHERE Supplier_id = %s", (supplier_id,)
+            self.executor.submit(
+                self.supplier_repo.delete_supplier, supplier_id,
+                on_success=on_deleted, on_error=self.show_db_error, owner=self
             )
-            supplier = cursor.fetchone()
-            
-            # fetch all items
-            cursor.execute("SELECT Item_id, Name FROM Item")
-            all_items= cursor.fetchall()
-            
-            # fetch linked items for this supplier
-            cursor.execute(
-                "SELECT Item_id FROM Item_Supplier WHERE Supplier_id = %s", (supplier_id,)
-            )
-            linked_item_ids= {row[0] for row in cursor.fetchall()}
+
+    def edit_supplier(self, supplier_id):
+        def fetch_supplier():
+            # runs on a worker thread
+            supplier, linked_item_ids = self.supplier_repo.get_supplier(supplier_id)
+            return supplier, self.catalog.options(), linked_item_ids
+
+        self.executor.submit(
+            fetch_supplier,
+            on_success=lambda result: self.open_edit_window(supplier_id, *result), on_error=self.show_db_error,
+            group=self.section, key="suppliers.edit", owner=self
+        )
+
+    def open_edit_window(self, supplier_id, supplier, all_items, linked_item_ids):
+        if not supplier:
+            messagebox.showerror("Error", "No supplier found")
+            return
+
+        # Create the edit popup
+        edit_win = tk.Toplevel(self)
+        edit_win.title(f"Edit Supplier")
+        edit_win.geometry("400x600")
+        edit_win.configure(bg=self.lavender)
+
+        labels = ["Name", "Contact"]
+        entries = []
+
+        for idx, (label, value) in enumerate(zip(labels, supplier)):
+            tk.Label(edit_win, text=label + ":", bg=self.lavender).pack(pady=(10 if idx == 0 else 5, 0))
+            entry = tk.Entry(edit_win)
+            entry.pack()
+            entry.insert(0, str(value if value is not None else ""))
+            entries.append(entry)
             
-            conn.close()
+        # item checkboxes
+        tk.Label(edit_win, text="Items Supplied:", bg=self.lavender).pack(pady=10)
+        item_vars= {}
             
+        for item in all_items:
+            var= tk.BooleanVar(value=(item.item_id in linked_item_ids))
+            tk.Checkbutton(edit_win, text= item.name, variable= var, bg= self.lavender).pack(anchor="w")
+            item_vars[item.item_id]= var
+
+        def save_changes():
+            new_values = [e.get().strip() for e in entries]
 
-            if not supplier:
-                messagebox.showerror("Error", "No supplier found")
+            if not all(new_values):
+                messagebox.showwarning("Missing Info", "All fields are required.")
                 return
 
-            # Create the edit popup
-            edit_win = tk.Toplevel(self)
-            edit_win.title(f"Edit Supplier")
-            edit_win.geometry("400x600")
-            edit_win.configure(bg=self.lavender)
-
-            labels = ["Name", "Contact"]
-            entries = []
-
-            for idx, (label, value) in enumerate(zip(labels, supplier)):
-                tk.Label(edit_win, text=label + ":", bg=self.lavender).pack(pady=(10 if idx == 0 else 5, 0))
-                entry = tk.Entry(edit_win)
-                entry.pack()
-                entry.insert(0, str(value if value is not None else ""))
-                entries.append(entry)
-                
-            # item checkboxes
-            tk.Label(edit_win, text="Items Supplied:", bg=self.lavender).pack(pady=10)
-            item_vars= {}
-                
-            for item_id, item_name in all_items:
-                var= tk.BooleanVar(value=(item_id in linked_item_ids))
-                tk.Checkbutton(edit_win, text= item_name, variable= var, bg= self.lavender).pack(anchor="w")
-                item_vars[item_id]= var
-
-            def save_changes():
-                new_values = [e.get().strip() for e in entries]
-
-                if not all(new_values):
-                    messagebox.showwarning("Missing Info", "All fields are required.")
-                    return
-
-                try:
-                    new_name = new_values[0]
-                    contact_ = new_values[1]
-
-                    conn = self.connect_db()
-                    cursor = conn.cursor()
-                    
-                    cursor.execute("""
-                        UPDATE Supplier
-                        SET Name=%s, Contact=%s
-                        WHERE Supplier_id=%s
-                    """, (new_name, contact_, supplier_id))
-                    
-                    # clear any old links
-                    cursor.execute("DELETE FROM Item_Supplier WHERE Supplier_id = %s", (supplier_id,))
-                    
-                    #insert updated links
-                    for item_id, var in item_vars.items():
-                        if var.get():
-                            cursor.execute("""
-                                INSERT INTO Item_Supplier (Item_id, Supplier_id)
-                                VALUES (%s, %s)
-                            """, (item_id, supplier_id))
-                    
-                    conn.commit()
-                    conn.close()
-
-                    messagebox.showinfo("Success", "Supplier updated and items linked.")
-                    edit_win.destroy()
-                    self.load_suppliers()
-
-                except Exception as e:
-                    messagebox.showerror("Error", f"Invalid input or database error:\n{e}")
-
-            save_btn = tk.Button(edit_win, text="Save Changes", command=save_changes)
-            save_btn.pack(pady=20)
-
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+            new_name = new_values[0]
+            contact_ = new_values[1]
+            selected_ids = [item_id for item_id, var in item_vars.items() if var.get()]
+
+            def on_saved(supplier):
+                messagebox.showinfo("Success", "Supplier updated and items linked.")
+                edit_win.destroy()
+                if supplier is None:
+                    self.forget_supplier(supplier_id)
+                else:
+                    self.show_saved_supplier(supplier)
+
+            self.executor.submit(
+                self.supplier_repo.update_supplier, supplier_id, new_name, contact_, selected_ids,
+                on_success=on_saved, on_error=self.show_save_error, owner=self
+            )
+
+        save_btn = tk.Button(edit_win, text="Save Changes", command=save_changes)
+        save_btn.pack(pady=20)
 
 
 # To test the SupplierView Frame standalone
 if __name__ == "__main__":
-    db_config = {
-        "host": "localhost",
-        "user": "root",
-        "password": "Root",
-        "database": "flowershop_management"
-    }
+    db_config = env_db_config()  # HERA_DB_*, like app_gui.py
 
     root = tk.Tk()
     root.title("Flower Shop Management - Suppliers")
     root.geometry("950x500")
-    supplier_view = SupplierView(root, db_config)
+    supplier_view = SupplierView(root, Repositories(connect_pool(db_config)), DBExecutor(root))
     supplier_view.pack(fill="both", expand=True)
     root.mainloop()
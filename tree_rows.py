@@ -0,0 +1,84 @@
+import time
+import ui_metrics
+
+
+class TreeRows:
+    # Keeps a Treeview in step with database rows. Every row's iid is its
+    # database id, so an edit or delete can go straight to it instead of
+    # reloading the list, and render() only touches the rows that differ from
+    # what is on screen.
+    #
+    # row_values(row) returns (id, values, tags) for one row. What each row
+    # currently shows is kept here so comparing needs no Tk calls.
+    # render() and append() report their format and insert time to ui_metrics.
+    def __init__(self, tree, row_values):
+        self.tree = tree
+        self.row_values = row_values
+        self._shown = {}  # iid -> (values, tags)
+
+    def __contains__(self, row_id):
+        return str(row_id) in self._shown
+
+    def _entry(self, row):
+        row_id, values, tags = self.row_values(row)
+        return str(row_id), (tuple(values), tuple(tags))
+
+    def _show(self, iid, shown, index):
+        if iid not in self._shown:
+            self.tree.insert("", index, iid=iid, values=shown[0], tags=shown[1])
+        elif self._shown[iid] != shown:
+            self.tree.item(iid, values=shown[0], tags=shown[1])
+        self._shown[iid] = shown
+
+    def render(self, rows):
+        # make the tree show exactly these rows, in this order
+        started = time.perf_counter()
+        entries = [self._entry(row) for row in rows]
+        formatted = time.perf_counter()
+        wanted = {iid for iid, _ in entries}
+        stale = [iid for iid in self._shown if iid not in wanted]
+        if stale:
+            self.tree.delete(*stale)
+            for iid in stale:
+                del self._shown[iid]
+
+        # rows that stay keep their relative order unless the new list says
+        # otherwise; only then is every row moved into place
+        staying = [iid for iid, _ in entries if iid in self._shown]
+        reorder = staying != list(self.tree.get_children())
+
+        for index, (iid, shown) in enumerate(entries):
+            self._show(iid, shown, index)
+            if reorder:
+                self.tree.move(iid, "", index)
+        self._timed(started, formatted)
+
+    def _timed(self, started, formatted):
+        ui_metrics.add_time("format", (formatted - started) * 1000)
+        ui_metrics.add_time("insert", (time.perf_counter() - formatted) * 1000)
+
+    def append(self, rows):
+        started = time.perf_counter()
+        entries = [self._entry(row) for row in rows]
+        formatted = time.perf_counter()
+        for iid, shown in entries:
+            self._show(iid, shown, "end")
+        self._timed(started, formatted)
+
+    def put(self, row, index="end"):
+        # update the row in place when shown, otherwise insert it at index
+        self._show(*self._entry(row), index)
+
+    def update(self, row):
+        # update the row only if it is on screen; returns whether it was
+        iid, shown = self._entry(row)
+        if iid not in self._shown:
+            return False
+        self._show(iid, shown, "end")
+        return True
+
+    def remove(self, row_id):
+        iid = str(row_id)
+        if iid in self._shown:
+            self.tree.delete(iid)
+            del self._shown[iid]
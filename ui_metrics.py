@@ -0,0 +1,283 @@
+import contextvars
+import functools
+import json
+import math
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+
+# End-to-end timing of what the user does. An interaction starts with a click
+# (sidebar button or Treeview row) and ends once every DB task it started has
+# delivered its results and Tk has gone idle, i.e. the list is drawn. Its time
+# is split into phases:
+#   query   - execute() of its statements (DB worker threads)
+#   fetch   - reading their rows
+#   format  - turning rows into Treeview values (TreeRows)
+#   insert  - Treeview insert/update/move calls
+#   handler - the rest of the click handler itself (building widgets etc.)
+#   other   - what is left: queueing, waiting for a free connection, redraw
+# DBExecutor carries the interaction to its workers and back to the result
+# callbacks in the `current` context variable; InstrumentedCursor and
+# TreeRows report into whatever interaction is current.
+#
+# StallWatchdog separately flags every stretch where the Tk event loop was
+# blocked for longer than a threshold, with the stack that was blocking it.
+#
+# StartupTimer splits the app's launch into steps, up to the first window.
+
+PHASES = ("query", "fetch", "format", "insert", "handler", "other")
+STALL_MS = 100
+STARTUP_BUDGET_MS = 1500  # time to first window on the slowest till we support
+
+current = contextvars.ContextVar("ui_interaction", default=None)
+
+
+def add_time(phase, ms):
+    interaction = current.get()
+    if interaction is not None:
+        interaction.add(phase, ms)
+
+
+def percentile(sorted_values, fraction):
+    # nearest rank
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+
+class Interaction:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.at = time.time()
+        self.started = time.perf_counter()
+        self.phases = defaultdict(float)
+        self.total_ms = None
+        self._holds = 1  # the click handler itself
+        self._lock = threading.Lock()
+
+    def add(self, phase, ms):
+        with self._lock:
+            self.phases[phase] += ms
+
+    def hold(self):
+        # a DB task started on its behalf; it is not finished before that is
+        with self._lock:
+            self._holds += 1
+
+    def release(self):
+        with self._lock:
+            self._holds -= 1
+            if self._holds:
+                return
+            self.total_ms = (time.perf_counter() - self.started) * 1000
+            self.phases["other"] = max(self.total_ms - sum(self.phases.values()), 0)
+        self.metrics.finished(self)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "at": self.at,
+            "total_ms": round(self.total_ms, 2),
+            **{f"{phase}_ms": round(self.phases.get(phase, 0.0), 2) for phase in PHASES},
+        }
+
+
+class UIMetrics:
+    def __init__(self, keep=500):
+        self.interactions = deque(maxlen=keep)
+        self.stalls = deque(maxlen=keep)
+        self.startup = None  # StartupTimer.to_dict() once the first window is up
+        self._lock = threading.Lock()
+
+    def finished(self, interaction):
+        with self._lock:
+            self.interactions.append(interaction.to_dict())
+
+    def add_stall(self, stall):
+        with self._lock:
+            self.stalls.append(stall)
+
+    def summary(self):
+        # per interaction name: count, total latency percentiles, mean per phase;
+        # slowest p95 first
+        with self._lock:
+            interactions = list(self.interactions)
+        by_name = defaultdict(list)
+        for interaction in interactions:
+            by_name[interaction["name"]].append(interaction)
+        rows = []
+        for name, items in by_name.items():
+            totals = sorted(item["total_ms"] for item in items)
+            row = {
+                "name": name,
+                "count": len(items),
+                "p50_ms": percentile(totals, 0.50),
+                "p95_ms": percentile(totals, 0.95),
+                "max_ms": totals[-1],
+            }
+            for phase in PHASES:
+                row[f"{phase}_ms"] = round(sum(item[f"{phase}_ms"] for item in items) / len(items), 2)
+            rows.append(row)
+        rows.sort(key=lambda row: row["p95_ms"], reverse=True)
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self.interactions.clear()
+            self.stalls.clear()
+
+    def to_dict(self, query_log=None, db_pool=None):
+        with self._lock:
+            data = {
+                "exported_at": time.time(),
+                "interactions": list(self.interactions),
+                "stalls": list(self.stalls),
+                "startup": self.startup,
+            }
+        data["summary"] = self.summary()
+        if query_log is not None:
+            data["queries"] = [stats._asdict() for stats in query_log.stats()]
+            data["slow_queries"] = [slow._asdict() for slow in query_log.recent_slow]
+        if db_pool is not None:
+            data["pool"] = db_pool.stats()
+        return data
+
+    def export_json(self, path, query_log=None, db_pool=None):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(query_log, db_pool), f, indent=2)
+
+
+# the app's one collector; views report into it through interaction()/measured
+metrics = UIMetrics()
+
+
+@contextmanager
+def interaction(name):
+    # a click handler's body; nested handlers count towards the outer one
+    if current.get() is not None:
+        yield current.get()
+        return
+    item = Interaction(metrics, name)
+    token = current.set(item)
+    started = time.perf_counter()
+    try:
+        yield item
+    finally:
+        current.reset(token)
+        # handler time is what format/insert inside it did not already cover
+        elapsed = (time.perf_counter() - started) * 1000
+        item.add("handler", max(elapsed - item.phases["format"] - item.phases["insert"], 0))
+        item.release()
+
+
+def measured(handler):
+    # decorator for view event handlers, named "ItemView.handle_click"
+    @functools.wraps(handler)
+    def wrapper(self, *args, **kwargs):
+        with interaction(f"{type(self).__name__}.{handler.__name__}"):
+            return handler(self, *args, **kwargs)
+    return wrapper
+
+
+class StartupTimer:
+    # mark(step) closes the step that ran since the previous mark; started is a
+    # perf_counter() taken as early as possible, before the app's own imports
+    def __init__(self, started=None, budget_ms=STARTUP_BUDGET_MS):
+        self.started = started if started is not None else time.perf_counter()
+        self.budget_ms = budget_ms
+        self.steps = []  # (step, ms)
+        self.total_ms = None
+        self._last = self.started
+
+    def mark(self, step):
+        now = time.perf_counter()
+        self.steps.append((step, (now - self._last) * 1000))
+        self._last = now
+
+    def finish(self, step="first window", ui_metrics=None):
+        self.mark(step)
+        self.total_ms = (self._last - self.started) * 1000
+        (ui_metrics or metrics).startup = self.to_dict()
+
+    @property
+    def over_budget(self):
+        return self.total_ms is not None and self.total_ms > self.budget_ms
+
+    def to_dict(self):
+        return {
+            "total_ms": round(self.total_ms, 1),
+            "budget_ms": self.budget_ms,
+            "steps": {step: round(ms, 1) for step, ms in self.steps},
+        }
+
+    def report(self):
+        steps = ", ".join(f"{step} {ms:.0f}" for step, ms in self.steps)
+        verdict = "OVER BUDGET" if self.over_budget else "within budget"
+        return f"Startup {self.total_ms:.0f} ms ({verdict}, {self.budget_ms} ms): {steps}"
+
+
+class StallWatchdog:
+    # The Tk loop bumps a heartbeat every interval_ms; a thread checks it. When
+    # the heartbeat is late by more than threshold_ms the main thread's stack
+    # is captured (that is the callback blocking the loop) and the stall is
+    # recorded with its full length once the loop gets going again.
+    def __init__(self, root, ui_metrics=None, threshold_ms=STALL_MS, interval_ms=20):
+        self.root = root
+        self.metrics = ui_metrics or metrics
+        self.threshold = threshold_ms / 1000
+        self.interval_ms = interval_ms
+        self._main_thread = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stall = None  # (stack) captured while the loop is blocked
+        self._lock = threading.Lock()
+        self._running = False
+        self._after_id = None
+
+    def start(self):
+        self._running = True
+        self._last_beat = time.perf_counter()
+        self._after_id = self.root.after(self.interval_ms, self._beat)
+        threading.Thread(target=self._watch, name="stall-watchdog", daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _beat(self):
+        now = time.perf_counter()
+        with self._lock:
+            gap = now - self._last_beat
+            self._last_beat = now
+            stack, self._stall = self._stall, None
+        # the beat itself is due every interval, only the lateness is a stall
+        blocked = gap - self.interval_ms / 1000
+        if blocked > self.threshold:
+            self.metrics.add_stall({
+                "at": time.time() - gap,
+                "blocked_ms": round(blocked * 1000, 1),
+                "stack": stack or [],
+            })
+        if self._running:
+            self._after_id = self.root.after(self.interval_ms, self._beat)
+
+    def _watch(self):
+        while self._running:
+            time.sleep(self.threshold / 4)
+            with self._lock:
+                late = time.perf_counter() - self._last_beat > self.threshold + self.interval_ms / 1000
+                capture = late and self._stall is None
+            if capture:
+                frame = sys._current_frames().get(self._main_thread)
+                stack = [f"{os.path.basename(entry.filename)}:{entry.lineno} in {entry.name}"
+                         for entry in traceback.extract_stack(frame)[-8:]] if frame is not None else []
+                with self._lock:
+                    self._stall = stack
@@ -0,0 +1,88 @@
+import time
+
+
+# seconds a hidden view's rows are trusted; other terminals write to the same
+# database and their changes do not show up in DataVersions
+MAX_AGE = 300
+
+
+class ViewManager:
+    # Keeps one instance of every section's view alive and swaps them in the
+    # content area with pack/pack_forget, instead of destroying the view and
+    # building it (and running its full load) again on every sidebar click.
+    #
+    # A view shown again calls its refresh() only if the data it depends on
+    # changed while it was hidden, it has been hidden longer than max_age, or
+    # a load of its own was cancelled when the user left it. In the max_age
+    # case its expire() runs first, if it has one, to drop caches that only
+    # this process's writes keep current.
+    def __init__(self, content, versions=None, max_age=MAX_AGE):
+        self.content = content
+        self.versions = versions  # may be set later, before a view that depends on it is shown
+        self.max_age = max_age
+        self._sections = {}  # name -> (factory, depends)
+        self._views = {}
+        self._hidden = {}  # name -> (versions snapshot, hidden at)
+        self._stale = set()
+        self.current = None
+
+    def register(self, name, factory, depends=None):
+        # factory(parent) builds the view; depends: names of the DataVersions
+        # it shows, or None to refresh on every show
+        self._sections[name] = (factory, depends)
+
+    def view(self, name):
+        view = self._views.get(name)
+        return view if view is not None and view.winfo_exists() else None
+
+    def mark_stale(self, name):
+        self._stale.add(name)
+
+    def show(self, name):
+        if name == self.current and self.view(name) is not None:
+            return self.view(name)
+        self._hide_current()
+
+        factory, depends = self._sections[name]
+        view = self.view(name)
+        if view is None:
+            # first visit: the view loads its data while being built
+            view = self._views[name] = factory(self.content)
+            self._stale.discard(name)
+        else:
+            needed, expired = self._needs_refresh(name, depends)
+            expire = getattr(view, "expire", None)
+            if expired and expire is not None:
+                expire()
+            refresh = getattr(view, "refresh", None)
+            if needed and refresh is not None:
+                refresh()
+        view.pack(fill="both", expand=True)
+        self.current = name
+        return view
+
+    def _hide_current(self):
+        name = self.current
+        view = self.view(name) if name is not None else None
+        if view is None:
+            return
+        view.pack_forget()
+        depends = self._sections[name][1]
+        self._hidden[name] = (self._snapshot(depends), time.monotonic())
+        self.current = None
+
+    def _needs_refresh(self, name, depends):
+        # (refresh needed, hidden longer than max_age)
+        stale = name in self._stale
+        self._stale.discard(name)
+        hidden = self._hidden.pop(name, None)
+        if hidden is None:
+            return True, False
+        snapshot, hidden_at = hidden
+        expired = time.monotonic() - hidden_at > self.max_age
+        if stale or depends is None:
+            return True, expired
+        return snapshot != self._snapshot(depends) or expired, expired
+
+    def _snapshot(self, depends):
+        return self.versions.snapshot(depends) if depends else None